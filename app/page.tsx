@@ -4,57 +4,116 @@ import { useQuery } from "@tanstack/react-query";
 import { StreamList } from "@/components/StreamList";
 import { RefreshCw, Check } from "lucide-react";
 import { fetchTwitchStreams, fetchYouTubeStreams } from "@/lib/stream-api";
+import {
+  STREAM_FEED_URL,
+  feedPlatforms,
+  fetchFeedStreams,
+  subscribeToStreamFeed,
+} from "@/lib/stream-feed";
 import { useEffect, useState, useMemo } from "react";
-import { Stream } from "@/types/stream";
+import { Platform, Stream } from "@/types/stream";
+
+// With a central feed configured, streams are pushed to us instead of polled per platform
+const feedEnabled = STREAM_FEED_URL !== "";
 
 export default function Home() {
+  const [showSuccess, setShowSuccess] = useState(false);
+  const [feedStreams, setFeedStreams] = useState<Stream[] | null>(null);
+  // Platforms the feed covers; the others are still queried directly.
+  // Nothing counts as covered until the feed has answered, and a feed error
+  // hands every platform back to the direct queries until it recovers.
+  const [coveredPlatforms, setCoveredPlatforms] = useState<Platform[]>([]);
+  const [feedError, setFeedError] = useState<Error | null>(null);
+  const twitchFromFeed = feedEnabled && coveredPlatforms.includes("twitch");
+  const youtubeFromFeed = feedEnabled && coveredPlatforms.includes("youtube");
+
   // Separate queries for each platform
   const twitchQuery = useQuery({
     queryKey: ["streams", "twitch"],
     queryFn: fetchTwitchStreams,
     refetchInterval: 60000,
+    enabled: !twitchFromFeed,
   });
 
   const youtubeQuery = useQuery({
     queryKey: ["streams", "youtube"],
     queryFn: fetchYouTubeStreams,
     refetchInterval: 60000,
+    enabled: !youtubeFromFeed,
   });
 
-  const [showSuccess, setShowSuccess] = useState(false);
+  // Manual feed refreshes; the feed's events keep the list current otherwise
+  const feedQuery = useQuery({
+    queryKey: ["streams", "feed"],
+    queryFn: fetchFeedStreams,
+    enabled: false,
+  });
+
+  useEffect(() => {
+    if (!feedEnabled) return;
+    return subscribeToStreamFeed(
+      (streams, _lastUpdated, platforms) => {
+        setFeedStreams(streams);
+        setCoveredPlatforms(platforms);
+        setFeedError(null);
+      },
+      (error) => {
+        setFeedError(error);
+        setCoveredPlatforms([]);
+      },
+    );
+  }, []);
 
-  // Combine streams from all platforms
+  useEffect(() => {
+    if (!feedQuery.data) return;
+    setFeedStreams(feedQuery.data.streams);
+    setCoveredPlatforms(feedPlatforms(feedQuery.data));
+    setFeedError(null);
+  }, [feedQuery.data]);
+
+  useEffect(() => {
+    if (!feedQuery.error) return;
+    setFeedError(feedQuery.error);
+    setCoveredPlatforms([]);
+  }, [feedQuery.error]);
+
+  // Combine streams from the feed and the platforms it does not cover
   const allStreams = useMemo(() => {
     const streams: Stream[] = [];
-    if (twitchQuery.data) streams.push(...twitchQuery.data);
-    if (youtubeQuery.data) streams.push(...youtubeQuery.data);
+    // Feed streams of a platform the direct queries took back would be duplicates
+    if (feedEnabled && feedStreams) {
+      streams.push(...feedStreams.filter((stream) => coveredPlatforms.includes(stream.platform)));
+    }
+    if (twitchQuery.data && !twitchFromFeed) streams.push(...twitchQuery.data);
+    if (youtubeQuery.data && !youtubeFromFeed) streams.push(...youtubeQuery.data);
     
     // Sort by viewer count
     return streams.sort((a, b) => b.viewerCount - a.viewerCount);
-  }, [twitchQuery.data, youtubeQuery.data]);
+  }, [feedStreams, coveredPlatforms, twitchQuery.data, youtubeQuery.data, twitchFromFeed, youtubeFromFeed]);
 
   // Check if any query is fetching
-  const isFetching = twitchQuery.isFetching || youtubeQuery.isFetching;
+  const isFetching = twitchQuery.isFetching || youtubeQuery.isFetching || feedQuery.isFetching;
   const isInitialLoading = twitchQuery.isLoading || youtubeQuery.isLoading;
 
   // Show success indicator when all fetching completes
   useEffect(() => {
-    if (!isFetching && !isInitialLoading && (twitchQuery.data || youtubeQuery.data)) {
+    if (!isFetching && !isInitialLoading && (twitchQuery.data || youtubeQuery.data || feedQuery.data)) {
       setShowSuccess(true);
       const timer = setTimeout(() => setShowSuccess(false), 2000);
       return () => clearTimeout(timer);
     }
-  }, [isFetching, isInitialLoading, twitchQuery.data, youtubeQuery.data]);
+  }, [isFetching, isInitialLoading, twitchQuery.data, youtubeQuery.data, feedQuery.data]);
 
   const handleRefresh = () => {
-    twitchQuery.refetch();
-    youtubeQuery.refetch();
+    if (feedEnabled) feedQuery.refetch();
+    if (!twitchFromFeed) twitchQuery.refetch();
+    if (!youtubeFromFeed) youtubeQuery.refetch();
   };
 
   // Platform loading states
   const platformLoadingStates = {
-    twitch: twitchQuery.isFetching,
-    youtube: youtubeQuery.isFetching,
+    twitch: twitchFromFeed ? feedStreams === null : twitchQuery.isFetching,
+    youtube: youtubeFromFeed ? feedStreams === null : youtubeQuery.isFetching,
   };
 
   return (
@@ -103,6 +162,15 @@ export default function Home() {
 
       {/* Main Content */}
       <main className="relative z-10 max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-10 flex-1 w-full">
+        {/* Feed problems - the platforms are queried directly meanwhile */}
+        {feedEnabled && feedError && (
+          <div role="alert" className="sc6-border rounded-sm px-5 py-3 mb-8 text-center">
+            <p className="text-[#a09080] text-base font-['Cormorant_Garamond'] italic">
+              Live feed unavailable ({feedError.message}) - showing streams fetched directly
+            </p>
+          </div>
+        )}
+
         {/* Stream List - always shown, never blocked */}
         <StreamList 
           streams={allStreams} 
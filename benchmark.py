@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the probe, resolve and scan workflows and CLI start-up
+
+Starts local fake Invidious instances (fake_invidious.py) and runs each
+workflow against them in a fresh subprocess, so peak RSS is measured per
+workflow and no state (pooled connections, health scores, caches) leaks
+from one run into the next. Reports throughput, p50/p99 latency per item
+and peak RSS:
+
+    probe    test_invidious_channel.probe_instances, rounds over all instances
+    resolve  channel_resolver.resolve_handle for COUNT distinct handles
+    scan     live_scanner.fetch_channel_videos for COUNT distinct channels
+    paging   fetch_channel_videos for COUNT channels whose listings run to
+             several pages of live streams; paging-prefetch does the same
+             with pagination prefetch on (not run by default)
+    startup  cold invidious_cli.py invocations (STARTUP_COMMANDS), one
+             interpreter each, so latency is the cold-start time
+    warm     the same invocations served by a warm invidious_cli.py server
+             (Linux and macOS only)
+
+Nothing touches the public instances or the on-disk caches. Append the
+results to a JSON lines file with --output to track changes across
+releases.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --count 500 --latency 80 --jitter 40 --error-rate 0.05
+    python benchmark.py --workflows scan --dns-failures 2 --output bench.jsonl
+    python benchmark.py --workflows startup,warm --startup-runs 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from fake_invidious import (
+    FORMATS,
+    MULTI_LIVE_PREFIX,
+    FakeData,
+    FakeInvidiousServer,
+    channel_id_for,
+    unresolvable_instances,
+)
+from invidious_cli import COMMANDS, warm_supported
+
+WORKFLOWS = ("probe", "resolve", "scan", "paging", "paging-prefetch", "startup", "warm")
+# The paging pair only compares prefetch against sequential page requests
+DEFAULT_WORKFLOWS = tuple(w for w in WORKFLOWS
+                          if not w.startswith("paging") and (w != "warm" or warm_supported()))
+
+# Workflows timed from outside, in subprocesses of their own
+SUBPROCESS_WORKFLOWS = ("startup", "warm")
+
+# Items per workflow (probe: rounds over all instances)
+DEFAULT_COUNT = 200
+DEFAULT_PROBE_ROUNDS = 10
+
+# Invocations timed by the startup workflows: --help of every subcommand,
+# which imports the command's module but sends no request. p50 and p99 are
+# taken over all of them together.
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "invidious_cli.py")
+STARTUP_COMMANDS = [[name, "--help"] for name in COMMANDS]
+DEFAULT_STARTUP_RUNS = 5
+
+# Seconds a warm server gets to import everything and start listening
+WARM_START_TIMEOUT = 30
+
+DEFAULT_WORKERS = 16
+DEFAULT_SERVERS = 2
+
+# Per-instance rate for the runs - high enough that the limiter is not the bottleneck
+BENCH_RATE = 1000.0
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Peak resident set size of this process (or its largest finished child) in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _timed_pool(fn: Callable[[str], bool], items: List[str], workers: int) -> Tuple[List[float], int]:
+    """Run fn over items concurrently; return per-item latencies and the failure count"""
+    def run(item: str) -> Tuple[float, bool]:
+        started = time.perf_counter()
+        ok = fn(item)
+        return time.perf_counter() - started, ok
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        outcomes = list(executor.map(run, items))
+    return [latency for latency, _ in outcomes], sum(1 for _, ok in outcomes if not ok)
+
+
+def run_probe(instances: List[str], count: int, workers: int) -> Tuple[int, List[float], int]:
+    from test_invidious_channel import probe_instances
+
+    channel_id = channel_id_for("benchmark-probe")
+    latencies: List[float] = []
+    failures = 0
+    # probe_instances prints a block per instance; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(count):
+            for result in probe_instances(instances, channel_id, max_workers=workers):
+                if result.get("elapsed") is not None:
+                    latencies.append(result["elapsed"])
+                failures += not result["success"]
+    return count * len(instances), latencies, failures
+
+
+def run_resolve(instances: List[str], count: int, workers: int) -> Tuple[int, List[float], int]:
+    from channel_resolver import resolve_handle
+    from instance_health import get_store
+    from rate_limit import InstanceRateLimiter
+    from resolution_cache import ResolutionCache
+
+    store = get_store()
+    limiter = InstanceRateLimiter(BENCH_RATE, int(BENCH_RATE))
+    cache = ResolutionCache(":memory:")
+    handles = [f"bench_handle_{i}" for i in range(count)]
+    latencies, failures = _timed_pool(
+        lambda handle: resolve_handle(handle, instances, store, limiter, cache) is not None,
+        handles,
+        workers,
+    )
+    return count, latencies, failures
+
+
+def run_scan(instances: List[str], count: int, workers: int) -> Tuple[int, List[float], int]:
+    from instance_health import get_store
+    from live_scanner import fetch_channel_videos
+    from rate_limit import InstanceRateLimiter
+
+    store = get_store()
+    limiter = InstanceRateLimiter(BENCH_RATE, int(BENCH_RATE))
+    channel_ids = [channel_id_for(f"bench_channel_{i}") for i in range(count)]
+    latencies, failures = _timed_pool(
+        lambda channel_id: fetch_channel_videos(channel_id, instances, store, limiter)[1] is not None,
+        channel_ids,
+        workers,
+    )
+    return count, latencies, failures
+
+
+def _run_paging(instances: List[str], count: int, workers: int, prefetch: bool) -> Tuple[int, List[float], int]:
+    from instance_health import get_store
+    from live_scanner import fetch_channel_videos
+    from rate_limit import InstanceRateLimiter
+
+    store = get_store()
+    limiter = InstanceRateLimiter(BENCH_RATE, int(BENCH_RATE))
+    # Channels listing nothing but live streams, so every page is followed
+    channel_ids = [f"{MULTI_LIVE_PREFIX}{i:013d}" for i in range(count)]
+    latencies, failures = _timed_pool(
+        lambda channel_id: fetch_channel_videos(channel_id, instances, store, limiter,
+                                                prefetch=prefetch)[1] is not None,
+        channel_ids,
+        workers,
+    )
+    return count, latencies, failures
+
+
+def run_paging(instances: List[str], count: int, workers: int) -> Tuple[int, List[float], int]:
+    return _run_paging(instances, count, workers, prefetch=False)
+
+
+def run_paging_prefetch(instances: List[str], count: int, workers: int) -> Tuple[int, List[float], int]:
+    return _run_paging(instances, count, workers, prefetch=True)
+
+
+def _time_invocations(runs: int, env: Dict[str, str]) -> Tuple[int, List[float], int]:
+    """Run STARTUP_COMMANDS runs times, one process each; return wall times and failures"""
+    latencies: List[float] = []
+    failures = 0
+    for _ in range(runs):
+        for command in STARTUP_COMMANDS:
+            started = time.perf_counter()
+            completed = subprocess.run([sys.executable, CLI_PATH] + command, env=env, capture_output=True)
+            latencies.append(time.perf_counter() - started)
+            failures += completed.returncode != 0
+    return len(latencies), latencies, failures
+
+
+def run_startup(instances: List[str], count: int, workers: int) -> Tuple[int, List[float], int]:
+    return _time_invocations(count, dict(os.environ, INVIDIOUS_CLI_COLD="1"))
+
+
+def run_warm(instances: List[str], count: int, workers: int) -> Tuple[int, List[float], int]:
+    with tempfile.TemporaryDirectory(prefix="invidious-warm-") as socket_dir:
+        env = dict(os.environ, INVIDIOUS_CLI_SOCKET=os.path.join(socket_dir, "cli.sock"))
+        env.pop("INVIDIOUS_CLI_COLD", None)
+        server = subprocess.Popen([sys.executable, CLI_PATH, "warm"], env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + WARM_START_TIMEOUT
+            while not os.path.exists(env["INVIDIOUS_CLI_SOCKET"]):
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("warm server did not start")
+                time.sleep(0.05)
+            return _time_invocations(count, env)
+        finally:
+            subprocess.run([sys.executable, CLI_PATH, "warm", "--stop"], env=env, capture_output=True)
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+
+RUNNERS = {"probe": run_probe, "resolve": run_resolve, "scan": run_scan, "paging": run_paging,
+           "paging-prefetch": run_paging_prefetch, "startup": run_startup, "warm": run_warm}
+
+
+def run_workflow(workflow: str, instances: List[str], count: int, workers: int) -> Dict[str, Any]:
+    """Run one workflow in this process and return its measurements"""
+    started = time.perf_counter()
+    items, latencies, failures = RUNNERS[workflow](instances, count, workers)
+    elapsed = time.perf_counter() - started
+    p50 = percentile(latencies, 50)
+    p99 = percentile(latencies, 99)
+    return {
+        "workflow": workflow,
+        "items": items,
+        "failures": failures,
+        "elapsed": round(elapsed, 3),
+        "items_per_sec": round(items / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+        "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+        "peak_rss_mb": round(peak_rss_mb(workflow in SUBPROCESS_WORKFLOWS), 1) if resource else None,
+    }
+
+
+def run_isolated(workflow: str, instances: List[str], count: int, workers: int, state_dir: str) -> Dict[str, Any]:
+    """Run one workflow in a fresh interpreter with throwaway state files"""
+    env = dict(os.environ)
+    env["INVIDIOUS_HEALTH_FILE"] = os.path.join(state_dir, f"{workflow}_health.json")
+    env["INVIDIOUS_RESOLUTION_CACHE"] = os.path.join(state_dir, f"{workflow}_channels.sqlite3")
+    env["INVIDIOUS_RESPONSE_CACHE"] = os.path.join(state_dir, f"{workflow}_responses.sqlite3")
+    env["INVIDIOUS_DNS_CACHE"] = os.path.join(state_dir, f"{workflow}_dns.json")
+    # Benchmark traffic must neither be recorded nor answered from an archive
+    env.pop("INVIDIOUS_CAPTURE", None)
+    env.pop("INVIDIOUS_REPLAY", None)
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", workflow,
+        "--instances", ",".join(instances), "--count", str(count), "--workers", str(workers),
+    ]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise RuntimeError(f"{workflow} run failed:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def print_table(results: List[Dict[str, Any]]):
+    """Print the results as a fixed-width table"""
+    def fmt(value: Any) -> str:
+        return "-" if value is None else f"{value:g}" if isinstance(value, float) else str(value)
+
+    columns = [("workflow", "Workflow"), ("items", "Items"), ("failures", "Failed"), ("elapsed", "Time s"),
+               ("items_per_sec", "Items/s"), ("p50_ms", "p50 ms"), ("p99_ms", "p99 ms"),
+               ("peak_rss_mb", "Peak RSS MB")]
+    rows = [[fmt(r.get(key)) for key, _ in columns] for r in results]
+    widths = [max(len(title), *(len(row[i]) for row in rows)) for i, (_, title) in enumerate(columns)]
+    print("  ".join(title.ljust(w) for (_, title), w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(cell.ljust(w) for cell, w in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Invidious tools against local fake instances")
+    parser.add_argument("--workflows", default=",".join(DEFAULT_WORKFLOWS),
+                        help=f"Comma-separated workflows to run (default: {','.join(DEFAULT_WORKFLOWS)})")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT,
+                        help=f"Handles/channels per run (default: {DEFAULT_COUNT})")
+    parser.add_argument("--probe-rounds", type=int, default=DEFAULT_PROBE_ROUNDS,
+                        help=f"Probe rounds over all instances (default: {DEFAULT_PROBE_ROUNDS})")
+    parser.add_argument("--startup-runs", type=int, default=DEFAULT_STARTUP_RUNS,
+                        help=f"Rounds of CLI invocations for startup/warm (default: {DEFAULT_STARTUP_RUNS})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Concurrent requests (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--servers", type=int, default=DEFAULT_SERVERS,
+                        help=f"Fake instances to start (default: {DEFAULT_SERVERS})")
+    parser.add_argument("--latency", type=float, default=20.0, help="Added latency per request in ms (default: 20)")
+    parser.add_argument("--jitter", type=float, default=10.0, help="Random extra latency in ms (default: 10)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 502")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--dns-failures", type=int, default=0,
+                        help="Extra instances whose hostnames never resolve")
+    parser.add_argument("--format", choices=FORMATS, default="mixed", help="Listing shape served (default: mixed)")
+    parser.add_argument("--fixtures", help="Directory of recorded responses to serve")
+    parser.add_argument("--archive", help="Capture archive of real traffic to serve")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON instead of a table")
+    parser.add_argument("--output", help="Append the results to this JSON lines file")
+    parser.add_argument("--child", choices=WORKFLOWS, help=argparse.SUPPRESS)
+    parser.add_argument("--instances", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_workflow(args.child, args.instances.split(","), args.count, args.workers)
+        print(json.dumps(result))
+        return
+
+    workflows = [w.strip() for w in args.workflows.split(",") if w.strip()]
+    unknown = [w for w in workflows if w not in WORKFLOWS]
+    if unknown:
+        parser.error(f"unknown workflow(s): {', '.join(unknown)}")
+
+    data = FakeData(args.fixtures, args.format, archive=args.archive)
+    servers = [
+        FakeInvidiousServer(latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate,
+                            throttle_rate=args.throttle_rate, data=data, seed=i).start()
+        for i in range(max(1, args.servers))
+    ]
+    instances = [s.url for s in servers] + unresolvable_instances(args.dns_failures)
+
+    print(f"Benchmarking {', '.join(workflows)} against {len(servers)} fake instance(s)"
+          f" (+{args.dns_failures} unresolvable), {args.latency:g}±{args.jitter:g} ms latency, "
+          f"{args.error_rate:.0%} errors, {args.throttle_rate:.0%} throttled, {args.format} listings", file=sys.stderr)
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="invidious-bench-") as state_dir:
+            for workflow in workflows:
+                count = {"probe": args.probe_rounds, "startup": args.startup_runs,
+                         "warm": args.startup_runs}.get(workflow, args.count)
+                print(f"  running {workflow}...", file=sys.stderr)
+                results.append(run_isolated(workflow, instances, count, args.workers, state_dir))
+    finally:
+        for server in servers:
+            server.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+    if args.output:
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": _git_revision(),
+            "settings": {
+                "count": args.count, "probe_rounds": args.probe_rounds, "startup_runs": args.startup_runs,
+                "workers": args.workers,
+                "servers": args.servers, "latency_ms": args.latency, "jitter_ms": args.jitter,
+                "error_rate": args.error_rate, "throttle_rate": args.throttle_rate,
+                "dns_failures": args.dns_failures, "format": args.format,
+            },
+            "results": results,
+        }
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Results appended to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Append-only archive of captured Invidious HTTP exchanges
+
+With capture enabled, the shared HTTP client (invidious_http) writes every
+request it sends and the full response (status, headers, body, timing) to
+an archive. With replay enabled, it answers from the archive instead of the
+network, so parsing and filtering can be profiled against real payloads at
+full speed, and fake_invidious.py can serve them.
+
+Format: the data file is a sequence of frames, each a 4-byte big-endian
+length followed by a zlib-compressed record (one JSON metadata line, a
+newline, then the raw body). Frames are only ever appended. A side file
+(<archive>.idx) holds one JSON line per frame with its URL, offset and
+size; it is rebuilt from the data file if missing or behind, and a frame
+cut short by a crash is ignored.
+
+Settings:
+    INVIDIOUS_CAPTURE   archive path to record into
+    INVIDIOUS_REPLAY    archive path to replay from (no network access)
+
+Usage:
+    INVIDIOUS_CAPTURE=traffic.capture python live_scanner.py channels.txt
+    INVIDIOUS_REPLAY=traffic.capture python live_scanner.py channels.txt
+    python capture_archive.py list traffic.capture
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+CAPTURE_FILE = os.environ.get("INVIDIOUS_CAPTURE") or None
+REPLAY_FILE = os.environ.get("INVIDIOUS_REPLAY") or None
+
+FRAME_HEADER = struct.Struct(">I")
+
+COMPRESSION_LEVEL = 6
+
+
+@dataclass
+class CapturedExchange:
+    """One recorded request/response pair"""
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+    elapsed: float
+    captured_at: float = field(default_factory=time.time)
+    request_headers: Dict[str, str] = field(default_factory=dict)
+
+    def encode(self) -> bytes:
+        meta = {
+            "url": self.url,
+            "status": self.status_code,
+            "headers": self.headers,
+            "request_headers": self.request_headers,
+            "elapsed": round(self.elapsed, 6),
+            "captured_at": self.captured_at,
+        }
+        return zlib.compress(json.dumps(meta).encode("utf-8") + b"\n" + self.body, COMPRESSION_LEVEL)
+
+    @classmethod
+    def decode(cls, frame: bytes) -> "CapturedExchange":
+        meta_line, _, body = zlib.decompress(frame).partition(b"\n")
+        meta = json.loads(meta_line)
+        return cls(
+            url=meta["url"],
+            status_code=meta["status"],
+            headers=meta["headers"],
+            body=body,
+            elapsed=meta["elapsed"],
+            captured_at=meta["captured_at"],
+            request_headers=meta.get("request_headers") or {},
+        )
+
+
+def path_key(url: str) -> str:
+    """URL without scheme and host, so captures can be looked up across instances"""
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class ReplayedResponse:
+    """
+    Response served from an archive
+
+    Mirrors the parts of requests.Response the scripts use, including
+    iter_content for streamed parsing.
+    """
+
+    def __init__(self, exchange: CapturedExchange):
+        from requests.structures import CaseInsensitiveDict
+
+        self.url = exchange.url
+        self.status_code = exchange.status_code
+        self.headers = CaseInsensitiveDict(exchange.headers)
+        self.content = exchange.body
+        self.elapsed_seconds = exchange.elapsed
+        self.encoding = "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self, **kwargs) -> Any:
+        return json.loads(self.content, **kwargs)
+
+    def iter_content(self, chunk_size: int = 16 * 1024) -> Iterator[bytes]:
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        """Nothing to release - present so callers can treat all responses alike"""
+
+
+class CaptureArchive:
+    """
+    Thread-safe handle on one archive file
+
+    Args:
+        path: Data file; created on the first append
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + ".idx"
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, Any]] = []
+        self._by_url: Dict[str, int] = {}
+        self._by_path: Dict[str, int] = {}
+        # End of the last complete frame in the data file
+        self._valid_end: Optional[int] = None
+        self._load_index()
+
+    def _add_entry(self, entry: Dict[str, Any]):
+        position = len(self._entries)
+        self._entries.append(entry)
+        # Later captures of the same URL win
+        self._by_url[entry["url"]] = position
+        self._by_path[path_key(entry["url"])] = position
+
+    def _load_index(self):
+        """Read the index, then index any frames the data file has beyond it"""
+        indexed_end = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                index_end = 0
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    self._add_entry(entry)
+                    index_end += len(line)
+                    indexed_end = entry["offset"] + FRAME_HEADER.size + entry["size"]
+            if index_end < os.path.getsize(self.index_path):
+                # Torn last line - cut it so new entries start on a clean line
+                with open(self.index_path, "r+b") as f:
+                    f.truncate(index_end)
+        if not os.path.exists(self.path):
+            return
+
+        missing = []
+        with open(self.path, "rb") as f:
+            f.seek(indexed_end)
+            offset = indexed_end
+            while True:
+                header = f.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    break
+                (size,) = FRAME_HEADER.unpack(header)
+                frame = f.read(size)
+                if len(frame) < size:
+                    break  # cut short by a crash
+                try:
+                    url = CapturedExchange.decode(frame).url
+                except (zlib.error, ValueError, KeyError):
+                    break
+                missing.append({"url": url, "offset": offset, "size": size})
+                offset += FRAME_HEADER.size + size
+            self._valid_end = offset
+
+        if missing:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                for entry in missing:
+                    f.write(json.dumps(entry) + "\n")
+                    self._add_entry(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, exchange: CapturedExchange):
+        """Add an exchange to the end of the archive"""
+        frame = exchange.encode()
+        with self._lock:
+            with open(self.path, "ab") as f:
+                # Drop a torn frame left by a crash so the new one is reachable
+                if self._valid_end is not None and f.tell() > self._valid_end:
+                    f.truncate(self._valid_end)
+                    f.seek(self._valid_end)
+                offset = f.tell()
+                f.write(FRAME_HEADER.pack(len(frame)) + frame)
+                self._valid_end = f.tell()
+            entry = {"url": exchange.url, "offset": offset, "size": len(frame)}
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._add_entry(entry)
+
+    def _read(self, entry: Dict[str, Any]) -> CapturedExchange:
+        with open(self.path, "rb") as f:
+            f.seek(entry["offset"] + FRAME_HEADER.size)
+            return CapturedExchange.decode(f.read(entry["size"]))
+
+    def latest(self, url: str) -> Optional[CapturedExchange]:
+        """Most recent capture of exactly this URL"""
+        with self._lock:
+            position = self._by_url.get(url)
+            entry = self._entries[position] if position is not None else None
+        return self._read(entry) if entry else None
+
+    def latest_for_path(self, path: str) -> Optional[CapturedExchange]:
+        """Most recent capture of this path and query on any instance"""
+        with self._lock:
+            position = self._by_path.get(path)
+            entry = self._entries[position] if position is not None else None
+        return self._read(entry) if entry else None
+
+    def __iter__(self) -> Iterator[CapturedExchange]:
+        with self._lock:
+            entries = list(self._entries)
+        for entry in entries:
+            yield self._read(entry)
+
+
+_archives: Dict[str, CaptureArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def open_archive(path: str) -> CaptureArchive:
+    """Return the process-wide handle for an archive path"""
+    path = os.path.abspath(path)
+    with _archives_lock:
+        archive = _archives.get(path)
+        if archive is None:
+            archive = _archives[path] = CaptureArchive(path)
+        return archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a captured traffic archive")
+    parser.add_argument("command", choices=["list", "stats"], help="list every exchange, or summarise the archive")
+    parser.add_argument("archive", help="Archive file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        print(f"❌ No archive at {args.archive}", file=sys.stderr)
+        sys.exit(1)
+    archive = CaptureArchive(args.archive)
+
+    if args.command == "list":
+        for exchange in archive:
+            print(f"{exchange.status_code}  {len(exchange.body):>9,} B  {exchange.elapsed * 1000:8.1f} ms  {exchange.url}")
+        return
+
+    raw = 0
+    statuses: Dict[int, int] = {}
+    for exchange in archive:
+        raw += len(exchange.body)
+        statuses[exchange.status_code] = statuses.get(exchange.status_code, 0) + 1
+    stored = os.path.getsize(args.archive)
+    print(f"Exchanges: {len(archive)} ({len(archive._by_url)} distinct URLs)")
+    print(f"Statuses: {', '.join(f'{code}: {count}' for code, count in sorted(statuses.items()))}")
+    print(f"Bodies: {raw:,} B raw, archive {stored:,} B ({stored / raw:.0%})" if raw else f"Archive: {stored:,} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Quiet channel handle resolution for the bulk tools
+
+find_channel_id.py and test_channel.py print their progress for a human;
+the functions here do the same lookup without output so they can be used
+by tools that write machine-readable results to stdout.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+from find_channel_id import extract_handle
+from instance_health import HealthStore, get_store
+from invidious_http import INVIDIOUS_INSTANCES
+from rate_limit import InstanceRateLimiter, pick_instance
+from resolution_cache import ResolutionCache, channel_handle, get_cache, is_channel_result, normalise_handle, pick_channel
+from streaming_json import iter_search_channels
+
+CHANNEL_ID_PATTERN = re.compile(r"(UC[0-9A-Za-z_-]{22})")
+
+# Handles resolved at once in bulk mode
+BULK_WORKERS = 16
+
+
+@dataclass
+class ResolvedHandle:
+    """
+    Bulk resolution outcome for one handle
+
+    source is "cache", "search" (its own search), "shared" (found in the
+    results of another handle's search) or "failed" (no instance answered).
+    channel_id is None when the handle was not found or the lookup failed.
+    """
+    handle: str
+    channel_id: Optional[str]
+    author: Optional[str]
+    source: str
+
+
+def parse_channel_ref(value: str) -> Tuple[str, str]:
+    """
+    Classify a roster entry as a channel ID or a handle
+
+    Accepts channel IDs, /channel/UC... URLs, @handles, bare handles and
+    youtube.com/@handle URLs.
+
+    Returns:
+        ("id", channel_id) or ("handle", handle_without_at)
+    """
+    value = value.strip()
+    match = CHANNEL_ID_PATTERN.search(value)
+    if match and (value == match.group(1) or "/channel/" in value):
+        return ("id", match.group(1))
+    return ("handle", extract_handle(value) or value)
+
+
+def search_channels(
+    handle: str,
+    instances: List[str],
+    store: HealthStore,
+    limiter: InstanceRateLimiter,
+) -> Optional[List[dict]]:
+    """
+    Read every channel result of a handle search, failing over across instances
+
+    Returns:
+        The channel results (possibly empty), or None if no instance answered
+    """
+    import requests
+
+    ranked = store.ranked(instances, include_throttled=True)
+    tried: Set[str] = set()
+    path = f"/api/v1/search?q={quote(handle)}&type=channel"
+    while True:
+        instance = pick_instance(ranked, tried, limiter)
+        if instance is None:
+            return None
+        tried.add(instance)
+        try:
+            status, channels = store.get_json(
+                instance, path, lambda response: list(iter_search_channels(response, where=is_channel_result)))
+        except (requests.exceptions.RequestException, ValueError):
+            # Recorded by the store; ValueError is a wrong payload shape or truncated body
+            continue
+        if status == 200:
+            return channels
+
+
+def resolve_handles(
+    handles: Iterable[str],
+    instances: List[str] = INVIDIOUS_INSTANCES,
+    store: Optional[HealthStore] = None,
+    limiter: Optional[InstanceRateLimiter] = None,
+    cache: Optional[ResolutionCache] = None,
+    workers: int = BULK_WORKERS,
+    on_result: Optional[Callable[[ResolvedHandle], None]] = None,
+) -> Dict[str, ResolvedHandle]:
+    """
+    Resolve many handles concurrently with as few searches as possible
+
+    Handles are normalised and de-duplicated, cached answers are used
+    as-is, and the rest are searched concurrently across the healthy
+    instances. Every search result whose channelHandle is another pending
+    handle resolves that handle too, so its own search is skipped if it has
+    not started yet.
+
+    Args:
+        handles: Handles, with or without @
+        instances: Candidate instance URLs
+        store: Health store used for ranking and outcome tracking
+        limiter: Per-instance rate limiter
+        cache: Handle cache (defaults to the shared on-disk cache)
+        workers: Searches in flight at once
+        on_result: Called (from worker threads) as each handle is settled
+
+    Returns:
+        Normalised handle -> ResolvedHandle, in input order
+    """
+    cache = cache or get_cache()
+    store = store or get_store()
+    limiter = limiter or InstanceRateLimiter()
+    keys = list(dict.fromkeys(normalise_handle(h) for h in handles))
+    results: Dict[str, ResolvedHandle] = {}
+    lock = threading.Lock()
+
+    def settle(result: ResolvedHandle):
+        results[result.handle] = result
+        if on_result:
+            on_result(result)
+
+    for key, entry in cache.get_many(keys).items():
+        settle(ResolvedHandle(key, entry.channel_id, entry.author, "cache"))
+    pending = {key for key in keys if key not in results}
+
+    def work(key: str):
+        with lock:
+            if key not in pending:
+                return  # already found in another handle's search
+        channels = search_channels(key, instances, store, limiter)
+        if channels is None:
+            with lock:
+                if key in pending:
+                    pending.discard(key)
+                    settle(ResolvedHandle(key, None, None, "failed"))
+            return
+
+        own = pick_channel(channels, key)
+        with lock:
+            for channel in channels:
+                other = channel_handle(channel)
+                if other != key and other in pending:
+                    pending.discard(other)
+                    cache.put(other, channel["authorId"], channel.get("author"))
+                    settle(ResolvedHandle(other, channel["authorId"], channel.get("author"), "shared"))
+            if key in pending:
+                pending.discard(key)
+                channel_id = own["authorId"] if own else None
+                author = own.get("author") if own else None
+                # A valid answer without a channel is final - other instances search the same index
+                cache.put(key, channel_id, author)
+                settle(ResolvedHandle(key, channel_id, author, "search"))
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            # Input order, so earlier searches can settle later handles
+            list(executor.map(work, [key for key in keys if key in pending]))
+    return {key: results[key] for key in keys}
+
+
+def resolve_handle(
+    handle: str,
+    instances: List[str] = INVIDIOUS_INSTANCES,
+    store: Optional[HealthStore] = None,
+    limiter: Optional[InstanceRateLimiter] = None,
+    cache: Optional[ResolutionCache] = None,
+) -> Optional[str]:
+    """
+    Resolve a channel handle to its channel ID via Invidious search
+
+    Cached results (including cached misses) are returned without a request.
+    The search goes through search_channels(), so it fails over and takes
+    rate limiter tokens the same way as the bulk resolution.
+
+    Args:
+        handle: Channel handle, with or without @
+        instances: Candidate instance URLs
+        store: Health store used for ranking and outcome tracking
+        limiter: Per-instance rate limiter (default: one at DEFAULT_RATE)
+        cache: Handle cache (defaults to the shared on-disk cache)
+
+    Returns:
+        Channel ID if found, None otherwise
+    """
+    cache = cache or get_cache()
+    handle = handle.lstrip("@")
+    cached = cache.get(handle)
+    if cached:
+        return cached.channel_id
+
+    store = store or get_store()
+    channels = search_channels(handle, instances, store, limiter or InstanceRateLimiter(store=store))
+    if channels is None:
+        # Every instance failed - don't cache that as "not found"
+        return None
+    # A valid answer without a channel is final - other instances search the same index
+    channel = pick_channel(channels, handle)
+    if channel:
+        cache.put(handle, channel["authorId"], channel.get("author"))
+        return channel["authorId"]
+    cache.put(handle, None)
+    return None
@@ -0,0 +1,40 @@
+"""
+pytest configuration
+
+test_channel.py, test_invidious_channel.py and test_sc6_channel.py probe
+live Invidious instances and are run by hand (or through invidious_cli.py),
+so only the offline unit tests are collected. FakeResponse is shared by
+the tests that feed canned bodies through HealthStore or streaming_json.
+
+Usage:
+    python -m pytest -q
+"""
+
+import io
+import json
+
+collect_ignore = ["test_channel.py", "test_invidious_channel.py", "test_sc6_channel.py"]
+
+
+class FakeResponse:
+    """Just enough of a requests response for HealthStore and streaming_json"""
+
+    def __init__(self, status_code=200, body=b"{}", headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = body
+        self.raw = io.BytesIO(body)
+        self.closed = False
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        while True:
+            chunk = self.raw.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def json(self, **kwargs):
+        return json.loads(self.content, **kwargs)
+
+    def close(self):
+        self.closed = True
@@ -1,34 +1,40 @@
-import requests
 import json
 
-instance = "https://y.com.sb"
+import invidious_http
+from hedged_fetch import fetch_channel_streams
+
+INSTANCES = [
+    "https://y.com.sb",
+    "https://invidious.slipfox.xyz",
+    "https://invidious.projectsegfau.lt",
+    "https://invidious.privacyredirect.com",
+]
 channel_id = "UCJ0Y3WUgX0eqgQ76mz1PaFA"  # SoulCalibur VI Game Channel
-url = f"{instance}/api/v1/channels/{channel_id}/streams"
 
 
 
-print(f"Testing {url}")
+print(f"Testing /api/v1/channels/{channel_id}/streams")
 try:
-    response = requests.get(url, headers={"Accept": "application/json"}, timeout=15)
-    print(f"Status: {response.status_code}")
-    if response.status_code == 200:
-        data = response.json()
-        videos = []
-        if isinstance(data, list):
-            videos = data
-        elif isinstance(data, dict) and 'videos' in data:
-            videos = data['videos']
+    # Only the first video is inspected, so stop parsing after it
+    result = fetch_channel_streams(channel_id, INSTANCES, verbose=True, limit=1)
+    if result:
+        instance = result.instance
+        videos = result.data
+        print(f"Winner: {instance} ({result.elapsed:.2f}s)")
             
         if videos:
             first_video = videos[0]
-            video_id = first_video.get('videoId')
+            video_id = first_video.video_id
             print(f"First video ID: {video_id}")
-            print(f"Title: {first_video.get('title')}")
+            print(f"Title: {first_video.title}")
             
-            # Fetch video details
+            # Fetch video details from the winning instance (warm connection).
+            # Cached for a minute, so re-running right away skips the request.
             video_url = f"{instance}/api/v1/videos/{video_id}"
             print(f"Fetching details: {video_url}")
-            v_resp = requests.get(video_url, headers={"Accept": "application/json"}, timeout=15)
+            v_resp = invidious_http.get(video_url, cache=True)
+            if getattr(v_resp, "cache_status", None) in ("hit", "revalidated"):
+                print(f"(served from local cache: {v_resp.cache_status})")
             if v_resp.status_code == 200:
                 v_data = v_resp.json()
                 print("Video Details:")
@@ -44,6 +50,6 @@ try:
 
 
     else:
-        print(response.text[:500])
+        print("No instance returned a valid streams listing")
 except Exception as e:
     print(f"Error: {e}")
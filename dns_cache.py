@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+DNS pre-resolution and dead-host pruning for Invidious instances
+
+Several public instances have stopped resolving or refuse connections, and
+without a pre-flight step every script only finds that out by spending a
+full connection attempt per instance. This module:
+
+- resolves hostnames concurrently and caches the addresses for their DNS
+  TTL (read with dnspython when it is installed, otherwise DEFAULT_TTL).
+  Hosts the resolver reports as unknown, or as having no addresses, are
+  cached for NEGATIVE_TTL; timeouts and temporary resolver failures are
+  not cached and do not count against the instance
+- serves those cached addresses to the shared HTTP client (invidious_http),
+  so new connections skip the lookup and known-dead names fail at once.
+  The httpx (HTTP/2) backend does its own resolution and skips the cache
+- checks that each instance accepts a TCP connection, and prunes the ones
+  that fail to resolve or refuse before any HTTP request is sent
+
+The cache is kept in dns_cache.json by default; override the path with
+INVIDIOUS_DNS_CACHE.
+
+Usage:
+    python dns_cache.py                      # check the default instances
+    python dns_cache.py https://yewtu.be https://y.com.sb
+"""
+
+import argparse
+import atexit
+import ipaddress
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import dns.resolver
+except ImportError:
+    dns = None
+
+DNS_CACHE_FILE = os.environ.get("INVIDIOUS_DNS_CACHE", "dns_cache.json")
+
+# Seconds a resolution is kept when the record's own TTL is unknown
+DEFAULT_TTL = 300
+
+# Bounds applied to TTLs reported by DNS
+MIN_TTL = 30
+MAX_TTL = 3600
+
+# Seconds a failed resolution is remembered
+NEGATIVE_TTL = 120
+
+# getaddrinfo errors that are answers about the name (unknown, or no
+# addresses); EAI_NODATA is missing on some platforms
+NEGATIVE_ERRORS = tuple(e for e in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", None)) if e is not None)
+
+# Hostnames resolved at once
+RESOLVE_WORKERS = 16
+
+# Seconds the whole pre-flight (DNS, then TCP) may take per stage
+PREFLIGHT_TIMEOUT = 3.0
+
+
+@dataclass
+class HostRecord:
+    """
+    Cached resolution of one hostname; addresses is empty for failures
+
+    transient marks a failure that says nothing about the host (a timeout
+    or a temporary resolver error); such records are never cached.
+    """
+    host: str
+    addresses: List[List[Any]] = field(default_factory=list)  # [family, ip, *extra sockaddr fields]
+    expires_at: float = 0.0
+    error: Optional[str] = None
+    transient: bool = False
+
+    @property
+    def resolved(self) -> bool:
+        return bool(self.addresses)
+
+    def fresh(self, now: Optional[float] = None) -> bool:
+        return self.expires_at > (now if now is not None else time.time())
+
+    def addrinfo(self, port: int) -> List[Tuple]:
+        """The addresses in socket.getaddrinfo format"""
+        return [
+            (family, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (ip, port, *extra))
+            for family, ip, *extra in self.addresses
+        ]
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def _record_ttl(host: str) -> int:
+    """TTL of the host's A record, or DEFAULT_TTL when it cannot be read"""
+    if dns is None or _is_ip(host):
+        return DEFAULT_TTL
+    try:
+        answer = dns.resolver.resolve(host, "A", lifetime=PREFLIGHT_TIMEOUT)
+    except Exception:
+        return DEFAULT_TTL
+    return max(MIN_TTL, min(MAX_TTL, answer.rrset.ttl))
+
+
+class DnsCache:
+    """
+    Thread-safe, file-backed hostname → addresses cache
+
+    Resolution always goes through the system resolver (so /etc/hosts and
+    search domains behave as usual); dnspython is only used to read TTLs.
+
+    Args:
+        path: JSON file the cache is loaded from and saved to
+        negative_ttl: Seconds a failed resolution is remembered
+    """
+
+    def __init__(self, path: str = DNS_CACHE_FILE, negative_ttl: float = NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._records: Dict[str, HostRecord] = {}
+        self.load()
+
+    def load(self):
+        """Load records from disk, ignoring a missing or corrupt file"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for item in data.get("hosts", []):
+                try:
+                    record = HostRecord(**item)
+                except TypeError:
+                    continue
+                self._records[record.host] = record
+
+    def save(self):
+        """Write unexpired records to disk atomically"""
+        now = time.time()
+        with self._lock:
+            data = {
+                "updated": now,
+                "hosts": [asdict(r) for r in self._records.values() if r.fresh(now)],
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, host: str) -> Optional[HostRecord]:
+        """The cached record for a host, if it has not expired"""
+        with self._lock:
+            record = self._records.get(host)
+        return record if record is not None and record.fresh() else None
+
+    def resolve(self, host: str) -> HostRecord:
+        """Return the cached record for a host, resolving it if needed"""
+        record = self.lookup(host)
+        if record is not None:
+            return record
+        try:
+            infos = socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if e.errno not in NEGATIVE_ERRORS:
+                # EAI_AGAIN and friends: the resolver failed, not the name
+                return HostRecord(host, error=str(e), transient=True)
+            record = HostRecord(host, expires_at=time.time() + self.negative_ttl, error=str(e))
+        else:
+            addresses = list(dict.fromkeys(
+                (family, sockaddr[0], *sockaddr[2:]) for family, _, _, _, sockaddr in infos
+            ))
+            record = HostRecord(host, [list(a) for a in addresses], time.time() + _record_ttl(host))
+        if _is_ip(host):
+            return record  # nothing to cache for a literal address
+        with self._lock:
+            self._records[host] = record
+        return record
+
+    def resolve_many(self, hosts: Iterable[str], timeout: float = PREFLIGHT_TIMEOUT) -> Dict[str, HostRecord]:
+        """
+        Resolve many hostnames concurrently
+
+        Args:
+            hosts: Hostnames to resolve
+            timeout: Seconds to wait for all of them
+
+        Returns:
+            Host -> record. A host still resolving at the deadline gets an
+            uncached, transient failure record.
+        """
+        hosts = list(dict.fromkeys(hosts))
+        results = {host: record for host in hosts if (record := self.lookup(host)) is not None}
+        pending = [host for host in hosts if host not in results]
+        if not pending:
+            return results
+
+        executor = ThreadPoolExecutor(max_workers=min(RESOLVE_WORKERS, len(pending)))
+        futures = {executor.submit(self.resolve, host): host for host in pending}
+        done, _ = wait(futures, timeout=timeout)
+        # Slow lookups finish in the background and still land in the cache
+        executor.shutdown(wait=False)
+        for future, host in futures.items():
+            if future in done:
+                results[host] = future.result()
+            else:
+                results[host] = HostRecord(host, error=f"resolution took longer than {timeout:g}s", transient=True)
+        return results
+
+    def getaddrinfo(self, host: str, port: int) -> List[Tuple]:
+        """
+        socket.getaddrinfo replacement for TCP connections, served from the cache
+
+        Raises:
+            socket.gaierror if the host did not resolve (possibly cached);
+            EAI_AGAIN when the failure was transient
+        """
+        if _is_ip(host):
+            return socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        record = self.resolve(host)
+        if not record.resolved:
+            if record.transient:
+                raise socket.gaierror(socket.EAI_AGAIN, record.error or "Temporary failure in name resolution")
+            raise socket.gaierror(socket.EAI_NONAME, record.error or "Name or service not known")
+        return record.addrinfo(port)
+
+
+def instance_address(instance: str) -> Tuple[str, int]:
+    """Hostname and port of an instance URL"""
+    parts = urlsplit(instance)
+    return parts.hostname or "", parts.port or (443 if parts.scheme == "https" else 80)
+
+
+def check_tcp(record: HostRecord, port: int, timeout: float = PREFLIGHT_TIMEOUT) -> Optional[str]:
+    """
+    Try a TCP connection to each of the host's addresses in turn
+
+    Returns:
+        None if one accepted, otherwise a short reason
+    """
+    error = "no addresses"
+    deadline = time.monotonic() + timeout
+    for family, _, _, _, sockaddr in record.addrinfo(port):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return "connect timed out"
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(remaining)
+        try:
+            sock.connect(sockaddr)
+            return None
+        except socket.timeout:
+            error = "connect timed out"
+        except ConnectionRefusedError:
+            error = "connection refused"
+        except OSError as e:
+            error = e.strerror or str(e)
+        finally:
+            sock.close()
+    return error
+
+
+@dataclass
+class PreflightResult:
+    """Instances that passed the pre-flight and why the others were dropped"""
+    alive: List[str]
+    dead: Dict[str, str]
+    elapsed: float
+
+
+def _proxied() -> bool:
+    """Direct TCP checks say nothing about reachability through a proxy"""
+    proxies = urllib.request.getproxies()
+    return bool(proxies.get("http") or proxies.get("https"))
+
+
+def preflight(
+    instances: List[str],
+    store=None,
+    cache: Optional[DnsCache] = None,
+    tcp: bool = True,
+    timeout: float = PREFLIGHT_TIMEOUT,
+) -> PreflightResult:
+    """
+    Drop instances that cannot answer before any HTTP work starts
+
+    All hostnames are resolved concurrently, then every resolved instance
+    gets one concurrent TCP connection attempt. Only a name the resolver
+    reports as unknown drops an instance at the DNS stage; one whose lookup
+    timed out or failed temporarily is kept (without a TCP check) and left
+    to the HTTP client. Skipped entirely in replay mode, and the TCP stage
+    is skipped when a proxy is configured.
+
+    Args:
+        instances: Instance URLs, in the caller's order
+        store: Health store to record failures in (optional)
+        cache: DNS cache to use (default: the process-wide one)
+        tcp: Also require the instance to accept a TCP connection
+        timeout: Seconds allowed for each stage
+
+    Returns:
+        PreflightResult with the surviving instances in their original order
+    """
+    from capture_archive import REPLAY_FILE
+
+    started = time.monotonic()
+    if REPLAY_FILE:
+        return PreflightResult(list(instances), {}, 0.0)
+
+    cache = cache or get_dns_cache()
+    addresses = {instance: instance_address(instance) for instance in instances}
+    records = cache.resolve_many((host for host, _ in addresses.values()), timeout)
+
+    dead: Dict[str, str] = {}
+    for instance, (host, _) in addresses.items():
+        if not records[host].resolved and not records[host].transient:
+            dead[instance] = f"dns: {records[host].error}"
+            if store is not None:
+                store.record_failure(instance, "dns")
+
+    if tcp and not _proxied():
+        reachable = [i for i in instances if i not in dead and records[addresses[i][0]].resolved]
+        if reachable:
+            with ThreadPoolExecutor(max_workers=min(RESOLVE_WORKERS, len(reachable))) as executor:
+                futures = {
+                    instance: executor.submit(check_tcp, records[addresses[instance][0]], addresses[instance][1], timeout)
+                    for instance in reachable
+                }
+            for instance, future in futures.items():
+                error = future.result()
+                if error:
+                    dead[instance] = f"tcp: {error}"
+                    if store is not None:
+                        store.record_failure(instance, "connection")
+
+    return PreflightResult([i for i in instances if i not in dead], dead, time.monotonic() - started)
+
+
+def prune_instances(instances: List[str], store=None, log=None) -> List[str]:
+    """
+    Run the pre-flight and return the instances worth using
+
+    Args:
+        instances: Instance URLs
+        store: Health store to record failures in (optional)
+        log: Callable given one line per dropped instance (optional)
+    """
+    result = preflight(instances, store)
+    if log:
+        for instance, reason in result.dead.items():
+            log(f"  [SKIP] {instance}: {reason}")
+    return result.alive
+
+
+_cache: Optional[DnsCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_dns_cache() -> DnsCache:
+    """Return the process-wide cache, saved automatically at exit"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DnsCache()
+                atexit.register(_cache.save)
+    return _cache
+
+
+def main():
+    from invidious_http import INVIDIOUS_INSTANCES
+
+    parser = argparse.ArgumentParser(description="Resolve Invidious instances and check they accept connections")
+    parser.add_argument("instances", nargs="*", help="Instance URLs (default: the built-in list)")
+    parser.add_argument("--no-tcp", action="store_true", help="Only resolve hostnames")
+    parser.add_argument("--timeout", type=float, default=PREFLIGHT_TIMEOUT,
+                        help=f"Seconds allowed per stage (default: {PREFLIGHT_TIMEOUT:g})")
+    args = parser.parse_args()
+
+    instances = args.instances or INVIDIOUS_INSTANCES
+    cache = get_dns_cache()
+    result = preflight(instances, cache=cache, tcp=not args.no_tcp, timeout=args.timeout)
+    for instance in instances:
+        record = cache.lookup(instance_address(instance)[0])
+        if instance in result.dead:
+            print(f"❌ {instance}: {result.dead[instance]}")
+        else:
+            ips = ", ".join(a[1] for a in record.addresses) if record else "?"
+            ttl = f"{record.expires_at - time.time():.0f}s" if record else "-"
+            print(f"✅ {instance}: {ips} (ttl {ttl})")
+    print(f"\n{len(result.alive)}/{len(instances)} usable, checked in {result.elapsed:.2f}s")
+    sys.exit(0 if result.alive else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an Invidious instance
+
+Serves the API endpoints the scripts use so they can be run, measured and
+regression-tested without the public instances:
+
+    /api/v1/channels/{id}              channel document with latestVideos
+    /api/v1/channels/{id}/streams      streams listing (?continuation= for later pages)
+    /api/v1/channels/{id}/videos       videos listing (?continuation= for later pages)
+    /api/v1/videos/{id}                video details
+    /api/v1/search?q=...&type=channel  channel search
+    /api/v1/search?q=...&type=video    video search (&page= for later pages)
+
+Responses come from a capture archive (capture_archive.py) or a fixtures
+directory (the request path plus ".json", e.g.
+fixtures/api/v1/channels/UC.../streams.json) when one is given, and are
+generated deterministically from the channel/video ID otherwise, so every
+run of a benchmark sees the same data.
+
+Faults can be injected per server: added latency with jitter, a share of
+5xx answers, a share of 429 answers with Retry-After, and the listing shape
+("list", "object" for {"videos": [...]}, or "mixed" per channel). DNS
+failures are client-side by nature; use unresolvable_instances() to add
+instance URLs that can never resolve.
+
+Usage:
+    python fake_invidious.py --port 3000 --latency 80 --error-rate 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from capture_archive import open_archive
+
+# Entries per generated listing
+VIDEOS_PER_CHANNEL = 30
+
+# Share of generated channels that have a live stream at the top of /streams
+LIVE_SHARE = 0.2
+
+# Pages per generated listing; only the object shape can carry the
+# continuation token, so bare-list listings end after the first page
+LISTING_PAGES = 3
+
+# Channels whose ID starts with this list nothing but live streams, on
+# every page, like a channel running many streams at once
+MULTI_LIVE_PREFIX = "UCmultilive"
+
+# Channel results per generated search answer (the first one is the match)
+SEARCH_RESULTS = 5
+
+# Video results per generated video search page, and pages before results run out
+SEARCH_VIDEO_RESULTS = 20
+SEARCH_VIDEO_PAGES = 3
+
+# Titles of generated video search results; "{q}" is the query, and the
+# off-topic ones stand for the loose matches real searches return
+SEARCH_TITLES = ("{q} ranked grind", "【{Q}】 online lobbies", "{Q} - casuals with viewers",
+                 "Daily stream: {q} and chill", "Retro games marathon", "Just chatting")
+
+# Generated video IDs of live streams start with this, so /videos/{id}
+# agrees with the listing that produced the ID
+LIVE_PREFIX = "live"
+
+ID_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ-_"
+
+FORMATS = ("list", "object", "mixed")
+
+
+def _digest(value: str) -> bytes:
+    return hashlib.sha256(value.encode("utf-8")).digest()
+
+
+def _rng(value: str) -> random.Random:
+    return random.Random(int.from_bytes(_digest(value)[:8], "big"))
+
+
+def channel_id_for(name: str) -> str:
+    """Deterministic UC... channel ID for a handle or name"""
+    digest = _digest(name.lower().lstrip("@"))
+    return "UC" + "".join(ID_ALPHABET[b % 64] for b in digest[:22])
+
+
+def unresolvable_instances(count: int) -> List[str]:
+    """Instance URLs under the reserved .invalid TLD, which never resolve"""
+    return [f"http://fake-invidious-{i}.invalid" for i in range(count)]
+
+
+def _thumbnails(video_id: str) -> List[Dict[str, Any]]:
+    return [
+        {"quality": quality, "url": f"https://i.ytimg.com/vi/{video_id}/{quality}.jpg", "width": w, "height": h}
+        for quality, w, h in (("maxres", 1280, 720), ("high", 480, 360), ("medium", 320, 180), ("default", 120, 90))
+    ]
+
+
+def make_video(channel_id: str, index: int, live: bool = False, now: Optional[float] = None) -> Dict[str, Any]:
+    """Generate one listing entry"""
+    rng = _rng(f"{channel_id}/{index}")
+    now = now or time.time()
+    video_id = "".join(rng.choice(ID_ALPHABET) for _ in range(11))
+    if live:
+        video_id = LIVE_PREFIX + video_id[len(LIVE_PREFIX):]
+    age = 90 if live else 3600 * (index + 1) * rng.randint(2, 30)
+    if age < 3600:
+        published_text = f"{age // 60} minutes ago"
+    elif age < 86400:
+        published_text = f"{age // 3600} hours ago"
+    else:
+        published_text = f"{age // 86400} days ago"
+    return {
+        "type": "video",
+        "title": f"Generated video {index} of {channel_id}",
+        "videoId": video_id,
+        "author": f"Channel {channel_id[-6:]}",
+        "authorId": channel_id,
+        "authorUrl": f"/channel/{channel_id}",
+        "videoThumbnails": _thumbnails(video_id),
+        "description": "Lorem ipsum dolor sit amet " * rng.randint(1, 8),
+        "viewCount": rng.randint(0, 50000) if live else rng.randint(100, 2_000_000),
+        "published": int(now - age),
+        "publishedText": published_text,
+        "lengthSeconds": 0 if live else rng.randint(60, 7200),
+        "liveNow": live,
+        "isUpcoming": False,
+    }
+
+
+class FakeData:
+    """
+    Response source: recorded responses first, generated data otherwise
+
+    Args:
+        fixtures: Directory holding recorded responses (optional)
+        archive: Capture archive to serve recorded exchanges from (optional)
+        listing_format: "list", "object" or "mixed"
+        videos_per_channel: Entries per generated listing
+    """
+
+    def __init__(self, fixtures: Optional[str] = None, listing_format: str = "mixed",
+                 videos_per_channel: int = VIDEOS_PER_CHANNEL, archive: Optional[str] = None):
+        if listing_format not in FORMATS:
+            raise ValueError(f"listing_format must be one of {FORMATS}")
+        self.fixtures = fixtures
+        self.archive = open_archive(archive) if archive else None
+        self.listing_format = listing_format
+        self.videos_per_channel = videos_per_channel
+
+    def recorded(self, target: str) -> Optional[Tuple[int, bytes]]:
+        """Status and body of the latest captured exchange for a request target"""
+        if self.archive is None:
+            return None
+        exchange = self.archive.latest_for_path(target)
+        return (exchange.status_code, exchange.body) if exchange else None
+
+    def fixture(self, path: str) -> Optional[Any]:
+        """Recorded JSON for a request path, or None (also for paths leaving the fixtures directory)"""
+        if not self.fixtures:
+            return None
+        root = os.path.realpath(self.fixtures)
+        file_path = os.path.realpath(os.path.join(root, path.lstrip("/") + ".json"))
+        if os.path.commonpath([root, file_path]) != root or not os.path.isfile(file_path):
+            return None
+        with open(file_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def is_live(self, channel_id: str) -> bool:
+        return _rng(channel_id + "/live").random() < LIVE_SHARE
+
+    def listing(self, channel_id: str, continuation: Optional[str] = None) -> Any:
+        page = int(continuation[len("page-"):]) if continuation and continuation.startswith("page-") else 0
+        multi_live = channel_id.startswith(MULTI_LIVE_PREFIX)
+        first = page * self.videos_per_channel
+        videos = [
+            make_video(channel_id, i, live=multi_live or (i == 0 and self.is_live(channel_id)))
+            for i in range(first, first + self.videos_per_channel)
+        ]
+        shape = self.listing_format
+        if shape == "mixed":
+            shape = "object" if _digest(channel_id)[0] % 2 else "list"
+        if shape != "object":
+            return videos
+        return {"videos": videos, "continuation": f"page-{page + 1}" if page + 1 < LISTING_PAGES else None}
+
+    def channel(self, channel_id: str) -> Dict[str, Any]:
+        listing = self.listing(channel_id)
+        videos = listing["videos"] if isinstance(listing, dict) else listing
+        return {
+            "author": f"Channel {channel_id[-6:]}",
+            "authorId": channel_id,
+            "authorUrl": f"/channel/{channel_id}",
+            "subCount": _rng(channel_id).randint(10, 5_000_000),
+            "description": "Generated channel",
+            "latestVideos": videos[:10],
+        }
+
+    def video(self, video_id: str) -> Dict[str, Any]:
+        rng = _rng(video_id)
+        live = video_id.startswith(LIVE_PREFIX)
+        return {
+            "type": "video",
+            "videoId": video_id,
+            "title": f"Generated video {video_id}",
+            "liveNow": live,
+            "isUpcoming": False,
+            "published": int(time.time()) - (90 if live else rng.randint(3600, 10_000_000)),
+            "viewCount": rng.randint(0, 100000),
+        }
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        handle = query.strip().lstrip("@")
+        names = [handle] + [f"{handle}{suffix}" for suffix in ("TV", "_official", "Clips", "Fan")]
+        return [
+            {
+                "type": "channel",
+                "author": name,
+                "authorId": channel_id_for(name),
+                "channelHandle": f"@{name}",
+                "subCount": _rng(name).randint(10, 1_000_000),
+                "authorThumbnails": _thumbnails(channel_id_for(name)),
+                "description": "Generated channel",
+            }
+            for name in names[:SEARCH_RESULTS]
+        ]
+
+    def search_videos(self, query: str, page: int = 1) -> List[Dict[str, Any]]:
+        query = query.strip()
+        results = []
+        if not 1 <= page <= SEARCH_VIDEO_PAGES:
+            return results
+        for index in range((page - 1) * SEARCH_VIDEO_RESULTS, page * SEARCH_VIDEO_RESULTS):
+            rng = _rng(f"{query}/search/{index}")
+            channel_id = channel_id_for(f"{query} streamer {rng.randint(0, SEARCH_VIDEO_RESULTS)}")
+            video = make_video(channel_id, index, live=rng.random() < 0.7)
+            video["title"] = rng.choice(SEARCH_TITLES).format(q=query, Q=query.upper())
+            results.append(video)
+        return results
+
+    def answer(self, path: str, query: Dict[str, List[str]]) -> Optional[Any]:
+        """Payload for a request path, or None for 404"""
+        fixture = self.fixture(path)
+        if fixture is not None:
+            return fixture
+        parts = path.strip("/").split("/")
+        if parts[:3] == ["api", "v1", "channels"] and len(parts) == 4:
+            return self.channel(parts[3])
+        if parts[:3] == ["api", "v1", "channels"] and len(parts) == 5 and parts[4] in ("streams", "videos"):
+            return self.listing(parts[3], query.get("continuation", [None])[0])
+        if parts[:3] == ["api", "v1", "videos"] and len(parts) == 4:
+            return self.video(parts[3])
+        if parts == ["api", "v1", "search"]:
+            if query.get("type", ["channel"])[0] == "video":
+                page = query.get("page", ["1"])[0]
+                return self.search_videos(query.get("q", [""])[0], int(page) if page.isdigit() else 1)
+            return self.search(query.get("q", [""])[0])
+        return None
+
+
+class FakeInvidiousServer:
+    """
+    Threaded fake instance listening on localhost
+
+    Args:
+        port: Port to bind (0 picks a free one)
+        latency: Added delay per request in seconds
+        jitter: Random extra delay of up to this many seconds
+        error_rate: Share of requests answered with HTTP 502
+        throttle_rate: Share of requests answered with HTTP 429 + Retry-After
+        data: Response source (defaults to generated data, mixed shapes)
+        seed: Seed for the fault injection
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, data: Optional[FakeData] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.data = data or FakeData()
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _roll(self) -> float:
+        with self._lock:
+            self.requests += 1
+            return self._random.random()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                roll = server._roll()
+                delay = server.latency + (server._random.uniform(0, server.jitter) if server.jitter else 0.0)
+                if delay:
+                    time.sleep(delay)
+
+                if roll < server.error_rate:
+                    self._send(502, {"error": "Injected failure"})
+                    return
+                if roll < server.error_rate + server.throttle_rate:
+                    self._send(429, {"error": "Injected rate limit"}, {"Retry-After": "1"})
+                    return
+
+                recorded = server.data.recorded(self.path)
+                if recorded is not None:
+                    self._send_body(*recorded)
+                    return
+
+                url = urlparse(self.path)
+                payload = server.data.answer(url.path, parse_qs(url.query))
+                if payload is None:
+                    self._send(404, {"error": "Not found"})
+                else:
+                    self._send(200, payload)
+
+            def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+                self._send_body(status, json.dumps(payload).encode("utf-8"), headers)
+
+            def _send_body(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted"""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def start(self) -> "FakeInvidiousServer":
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeInvidiousServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Invidious instance")
+    parser.add_argument("--port", type=int, default=3000, help="Port to listen on (default: 3000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per request in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra latency of up to this many ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 502")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--format", choices=FORMATS, default="mixed",
+                        help="Listing shape: bare list, {\"videos\": [...]} object, or mixed per channel")
+    parser.add_argument("--fixtures", help="Directory of recorded responses (path + .json)")
+    parser.add_argument("--archive", help="Capture archive to serve recorded responses from")
+    args = parser.parse_args()
+
+    server = FakeInvidiousServer(
+        port=args.port,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        data=FakeData(args.fixtures, args.format, archive=args.archive),
+    )
+    print(f"Fake Invidious listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
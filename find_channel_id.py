@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 """
 Find YouTube Channel ID from handle or URL
+
+Bulk mode resolves a whole file of handles and URLs at once and writes a
+CSV or JSON mapping:
+
+    python find_channel_id.py --file handles.txt --output channels.csv
+
+The HTTP stack (requests, the health store, the caches) is only imported
+once a lookup needs the network, so the usage text and the channel ID
+shortcut return without loading it.
 """
 
-import requests
 import sys
 import re
 
@@ -36,39 +44,68 @@ def extract_handle(input_str):
 
 def find_channel_id(handle):
     """Find channel ID from handle using Invidious search"""
+    from dns_cache import prune_instances
+    from instance_health import get_store
+    from resolution_cache import get_cache, is_channel_result, pick_channel
+    from streaming_json import iter_search_channels
+    
     print(f"Searching for: @{handle}\n")
     
-    for instance in INVIDIOUS_INSTANCES:
+    cache = get_cache()
+    cached = cache.get(handle)
+    if cached:
+        if cached.channel_id:
+            print(f"  ✅ Cached: {cached.author or handle} (ID: {cached.channel_id})\n")
+        else:
+            print(f"  ❌ Cached as not found - no instance had results for @{handle}\n")
+        return cached.channel_id
+    
+    health = get_store()
+    instances = health.ranked(INVIDIOUS_INSTANCES)
+    skipped = len(INVIDIOUS_INSTANCES) - len(instances)
+    if skipped:
+        print(f"⏭️  Skipping {skipped} instance(s) with an open circuit breaker\n")
+    
+    # Drop instances that do not resolve or refuse connections before searching
+    instances = prune_instances(instances, health, log=print)
+    
+    answered_empty = False
+    for instance in instances:
         try:
             # Search for the channel
-            url = f"{instance}/api/v1/search?q={handle}&type=channel"
             print(f"Trying {instance}...")
             
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                
-                if isinstance(data, list) and len(data) > 0:
-                    # Show all results
-                    print(f"  ✅ Found {len(data)} result(s):\n")
+            # Every result is read so the exact handle match is found even past
+            # the first few shown; the cache gets the same pick as channel_resolver.
+            # The store records one outcome, after the body has parsed.
+            status, data = health.get_json(
+                instance, f"/api/v1/search?q={handle}&type=channel",
+                lambda response: list(iter_search_channels(response, where=is_channel_result)))
+            if status == 200:
+                if len(data) > 0:
+                    chosen = pick_channel(data, handle)
+                    print(f"  ✅ Showing {min(len(data), 5)} of {len(data)} result(s):\n")
                     
                     for i, channel in enumerate(data[:5], 1):
-                        if channel.get('type') == 'channel':
-                            channel_id = channel.get('authorId')
-                            channel_name = channel.get('author')
-                            subs = channel.get('subCount', 'Unknown')
-                            
-                            print(f"  {i}. {channel_name}")
-                            print(f"     Channel ID: {channel_id}")
-                            print(f"     Subscribers: {subs:,}" if isinstance(subs, int) else f"     Subscribers: {subs}")
-                            print(f"     URL: https://youtube.com/channel/{channel_id}")
-                            print()
+                        channel_id = channel.get('authorId')
+                        channel_name = channel.get('author')
+                        subs = channel.get('subCount', 'Unknown')
+                        
+                        print(f"  {i}. {channel_name}")
+                        print(f"     Channel ID: {channel_id}")
+                        print(f"     Subscribers: {subs:,}" if isinstance(subs, int) else f"     Subscribers: {subs}")
+                        print(f"     URL: https://youtube.com/channel/{channel_id}")
+                        print()
                     
-                    return data[0].get('authorId')
+                    if chosen is not data[0]:
+                        print(f"  ➡️  Using {chosen.get('author')}, whose handle matches @{handle}\n")
+                    cache.put(handle, chosen.get('authorId'), chosen.get('author'))
+                    return chosen.get('authorId')
                 else:
+                    answered_empty = True
                     print(f"  ❌ No results found")
             else:
-                print(f"  ❌ HTTP {response.status_code}")
+                print(f"  ❌ HTTP {status}")
                 
         except Exception as e:
             print(f"  ❌ Error: {str(e)[:50]}")
@@ -76,17 +113,110 @@ def find_channel_id(handle):
         
         print()
     
+    # Only remember a miss if an instance actually answered
+    if answered_empty:
+        cache.put(handle, None)
     return None
 
 
+BULK_FIELDS = ["input", "handle", "channel_id", "author", "source"]
+
+
+def write_mapping(rows, output, fmt):
+    """Write bulk results as CSV or JSON to a file ('-' for stdout)"""
+    import csv
+    import json
+    
+    f = sys.stdout if output == "-" else open(output, "w", encoding="utf-8", newline="")
+    try:
+        if fmt == "json":
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        else:
+            writer = csv.DictWriter(f, fieldnames=BULK_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+def bulk_main(argv):
+    """Resolve every handle in a file concurrently and write the mapping"""
+    import argparse
+    import time
+    
+    # Imported here: channel_resolver imports extract_handle from this module
+    from channel_resolver import BULK_WORKERS, parse_channel_ref, resolve_handles
+    from dns_cache import prune_instances
+    from instance_health import get_store
+    from live_scanner import read_roster
+    from rate_limit import DEFAULT_RATE, InstanceRateLimiter
+    from resolution_cache import normalise_handle
+    
+    parser = argparse.ArgumentParser(prog="find_channel_id.py --file",
+                                     description="Resolve a file of channel handles/URLs to channel IDs")
+    parser.add_argument("--file", required=True, help="File with one handle, URL or channel ID per line ('-' for stdin)")
+    parser.add_argument("--output", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--format", choices=["csv", "json"],
+                        help="Output format (default: from the output file extension, else csv)")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS,
+                        help=f"Searches in flight at once (default: {BULK_WORKERS})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"Requests per second per instance (default: {DEFAULT_RATE})")
+    args = parser.parse_args(argv)
+    fmt = args.format or ("json" if args.output.endswith(".json") else "csv")
+    
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+    
+    # One row per distinct channel, keeping the first way it was written
+    rows = {}
+    for entry in read_roster(args.file):
+        kind, value = parse_channel_ref(entry)
+        key = value if kind == "id" else normalise_handle(value)
+        if key not in rows:
+            rows[key] = {"input": entry, "handle": None if kind == "id" else key,
+                         "channel_id": value if kind == "id" else None, "author": None,
+                         "source": "id" if kind == "id" else None}
+    handles = [row["handle"] for row in rows.values() if row["handle"]]
+    log(f"Resolving {len(handles)} distinct handle(s)...")
+    
+    health = get_store()
+    instances = prune_instances(health.ranked(INVIDIOUS_INSTANCES, include_throttled=True), health, log)
+    started = time.monotonic()
+    results = resolve_handles(handles, instances, health, InstanceRateLimiter(args.rate), workers=args.workers)
+    elapsed = time.monotonic() - started
+    
+    for handle, result in results.items():
+        rows[handle].update(channel_id=result.channel_id, author=result.author, source=result.source)
+    write_mapping(list(rows.values()), args.output, fmt)
+    
+    sources = {}
+    for result in results.values():
+        sources[result.source] = sources.get(result.source, 0) + 1
+    found = sum(1 for result in results.values() if result.channel_id)
+    log(f"✅ {found}/{len(handles)} handle(s) resolved in {elapsed:.1f}s "
+        f"({', '.join(f'{source}: {count}' for source, count in sorted(sources.items()))})")
+    if args.output != "-":
+        log(f"📄 Mapping written to {args.output}")
+    health.save()
+
+
 def main():
+    if "--file" in sys.argv[1:]:
+        bulk_main(sys.argv[1:])
+        return
+    
     if len(sys.argv) < 2:
         print("Usage: python find_channel_id.py <channel_handle_or_url>")
+        print("       python find_channel_id.py --file <handles_file> [--output FILE] [--format csv|json]")
         print("\nExamples:")
         print("  python find_channel_id.py @JingleBells_Gaming")
         print("  python find_channel_id.py JingleBells_Gaming")
         print("  python find_channel_id.py https://youtube.com/@JingleBells_Gaming")
         print("  python find_channel_id.py UCxxxxxxxxxxxxxxxxxxxxxx")
+        print("  python find_channel_id.py --file streamers.txt --output channels.csv")
         return
     
     input_str = sys.argv[1]
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Hedged requests against Invidious instances
+
+Sends a request to the best-ranked instance and, if no valid answer has
+arrived within that instance's p90 latency, fires a backup request at the
+next instance. Whichever valid answer arrives first wins; the other request
+is abandoned (its thread finishes in the background and still reports its
+outcome to the health store). At most two requests are in flight at once,
+and an instance that fails outright is replaced by the next one straight
+away instead of waiting for the hedge timer.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from instance_health import HealthStore, get_store
+from video_entry import iter_entries
+
+# Hedge delay used when an instance has no latency history yet
+DEFAULT_HEDGE_DELAY = 1.5
+
+# Bounds for the p90-based hedge delay
+MIN_HEDGE_DELAY = 0.2
+MAX_HEDGE_DELAY = 5.0
+
+# Requests allowed in flight at once (primary + backup)
+MAX_IN_FLIGHT = 2
+
+
+@dataclass
+class HedgedResult:
+    """Winning answer of a hedged fetch"""
+    instance: str
+    data: Any
+    elapsed: float
+    attempts: int
+
+
+class InvalidPayload(ValueError):
+    """Raised when an instance answers with a payload of the wrong shape"""
+
+
+def hedge_delay(store: HealthStore, instance: str) -> float:
+    """Seconds to wait on an instance before sending a backup request"""
+    p90 = store.latency_p90(instance)
+    if p90 is None:
+        return DEFAULT_HEDGE_DELAY
+    return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, p90))
+
+
+def hedged_get(
+    instances: List[str],
+    path: str,
+    parse: Callable[[Any], Any],
+    store: Optional[HealthStore] = None,
+    verbose: bool = False,
+    stream: bool = False,
+) -> Optional[HedgedResult]:
+    """
+    Fetch a JSON path from the fastest instance that returns a valid payload
+
+    Args:
+        instances: Candidate instance URLs (ranked by the health store)
+        path: Request path starting with /
+        parse: Called with a 200 response; returns the accepted value or
+            raises ValueError to reject the payload
+        store: Health store used for ranking and hedge delays
+        verbose: Print each launch and outcome
+        stream: Request a streamed response so parse can read it incrementally
+
+    Returns:
+        HedgedResult for the first valid answer, or None if every instance failed
+    """
+    store = store or get_store()
+    # Open breakers and throttled instances are left out
+    candidates = iter(store.ranked(instances))
+    started = time.monotonic()
+    attempts = 0
+
+    def fetch(instance: str):
+        # The store records one outcome: a success only once parse accepts the payload
+        try:
+            status, value = store.get_json(instance, path, parse, stream=stream)
+        except InvalidPayload:
+            raise
+        except ValueError as e:
+            raise InvalidPayload(str(e)[:80]) from e
+        if status != 200:
+            raise InvalidPayload(f"HTTP {status}")
+        return value
+
+    executor = ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT)
+    pending = {}
+    hedge_at = None
+
+    def launch() -> bool:
+        nonlocal attempts, hedge_at
+        # Skip instances throttled since the ranking was taken
+        instance = next((i for i in candidates if not store.throttle_remaining(i)), None)
+        if instance is None:
+            return False
+        attempts += 1
+        if verbose:
+            print(f"  → {instance} ({'primary' if attempts == 1 else 'backup'})")
+        pending[executor.submit(fetch, instance)] = instance
+        hedge_at = time.monotonic() + hedge_delay(store, instance)
+        return True
+
+    try:
+        launch()
+        while pending:
+            timeout = None
+            if len(pending) < MAX_IN_FLIGHT and hedge_at is not None:
+                timeout = max(0.0, hedge_at - time.monotonic())
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Primary is slow - race a backup against it
+                if not launch():
+                    hedge_at = None
+                continue
+
+            failed = False
+            for future in done:
+                instance = pending.pop(future)
+                try:
+                    value = future.result()
+                except Exception as e:
+                    failed = True
+                    if verbose:
+                        print(f"  ✗ {instance}: {str(e)[:80]}")
+                    continue
+                if verbose:
+                    print(f"  ✓ {instance} won after {time.monotonic() - started:.2f}s")
+                for loser in pending:
+                    loser.cancel()
+                return HedgedResult(instance, value, time.monotonic() - started, attempts)
+
+            # Replace a failed instance without waiting for the hedge timer
+            if failed:
+                launch()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return None
+
+
+def fetch_channel_streams(
+    channel_id: str,
+    instances: List[str],
+    store: Optional[HealthStore] = None,
+    verbose: bool = False,
+    limit: Optional[int] = None,
+) -> Optional[HedgedResult]:
+    """
+    Hedged fetch of /api/v1/channels/{channel_id}/streams
+
+    The listing is parsed incrementally; the payload shape is checked before
+    any item is accepted, so a wrong-shaped answer never wins the race.
+
+    Args:
+        limit: Stop reading after this many videos
+
+    Returns:
+        HedgedResult whose data is the list of VideoEntry items, or None
+    """
+    return hedged_get(
+        instances,
+        f"/api/v1/channels/{channel_id}/streams",
+        lambda response: list(iter_entries(response, limit=limit)),
+        store=store,
+        verbose=verbose,
+        stream=True,
+    )
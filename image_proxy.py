@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Caching image proxy for stream thumbnails and avatars
+
+Stream cards load thumbnailUrl and profilePictureUrl straight from the
+Twitch, YouTube and Kick CDNs on every page view. This proxy fetches each
+image once and stores it on disk. Every visitor after that is served
+locally, as a pre-resized WebP when Pillow is installed:
+
+    GET /img?u=<image url>&k=thumbnail|avatar&w=<width>
+
+Files are content-addressed: each blob is stored once under its SHA-256,
+however many URLs or variants point at it. An SQLite index maps
+(url, variant) to a blob, with an expiry time and a last-access time.
+Entries expire after THUMBNAIL_TTL / AVATAR_TTL. The cache is bounded by
+total size and evicts least-recently-used entries, deleting a blob once
+nothing refers to it. An expired image whose refetch fails is served
+stale rather than not at all.
+
+Only hosts in ALLOWED_HOSTS (the CDNs next.config.ts allows) are fetched,
+so the proxy cannot be used to reach arbitrary URLs. Redirects are
+followed only to allowed hosts, and a download stops as soon as it
+exceeds MAX_IMAGE_BYTES.
+
+rewrite() points a Stream record at the proxy. It also prefetches any
+image it has not seen before, so by the time a newly live stream reaches
+a visitor its thumbnail is usually already cached. stream_server.py uses
+this with --images.
+
+Pillow is optional (pip install Pillow). Without it, images are served in
+their original size and format.
+
+Settings:
+    IMAGE_CACHE_DIR   cache directory (default image_cache)
+    IMAGE_CACHE_MB    maximum total size in MB (default 256)
+
+Usage:
+    python image_proxy.py --port 8788
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urljoin, urlsplit
+
+import invidious_http
+
+try:
+    from PIL import Image
+
+    # Raised by Image.open for images past Image.MAX_IMAGE_PIXELS; such an
+    # image is unusable rather than a failed fetch
+    UNUSABLE_IMAGE_ERRORS: Tuple[type, ...] = (Image.DecompressionBombError,)
+except ImportError:
+    Image = None
+    UNUSABLE_IMAGE_ERRORS = ()
+
+CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", "image_cache")
+MAX_BYTES = int(float(os.environ.get("IMAGE_CACHE_MB", "256")) * 1024 * 1024)
+
+# Seconds a cached image stays fresh; live thumbnails change, avatars rarely do
+THUMBNAIL_TTL = 300
+AVATAR_TTL = 86400
+
+# Widths served per kind (requests snap up to the next one), and the width
+# rewrite() asks for
+VARIANT_WIDTHS = {"thumbnail": (320, 640), "avatar": (48, 96)}
+DEFAULT_WIDTHS = {"thumbnail": 640, "avatar": 96}
+
+WEBP_QUALITY = 80
+
+# Upstream images larger than this are refused
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+# Redirects followed per fetch, each checked against ALLOWED_HOSTS
+MAX_REDIRECTS = 3
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# URLs remembered by prefetch() so each is fetched once (least recently seen forgotten first)
+SEEN_URLS = 10000
+
+# Images fetched in the background at once by prefetch()
+PREFETCH_WORKERS = 4
+
+# Hosts images may be fetched from; a leading "." matches any subdomain
+ALLOWED_HOSTS = (
+    "static-cdn.jtvnw.net",
+    ".ytimg.com",
+    "yt3.ggpht.com",
+    "yt3.googleusercontent.com",
+    ".kick.com",
+)
+
+KINDS = tuple(VARIANT_WIDTHS)
+ORIGINAL = "original"
+
+
+def is_allowed(url: str) -> bool:
+    """Check that a URL is https on one of ALLOWED_HOSTS"""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme != "https" or not host:
+        return False
+    return any(host.endswith(allowed) if allowed.startswith(".") else host == allowed
+               for allowed in ALLOWED_HOSTS)
+
+
+def variant_width(kind: str, width: Optional[int]) -> Optional[int]:
+    """Snap a requested width to a served one (None serves the original)"""
+    if not width or Image is None:
+        return None
+    widths = VARIANT_WIDTHS[kind]
+    return next((w for w in widths if w >= width), widths[-1])
+
+
+def proxy_url(url: str, kind: str, width: Optional[int] = None) -> str:
+    """Path on the proxy that serves an image"""
+    path = f"/img?u={quote(url, safe='')}&k={kind}"
+    return f"{path}&w={width}" if width else path
+
+
+@dataclass
+class CachedImage:
+    """One stored image variant"""
+    digest: str
+    content_type: str
+    path: str
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest[:16]}"'
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class ImageCache:
+    """
+    Content-addressed, size-bounded LRU image store, safe to share between threads
+
+    Args:
+        directory: Cache directory (blobs plus the index database)
+        max_bytes: Total blob size kept before least-recently-used entries are evicted
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            " url TEXT NOT NULL,"
+            " variant TEXT NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " content_type TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " PRIMARY KEY (url, variant))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS images_lru ON images (last_access)")
+        self._db.commit()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
+
+    def lookup(self, url: str, variant: str) -> Optional[CachedImage]:
+        """Return a stored variant (fresh or not) and mark it as recently used"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, content_type, expires_at FROM images WHERE url = ? AND variant = ?",
+                (url, variant),
+            ).fetchone()
+            if row is None:
+                return None
+            path = self._blob_path(row[0])
+            if not os.path.exists(path):
+                self._db.execute("DELETE FROM images WHERE url = ? AND variant = ?", (url, variant))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE images SET last_access = ? WHERE url = ? AND variant = ?",
+                             (time.time(), url, variant))
+            self._db.commit()
+        return CachedImage(row[0], row[1], path, row[2])
+
+    def store(self, url: str, variant: str, body: bytes, content_type: str, ttl: float) -> CachedImage:
+        """Write a variant's blob (once per content) and index it"""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO images (url, variant, digest, content_type, size, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, variant, digest, content_type, len(body), now + ttl, now),
+            )
+            self._evict(keep=(url, variant))
+            self._db.commit()
+        return CachedImage(digest, content_type, path, now + ttl)
+
+    def _total(self) -> int:
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM images GROUP BY digest)"
+        ).fetchone()[0]
+
+    def _evict(self, keep: Tuple[str, str]):
+        """Drop least-recently-used entries, other than keep, until the size bound holds (lock held)"""
+        total = self._total()
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, variant, digest, size FROM images ORDER BY last_access").fetchall()
+        for url, variant, digest, size in rows:
+            if (url, variant) == keep:
+                continue
+            self._db.execute("DELETE FROM images WHERE url = ? AND variant = ?", (url, variant))
+            if self._db.execute("SELECT 1 FROM images WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+                # Every entry of a blob has its size; the blob counts once
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+            return {"entries": entries, "bytes": self._total(), "max_bytes": self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def resize(body: bytes, width: int) -> bytes:
+    """Scale an image down to width (never up) and encode it as WebP"""
+    with Image.open(io.BytesIO(body)) as image:
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        return out.getvalue()
+
+
+class ImageProxy:
+    """
+    Fetch-once image proxy over an ImageCache
+
+    Args:
+        cache: Image store (default: one in CACHE_DIR)
+        prefetch_workers: Background fetches at once for prefetch()
+    """
+
+    def __init__(self, cache: Optional[ImageCache] = None, prefetch_workers: int = PREFETCH_WORKERS):
+        self.cache = cache or ImageCache()
+        self.fetches = 0
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        # URL -> [fetch lock, threads using it]; dropped when the last one is done
+        self._inflight: Dict[str, List[Any]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, prefetch_workers), thread_name_prefix="image-prefetch")
+
+    @contextmanager
+    def _fetching(self, url: str) -> Iterator[None]:
+        """Hold the URL's fetch lock, shared by every thread asking for it at the moment"""
+        with self._lock:
+            entry = self._inflight.get(url)
+            if entry is None:
+                entry = self._inflight[url] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._inflight[url]
+
+    def _open(self, url: str):
+        """GET an image, following redirects only to allowed hosts"""
+        for _ in range(MAX_REDIRECTS + 1):
+            response = invidious_http.get(url, headers={"Accept": "image/webp,image/*"}, stream=True,
+                                          follow_redirects=False)
+            if response.status_code not in REDIRECT_STATUSES:
+                return response
+            response.close()
+            url = urljoin(url, response.headers.get("Location", ""))
+            if not is_allowed(url):
+                raise ValueError("redirected outside ALLOWED_HOSTS")
+        raise ValueError("too many redirects")
+
+    def _download(self, url: str) -> Tuple[bytes, str]:
+        """
+        Fetch an image from its CDN
+
+        Raises:
+            requests.exceptions.RequestException on transport failure
+            ValueError if the answer is not a usable image
+        """
+        with self._lock:
+            self.fetches += 1
+        response = self._open(url)
+        try:
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+            if response.status_code != 200:
+                raise ValueError(f"HTTP {response.status_code}")
+            if not content_type.startswith("image/"):
+                raise ValueError(f"not an image ({content_type or 'no content type'})")
+            length = response.headers.get("Content-Length", "")
+            if length.isdigit() and int(length) > MAX_IMAGE_BYTES:
+                raise ValueError("image too large")
+            body = bytearray()
+            chunks = invidious_http.iter_chunks(response)
+            try:
+                for chunk in chunks:
+                    body += chunk
+                    if len(body) > MAX_IMAGE_BYTES:
+                        raise ValueError("image too large")
+            finally:
+                chunks.close()
+        finally:
+            response.close()
+        return bytes(body), content_type
+
+    def get(self, url: str, kind: str = "thumbnail", width: Optional[int] = None) -> Optional[CachedImage]:
+        """
+        Return an image variant, fetching and resizing it on a miss
+
+        Concurrent requests for the same URL share one upstream fetch. An
+        expired entry whose refetch fails is returned as is. An image too
+        large to decode safely (a decompression bomb) is treated as
+        unusable: only an earlier variant is returned, never the original.
+
+        Returns:
+            The image, or None if it is not cached and cannot be fetched
+        """
+        import requests
+
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+        width = variant_width(kind, width)
+        variant = f"w{width}.webp" if width else ORIGINAL
+        cached = self.cache.lookup(url, variant)
+        if cached is not None and cached.fresh:
+            return cached
+
+        with self._fetching(url):
+            # Another thread may have fetched it while this one waited
+            cached = self.cache.lookup(url, variant)
+            if cached is not None and cached.fresh:
+                return cached
+            ttl = THUMBNAIL_TTL if kind == "thumbnail" else AVATAR_TTL
+            original = self.cache.lookup(url, ORIGINAL)
+            try:
+                if original is not None and original.fresh:
+                    body, content_type = original.read(), original.content_type
+                else:
+                    body, content_type = self._download(url)
+                    original = self.cache.store(url, ORIGINAL, body, content_type, ttl)
+                if not width:
+                    return original
+                return self.cache.store(url, variant, resize(body, width), "image/webp", ttl)
+            except UNUSABLE_IMAGE_ERRORS:
+                # Never hand out a decompression bomb, not even the original
+                return cached
+            except (requests.exceptions.RequestException, ValueError, OSError):
+                return cached or original
+
+    def prefetch(self, url: Optional[str], kind: str = "thumbnail"):
+        """Fetch an image and its default variant in the background, once per URL per process"""
+        if not url or not is_allowed(url):
+            return
+        with self._lock:
+            if url in self._seen:
+                self._seen.move_to_end(url)
+                return
+            self._seen[url] = None
+            if len(self._seen) > SEEN_URLS:
+                self._seen.popitem(last=False)
+        self._executor.submit(self.get, url, kind, DEFAULT_WIDTHS[kind])
+
+    def rewrite(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Point a Stream record's images at the proxy and prefetch new ones
+
+        Returns:
+            A copy of the record with proxied thumbnailUrl / profilePictureUrl
+        """
+        record = dict(record)
+        for field, kind in (("thumbnailUrl", "thumbnail"), ("profilePictureUrl", "avatar")):
+            url = record.get(field)
+            if url and is_allowed(url):
+                self.prefetch(url, kind)
+                record[field] = proxy_url(url, kind, DEFAULT_WIDTHS[kind])
+        return record
+
+    def respond(self, query: str, if_none_match: Optional[str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Answer a /img request
+
+        Args:
+            query: The request's query string
+            if_none_match: The If-None-Match header, if any
+
+        Returns:
+            (status, headers, body)
+        """
+        params = parse_qs(query)
+        url = params.get("u", [""])[0]
+        kind = params.get("k", ["thumbnail"])[0]
+        width = params.get("w", [""])[0]
+        if not is_allowed(url) or kind not in KINDS or (width and not width.isdigit()):
+            return 400, {"Content-Type": "application/json"}, b'{"error": "Bad image request"}'
+        image = self.get(url, kind, int(width) if width else None)
+        if image is None:
+            return 502, {"Content-Type": "application/json"}, b'{"error": "Image unavailable"}'
+        headers = {
+            "ETag": image.etag,
+            "Cache-Control": f"public, max-age={max(60, int(image.expires_at - time.time()))}",
+        }
+        if if_none_match == image.etag:
+            return 304, headers, b""
+        try:
+            body = image.read()
+        except OSError:
+            # Evicted between lookup and read
+            return 503, {"Content-Type": "application/json", "Retry-After": "1"}, b'{"error": "Image evicted"}'
+        headers["Content-Type"] = image.content_type
+        return 200, headers, body
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def make_handler(proxy: ImageProxy):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            if path.rstrip("/") == "/img":
+                status, headers, body = proxy.respond(query, self.headers.get("If-None-Match"))
+            else:
+                status, headers, body = 404, {"Content-Type": "application/json"}, b'{"error": "Not found"}'
+            self.send_response(status)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve cached, resized stream thumbnails and avatars")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8788, help="Port to listen on (default: 8788)")
+    args = parser.parse_args()
+
+    proxy = ImageProxy()
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(proxy))
+    httpd.daemon_threads = True
+    resized = "WebP variants" if Image is not None else "originals only (install Pillow for WebP variants)"
+    print(f"Image proxy on http://{args.host}:{httpd.server_address[1]}/img, serving {resized}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        proxy.close()
+        proxy.cache.close()
+
+
+if __name__ == "__main__":
+    main()
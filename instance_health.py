@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+Persistent health scoreboard for Invidious instances
+
+Tracks, per instance, an EWMA of response latency, an EWMA success rate,
+the class of the last error and a circuit-breaker state. Lookups ask the
+store for a ranked instance list so the fastest healthy instance is tried
+first and instances with an open breaker are skipped until their cooldown
+has passed. A half-open breaker then lets exactly one trial request through
+and holds everyone else back until that request's outcome is recorded.
+
+Throttling is tracked separately from failures. A 429, or a 503 with
+Retry-After, does not count towards the breaker; it pauses the instance
+for the Retry-After delay, or for a jittered exponential backoff when the
+server gives none. rate_limit.InstanceRateLimiter holds requests back
+until the pause is over. Pauses are saved with the rest of the record, so
+a scan started right after a throttled one still waits.
+
+The store is saved as JSON (instance_health.json by default, override with
+INVIDIOUS_HEALTH_FILE) when the process exits.
+"""
+
+import atexit
+import json
+import os
+import random
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import invidious_http
+
+T = TypeVar("T")
+
+HEALTH_FILE = os.environ.get("INVIDIOUS_HEALTH_FILE", "instance_health.json")
+
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.3
+
+# Consecutive failures before the breaker opens
+FAILURE_THRESHOLD = 3
+
+# Seconds an open breaker waits before letting one trial request through
+OPEN_COOLDOWN = 300
+
+# Seconds a half-open trial may go without an outcome before another
+# caller may take it over (covers a trial that was never sent)
+TRIAL_TIMEOUT = 60
+
+# Recent latency samples kept per instance for percentile estimates
+LATENCY_SAMPLES = 20
+
+# Latency assumed for instances that have never answered, so untested
+# instances rank after known-good ones but before known-bad ones
+UNKNOWN_LATENCY = 5.0
+
+# First pause after a 429 without Retry-After, doubled per repeat, in seconds
+BACKOFF_BASE = 2.0
+
+# Longest pause backoff or Retry-After can impose, in seconds
+BACKOFF_MAX = 600.0
+
+# Extra share of a Retry-After delay added at random, so clients that were
+# throttled together do not all come back at the same moment
+RETRY_AFTER_JITTER = 0.1
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class InstanceHealth:
+    """Health record for a single instance"""
+    instance: str
+    ewma_latency: Optional[float] = None
+    success_rate: float = 1.0
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_error: Optional[str] = None
+    last_checked: Optional[float] = None
+    breaker: str = CLOSED
+    opened_at: Optional[float] = None
+    recent_latencies: List[float] = field(default_factory=list)
+    throttles: int = 0
+    throttle_strikes: int = 0
+    throttled_until: Optional[float] = None
+
+    def score(self) -> float:
+        """Expected cost of trying this instance (lower is better)"""
+        latency = self.ewma_latency if self.ewma_latency is not None else UNKNOWN_LATENCY
+        return latency / max(self.success_rate, 0.05)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency at the given percentile (0-100) of recent samples, if any"""
+        if not self.recent_latencies:
+            return None
+        samples = sorted(self.recent_latencies)
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def add_latency_sample(self, latency: float):
+        """Keep a latency sample, dropping the oldest beyond LATENCY_SAMPLES"""
+        self.recent_latencies.append(round(latency, 4))
+        del self.recent_latencies[:-LATENCY_SAMPLES]
+
+
+def classify_error(error: Optional[BaseException] = None, status_code: Optional[int] = None) -> str:
+    """
+    Reduce an exception or HTTP status to a short error class
+
+    Args:
+        error: Exception raised by the request, if any
+        status_code: HTTP status code, if a response was received
+
+    Returns:
+        One of "dns", "timeout", "connection", "bad_json", "http_<code>" or "error"
+    """
+    import requests
+
+    if error is None:
+        return f"http_{status_code}" if status_code is not None else "error"
+    if isinstance(error, requests.exceptions.Timeout):
+        return "timeout"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        message = str(error)
+        # A temporary resolver failure says nothing about the name, so it
+        # counts like any other connection error instead of opening the breaker
+        if "Temporary failure in name resolution" in message or f"[Errno {socket.EAI_AGAIN}]" in message:
+            return "connection"
+        if "NameResolution" in message or "getaddrinfo" in message or "Name or service not known" in message:
+            return "dns"
+        return "connection"
+    if isinstance(error, ValueError):
+        return "bad_json"
+    return "error"
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Read a Retry-After header
+
+    Args:
+        value: Header value, either delay-seconds or an HTTP date
+        now: Current time for HTTP dates (default: time.time())
+
+    Returns:
+        Seconds to wait (never negative), or None if missing or unreadable
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if not isinstance(when, datetime):
+        return None
+    return max(0.0, when.timestamp() - (now if now is not None else time.time()))
+
+
+def backoff_delay(strikes: int, retry_after: Optional[float] = None) -> float:
+    """
+    Pause after a throttled request
+
+    Args:
+        strikes: Throttled answers in a row from the instance, this one included
+        retry_after: Delay the server asked for, if any
+
+    Returns:
+        Retry-After plus up to RETRY_AFTER_JITTER of it, or else a "full
+        jitter" exponential backoff: uniform between half and all of
+        BACKOFF_BASE * 2^(strikes-1), capped at BACKOFF_MAX
+    """
+    if retry_after is not None:
+        return min(BACKOFF_MAX, retry_after * (1 + random.uniform(0, RETRY_AFTER_JITTER)))
+    ceiling = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(0, strikes - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class HealthStore:
+    """
+    Thread-safe, file-backed collection of InstanceHealth records
+
+    Args:
+        path: JSON file the store is loaded from and saved to
+    """
+
+    def __init__(self, path: str = HEALTH_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: Dict[str, InstanceHealth] = {}
+        # Half-open instances with a trial request in flight -> when it started
+        self._trials: Dict[str, float] = {}
+        self.load()
+
+    def load(self):
+        """Load records from disk, ignoring a missing or corrupt file"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for item in data.get("instances", []):
+                try:
+                    record = InstanceHealth(**item)
+                except TypeError:
+                    continue
+                self._records[record.instance] = record
+
+    def save(self):
+        """Write records to disk atomically"""
+        with self._lock:
+            data = {
+                "updated": time.time(),
+                "instances": [asdict(r) for r in self._records.values()],
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get_record(self, instance: str) -> InstanceHealth:
+        """Return the record for an instance, creating an empty one if needed"""
+        with self._lock:
+            return self._record(instance)
+
+    def _record(self, instance: str) -> InstanceHealth:
+        record = self._records.get(instance)
+        if record is None:
+            record = self._records[instance] = InstanceHealth(instance=instance)
+        return record
+
+    def record_success(self, instance: str, latency: float):
+        """Record a good response and close the breaker"""
+        with self._lock:
+            record = self._record(instance)
+            if record.ewma_latency is None:
+                record.ewma_latency = latency
+            else:
+                record.ewma_latency += EWMA_ALPHA * (latency - record.ewma_latency)
+            record.add_latency_sample(latency)
+            record.success_rate += EWMA_ALPHA * (1.0 - record.success_rate)
+            record.successes += 1
+            record.consecutive_failures = 0
+            record.throttle_strikes = 0
+            record.last_checked = time.time()
+            record.breaker = CLOSED
+            record.opened_at = None
+            self._trials.pop(instance, None)
+
+    def record_failure(self, instance: str, error_class: str, latency: Optional[float] = None):
+        """Record a failed request and open the breaker if it keeps failing"""
+        with self._lock:
+            record = self._record(instance)
+            if latency is not None and error_class == "timeout":
+                # A timeout is a lower bound on latency; count it so slow hosts sink
+                if record.ewma_latency is None:
+                    record.ewma_latency = latency
+                else:
+                    record.ewma_latency += EWMA_ALPHA * (latency - record.ewma_latency)
+            record.success_rate += EWMA_ALPHA * (0.0 - record.success_rate)
+            record.failures += 1
+            record.consecutive_failures += 1
+            record.last_error = error_class
+            record.last_checked = time.time()
+            # DNS failures will not fix themselves within a run
+            if (record.breaker == HALF_OPEN
+                    or record.consecutive_failures >= FAILURE_THRESHOLD
+                    or error_class == "dns"):
+                record.breaker = OPEN
+                record.opened_at = time.time()
+            self._trials.pop(instance, None)
+
+    def record_throttle(self, instance: str, retry_after: Optional[float] = None) -> float:
+        """
+        Record a throttled request (429, or 503 with Retry-After) and pause the instance
+
+        Throttling says the instance is busy, not broken, so the breaker is
+        left alone.
+
+        Args:
+            instance: Instance that answered
+            retry_after: Delay from its Retry-After header, if any
+
+        Returns:
+            Seconds the instance is paused for
+        """
+        with self._lock:
+            record = self._record(instance)
+            now = time.time()
+            record.throttles += 1
+            record.throttle_strikes += 1
+            record.last_error = "throttled"
+            record.last_checked = now
+            delay = backoff_delay(record.throttle_strikes, retry_after)
+            # A pause already running is never shortened
+            record.throttled_until = max(record.throttled_until or 0.0, now + delay)
+            # A throttled trial proved nothing; the next one may go after the pause
+            self._trials.pop(instance, None)
+            return record.throttled_until - now
+
+    def throttle_remaining(self, instance: str) -> float:
+        """Seconds until a throttled instance may be asked again (0 if it is not paused)"""
+        with self._lock:
+            record = self._records.get(instance)
+            if record is None or record.throttled_until is None:
+                return 0.0
+            return max(0.0, record.throttled_until - time.time())
+
+    def _admits(self, instance: str, now: float) -> bool:
+        """Whether the breaker would let a request through (caller holds the lock)"""
+        record = self._records.get(instance)
+        if record is None or record.breaker == CLOSED:
+            return True
+        if record.breaker == OPEN:
+            if record.opened_at is None or now - record.opened_at < OPEN_COOLDOWN:
+                return False
+            record.breaker = HALF_OPEN
+        started = self._trials.get(instance)
+        return started is None or time.monotonic() - started >= TRIAL_TIMEOUT
+
+    def is_available(self, instance: str) -> bool:
+        """
+        Check whether a request may be sent to an instance, and claim it if so
+
+        An open breaker whose cooldown has passed moves to half-open. A
+        half-open instance admits one trial request: the first caller gets
+        True and takes the trial, everyone else gets False until its
+        outcome is recorded (or TRIAL_TIMEOUT passes without one).
+        """
+        with self._lock:
+            return self._claim(instance)
+
+    def _claim(self, instance: str) -> bool:
+        """is_available with the lock already held"""
+        if not self._admits(instance, time.time()):
+            return False
+        record = self._records.get(instance)
+        if record is not None and record.breaker == HALF_OPEN:
+            self._trials[instance] = time.monotonic()
+        return True
+
+    def _claim_trial(self, instance: str) -> bool:
+        """
+        Take the trial of a half-open instance before sending it a request
+
+        Closed instances, and open ones still cooling down (probed
+        explicitly rather than picked from ranked), are not gated here.
+
+        Returns:
+            False if the instance is half-open and another request holds its trial
+        """
+        with self._lock:
+            record = self._records.get(instance)
+            if record is None or record.breaker == CLOSED:
+                return True
+            if record.breaker == OPEN and (record.opened_at is None
+                                           or time.time() - record.opened_at < OPEN_COOLDOWN):
+                return True
+            return self._claim(instance)
+
+    def latency_p90(self, instance: str) -> Optional[float]:
+        """90th percentile of recent successful response times, if known"""
+        with self._lock:
+            record = self._records.get(instance)
+            return record.latency_percentile(90) if record else None
+
+    def ranked(self, instances: List[str], include_throttled: bool = False) -> List[str]:
+        """
+        Order instances fastest-healthy-first, dropping open breakers
+
+        A half-open instance is listed while its trial is free, but ranking
+        does not claim the trial; the request sent through get or get_json
+        does.
+
+        Instances paused for throttling (see record_throttle) are dropped as
+        well, unless include_throttled is set. They then follow the others,
+        soonest resumed first, for callers that can wait out a short pause
+        (rate_limit.pick_instance).
+
+        Args:
+            instances: Candidate instance URLs
+            include_throttled: Keep paused instances at the end
+
+        Returns:
+            Available instances sorted by expected cost; ties keep input order
+        """
+        now = time.time()
+        with self._lock:
+            available = [i for i in instances if self._admits(i, now)]
+            scores = {i: self._record(i).score() for i in available}
+            paused = {i: self._records[i].throttled_until - now for i in available
+                      if (self._records[i].throttled_until or 0.0) > now}
+        if not include_throttled:
+            available = [i for i in available if i not in paused]
+        return sorted(available, key=lambda i: (paused.get(i, 0.0), scores[i]))
+
+    def _send(self, instance: str, path: str, **kwargs):
+        """
+        GET a path on an instance, recording every outcome except a fresh 200
+
+        Returns:
+            (response, latency, needs_verdict); needs_verdict is True for a
+            200 that came from the network, which the caller records once it
+            knows whether the body is usable
+
+        Raises:
+            requests.exceptions.ConnectionError without a request when the
+            instance is half-open and another caller holds its trial
+        """
+        if not self._claim_trial(instance):
+            import requests
+
+            raise requests.exceptions.ConnectionError(f"{instance}: circuit breaker open, trial in flight")
+        started = time.monotonic()
+        try:
+            response = invidious_http.get(f"{instance}{path}", **kwargs)
+        except Exception as e:
+            self.record_failure(instance, classify_error(e), time.monotonic() - started)
+            raise
+        latency = time.monotonic() - started
+
+        # Served from the local cache without a request - nothing to learn
+        if getattr(response, "cache_status", None) == "hit":
+            with self._lock:
+                self._trials.pop(instance, None)
+            return response, latency, False
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if response.status_code == 429 or (response.status_code == 503 and retry_after is not None):
+            self.record_throttle(instance, retry_after)
+        elif response.status_code != 200:
+            self.record_failure(instance, classify_error(status_code=response.status_code), latency)
+        return response, latency, response.status_code == 200
+
+    def get(self, instance: str, path: str, **kwargs):
+        """
+        GET a path on an instance through the shared client and record the outcome
+
+        A 200 response only counts as a success if the body looks like JSON.
+        Streamed responses (stream=True) are judged on the status alone so
+        the body is left unread for the caller; use get_json to have the
+        parse decide instead. Throttled responses pause the instance (see
+        record_throttle).
+
+        Args:
+            instance: Invidious instance URL
+            path: Request path starting with /
+            **kwargs: Passed on to invidious_http.get
+
+        Returns:
+            The response object
+
+        Raises:
+            requests.exceptions.RequestException on transport failure
+        """
+        response, latency, needs_verdict = self._send(instance, path, **kwargs)
+        if needs_verdict:
+            if kwargs.get("stream") or response.content.lstrip()[:1] in (b"[", b"{"):
+                self.record_success(instance, latency)
+            else:
+                self.record_failure(instance, "bad_json", latency)
+        return response
+
+    def get_json(self, instance: str, path: str, parse: Callable[[Any], T], **kwargs) -> Tuple[int, Optional[T]]:
+        """
+        GET a path on an instance, parse the body and record exactly one outcome
+
+        A 200 response counts as a success only once parse has returned; if
+        parse raises (a malformed or truncated body, or the connection
+        dropping mid-body), the failure is recorded instead. The body is
+        streamed unless stream=False is passed, and the response is closed
+        before returning.
+
+        Args:
+            instance: Invidious instance URL
+            path: Request path starting with /
+            parse: Reads the response, e.g. with streaming_json
+            **kwargs: Passed on to invidious_http.get
+
+        Returns:
+            (status code, parse result); the result is None unless the status is 200
+
+        Raises:
+            requests.exceptions.RequestException on transport failure
+            ValueError if parse rejects the body
+        """
+        kwargs.setdefault("stream", True)
+        response, latency, needs_verdict = self._send(instance, path, **kwargs)
+        try:
+            if response.status_code != 200:
+                return response.status_code, None
+            try:
+                result = parse(response)
+            except Exception as e:
+                if needs_verdict:
+                    self.record_failure(instance, classify_error(e), latency)
+                raise
+            if needs_verdict:
+                self.record_success(instance, latency)
+            return 200, result
+        finally:
+            response.close()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Return all records as dicts, best first"""
+        with self._lock:
+            records = sorted(self._records.values(), key=lambda r: (r.breaker == OPEN, r.score()))
+            return [asdict(r) for r in records]
+
+
+_store: Optional[HealthStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> HealthStore:
+    """Return the process-wide store, saved automatically at exit"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HealthStore()
+                atexit.register(_store.save)
+    return _store
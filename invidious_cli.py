@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+One command line for the Invidious tools, with lazy imports and a warm mode
+
+    python invidious_cli.py find @JingleBells_Gaming
+    python invidious_cli.py scan channels.txt --snapshots
+    python invidious_cli.py history uptime --days 30
+
+Each subcommand runs the main() of one of the scripts with the remaining
+arguments, so its flags work exactly as they do there. This module only
+imports the standard library; the script is imported once the subcommand
+is known. requests and the rest of the HTTP stack load only when the
+command sends its first request, so the command list, a mistyped command,
+"<command> --help" and "find UC..." return without loading them.
+
+Shell loops and cron jobs still pay for interpreter startup and imports on
+every run. Warm mode keeps one process around with every tool already
+imported:
+
+    python invidious_cli.py warm &          # start once
+    python invidious_cli.py find @handle    # served by the warm process
+    python invidious_cli.py warm --stop
+
+While the warm server runs, each invocation connects to its Unix socket.
+It hands over its stdin, stdout and stderr, its working directory and its
+environment, and the server forks a child that runs the command on them.
+Output, pipes, exit status and Ctrl-C behave as in a cold run. State such
+as health scores and caches is read fresh by each child and saved by its
+exit hooks, just as in a cold run. Some settings are read when the
+modules are imported (SETTING_PREFIXES). A client whose settings differ
+from the server's runs cold instead.
+
+Warm mode needs fork() and file descriptor passing (Linux, macOS).
+Elsewhere every run is cold.
+
+Settings:
+    INVIDIOUS_CLI_SOCKET   warm server socket (default <tmp>/invidious-cli-<uid>.sock)
+    INVIDIOUS_CLI_COLD     set to 1 to never use the warm server
+"""
+
+import importlib
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+PROG = "invidious_cli.py"
+
+# Subcommand -> (module whose main() runs it, summary)
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    "find": ("find_channel_id", "Find a channel ID from a handle or URL (--file for bulk)"),
+    "channel": ("test_channel", "Show a channel's live streams by handle"),
+    "probe": ("test_invidious_channel", "Probe every instance with the SC6 game channel"),
+    "scan": ("live_scanner", "Scan a roster for live streams once"),
+    "poll": ("live_poller", "Poll a roster continuously"),
+    "search": ("keyword_search", "Find live streams by title keywords"),
+    "aggregate": ("stream_aggregator", "Merge Twitch, YouTube and Kick streams"),
+    "serve": ("stream_server", "Serve the stream feed over HTTP and SSE"),
+    "images": ("image_proxy", "Serve cached thumbnails and avatars"),
+    "history": ("snapshot_store", "Query the stream observation history"),
+    "capture": ("capture_archive", "Inspect capture archives"),
+    "dns": ("dns_cache", "Check and cache instance DNS"),
+    "bench": ("benchmark", "Benchmark the tools against fake instances"),
+    "fake": ("fake_invidious", "Run a local fake Invidious instance"),
+}
+
+SOCKET_PATH = os.environ.get("INVIDIOUS_CLI_SOCKET") or os.path.join(
+    os.environ.get("TMPDIR", "/tmp"), f"invidious-cli-{os.getuid() if hasattr(os, 'getuid') else 0}.sock")
+
+# Environment variables read at import time; the warm server only serves
+# clients that agree with it on these
+SETTING_PREFIXES = ("INVIDIOUS_", "IMAGE_CACHE_", "SNAPSHOT_", "STREAM_SERVER_", "TWITCH_", "KICK_")
+CLIENT_SETTINGS = ("INVIDIOUS_CLI_",)
+
+# Upper bound on a request (argv, cwd and the environment)
+MAX_REQUEST_BYTES = 1024 * 1024
+
+
+def print_usage(file=sys.stdout):
+    print(f"usage: {PROG} <command> [args...]", file=file)
+    print(f"       {PROG} warm [--stop | --status]", file=file)
+    print("\ncommands:", file=file)
+    for name, (module, summary) in COMMANDS.items():
+        print(f"  {name:<10} {summary} ({module}.py)", file=file)
+    print(f"  {'warm':<10} Keep a process with every tool imported to serve later runs", file=file)
+    print(f"\nRun '{PROG} <command> --help' for a command's options.", file=file)
+
+
+def run_command(argv: List[str]):
+    """Import a command's module and run its main() with the remaining arguments"""
+    name, args = argv[0], argv[1:]
+    module = importlib.import_module(COMMANDS[name][0])
+    sys.argv = [f"{PROG} {name}"] + args
+    module.main()
+
+
+def settings(environ=os.environ) -> Dict[str, str]:
+    """The environment variables a warm server must agree on"""
+    return {key: value for key, value in environ.items()
+            if key.startswith(SETTING_PREFIXES) and not key.startswith(CLIENT_SETTINGS)}
+
+
+def warm_supported() -> bool:
+    import socket
+    return hasattr(os, "fork") and hasattr(socket, "AF_UNIX") and hasattr(socket, "send_fds")
+
+
+def _exit_code(code) -> int:
+    """Exit status for a SystemExit code, printing message codes like sys.exit() does"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+# --- client ---
+
+def _request(path: str, message: dict, fds: Optional[List[int]] = None):
+    """Connect to the warm server and send one request; returns (socket, reply reader)"""
+    import socket
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+        data = json.dumps(message).encode("utf-8") + b"\n"
+        if fds:
+            socket.send_fds(conn, [data], fds)
+        else:
+            conn.sendall(data)
+    except OSError:
+        conn.close()
+        raise
+    return conn, conn.makefile("rb")
+
+
+def run_warm(argv: List[str], path: str = SOCKET_PATH) -> Optional[int]:
+    """
+    Run a command on the warm server
+
+    Returns:
+        The command's exit status, or None if it has to run cold (no
+        server, different settings, or no support for passing descriptors)
+    """
+    if os.environ.get("INVIDIOUS_CLI_COLD") or not os.path.exists(path) or not warm_supported():
+        return None
+    for stream in (sys.stdout, sys.stderr):
+        stream.flush()
+    try:
+        conn, reader = _request(path, {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}, [0, 1, 2])
+    except OSError:
+        return None
+    with conn, reader:
+        reply = json.loads(reader.readline() or b"{}")
+        if reply.get("status") != "started":
+            return None
+        try:
+            line = reader.readline()
+        except KeyboardInterrupt:
+            # The command runs in the server's child; let it stop the way it would here
+            import signal
+            os.kill(reply["pid"], signal.SIGINT)
+            line = reader.readline()
+    return json.loads(line)["exit"] if line else 1
+
+
+# --- server ---
+
+def _read_request(conn) -> Tuple[dict, List[int]]:
+    import socket
+    data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+    while not data.endswith(b"\n") and len(data) < MAX_REQUEST_BYTES:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data or b"{}"), fds
+
+
+def _send(conn, message: dict):
+    conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _run_child(conn, request: dict, fds: List[int]):
+    """Forked child: adopt the client's descriptors, directory and environment, run, report"""
+    import atexit
+    import fcntl
+    import io
+    import signal
+    import traceback
+
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    # Move the received descriptors clear of 0-2 first: a server started
+    # with a standard stream closed may have received them there
+    moved = [fcntl.fcntl(fd, fcntl.F_DUPFD, 10) for fd in fds]
+    for fd in fds:
+        os.close(fd)
+    for target, fd in enumerate(moved):
+        os.dup2(fd, target)
+        os.close(fd)
+    encoding, errors = sys.stdout.encoding, sys.stdout.errors
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False), encoding=encoding)
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), encoding=encoding, errors=errors,
+                                  line_buffering=os.isatty(1))
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, "w", closefd=False), encoding=encoding, errors="backslashreplace",
+                                  line_buffering=True)
+    code = 0
+    try:
+        _send(conn, {"status": "started", "pid": os.getpid()})
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        run_command(request["argv"])
+    except SystemExit as e:
+        code = _exit_code(e.code)
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        # os._exit() skips interpreter shutdown: save the health scores, DNS
+        # cache and metrics registered with atexit as a cold run would
+        try:
+            atexit._run_exitfuncs()
+        except BaseException:
+            traceback.print_exc()
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except OSError:
+                pass
+        try:
+            _send(conn, {"exit": code})
+        except OSError:
+            pass
+        os._exit(0)
+
+
+def serve_warm(path: str = SOCKET_PATH):
+    """Import every tool, then serve invocations on a Unix socket until stopped"""
+    import signal
+    import socket
+    import time
+
+    started = time.perf_counter()
+    loaded = []
+    for name, (module, _) in COMMANDS.items():
+        try:
+            importlib.import_module(module)
+            loaded.append(name)
+        except ImportError as e:
+            print(f"[SKIP] {name}: {e}")
+    elapsed = time.perf_counter() - started
+
+    if os.path.exists(path):
+        try:
+            conn, reader = _request(path, {"control": "status"})
+            reader.close()
+            conn.close()
+            sys.exit(f"[FAIL] A warm server is already listening on {path}")
+        except OSError:
+            os.remove(path)  # left over from a server that did not shut down
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    # Finished children are reaped by the kernel
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    own_settings = settings()
+    served = 0
+    print(f"[OK] Warm server on {path}: {len(loaded)} command(s) imported in {elapsed * 1000:.0f} ms", flush=True)
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            fds: List[int] = []
+            try:
+                request, fds = _read_request(conn)
+                control = request.get("control")
+                if control == "stop":
+                    _send(conn, {"status": "stopping", "served": served})
+                    break
+                if control == "status":
+                    _send(conn, {"status": "running", "pid": os.getpid(), "served": served, "commands": loaded})
+                    continue
+                argv = request.get("argv") or []
+                if len(fds) != 3 or not argv or argv[0] not in loaded:
+                    _send(conn, {"status": "refused"})
+                    continue
+                if settings(request.get("env", {})) != own_settings:
+                    _send(conn, {"status": "stale"})
+                    continue
+                sys.stdout.flush()
+                sys.stderr.flush()
+                if os.fork() == 0:
+                    server.close()
+                    _run_child(conn, request, fds)
+                served += 1
+            except (OSError, ValueError) as e:
+                print(f"[FAIL] Bad request: {e}", file=sys.stderr)
+            finally:
+                for fd in fds:
+                    os.close(fd)
+                conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.remove(path)
+    print(f"[OK] Warm server stopped after {served} run(s)")
+
+
+def warm_main(argv: List[str]):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=f"{PROG} warm",
+                                     description="Serve later invocations from a process with every tool imported")
+    parser.add_argument("--socket", default=SOCKET_PATH, help=f"Socket path (default: {SOCKET_PATH})")
+    parser.add_argument("--stop", action="store_true", help="Stop the running warm server")
+    parser.add_argument("--status", action="store_true", help="Show whether a warm server is running")
+    args = parser.parse_args(argv)
+
+    if not warm_supported():
+        sys.exit("[FAIL] Warm mode needs fork() and file descriptor passing (Linux, macOS)")
+    if args.stop or args.status:
+        try:
+            conn, reader = _request(args.socket, {"control": "stop" if args.stop else "status"})
+        except OSError:
+            sys.exit(f"[FAIL] No warm server on {args.socket}")
+        with conn, reader:
+            reply = json.loads(reader.readline() or b"{}")
+        if args.stop:
+            print(f"[OK] Warm server stopped after {reply.get('served', 0)} run(s)")
+        else:
+            print(f"[OK] Warm server {reply.get('pid')} on {args.socket}: {reply.get('served', 0)} run(s) served")
+        return
+    serve_warm(args.socket)
+
+
+def main():
+    argv = sys.argv[1:]
+    if not argv or argv[0] in ("-h", "--help"):
+        print_usage()
+        return
+    command = argv[0]
+    if command == "warm":
+        warm_main(argv[1:])
+        return
+    if command not in COMMANDS:
+        print(f"{PROG}: unknown command '{command}'\n", file=sys.stderr)
+        print_usage(sys.stderr)
+        sys.exit(2)
+
+    code = run_warm(argv)
+    if code is not None:
+        sys.exit(code)
+    run_command(argv)
+
+
+if __name__ == "__main__":
+    main()
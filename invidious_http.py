@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for the Invidious scripts
+
+Every script goes through one pooled client per process, so back-to-back
+calls to the same instance reuse a warm keep-alive connection instead of
+paying for a new TCP+TLS handshake each time. HTTP/2 is used through httpx
+when it is installed (pip install "httpx[http2]"), otherwise requests with
+urllib3 connection pooling is used.
+
+Timeouts can be configured with environment variables:
+    INVIDIOUS_CONNECT_TIMEOUT  seconds to establish a connection (default 5)
+    INVIDIOUS_READ_TIMEOUT     seconds to wait for response data (default 10)
+    INVIDIOUS_POOL_SIZE        keep-alive connections kept per host (default 16)
+    INVIDIOUS_HTTP2            set to 0 to force HTTP/1.1 even if httpx is installed
+
+New connections take their addresses from the DNS cache (dns_cache), so a
+host is looked up once per TTL rather than once per connection. This only
+holds for the requests backend: httpx resolves hostnames itself and skips
+the cache, so with HTTP/2 a known-dead name costs a lookup per new
+connection. The pre-flight (dns_cache.prune_instances) still drops such
+instances before the first request.
+
+Every request is timed per phase (DNS, connect, TLS, time to first byte,
+body, JSON decode) and recorded in request_metrics.
+
+requests, urllib3 and httpx are imported when the first request is sent,
+so importing this module for its settings (INVIDIOUS_INSTANCES) or
+running a script with --help does not load them.
+
+Traffic can be recorded to and replayed from an archive (see capture_archive):
+    INVIDIOUS_CAPTURE          archive path to record every exchange into
+    INVIDIOUS_REPLAY           archive path to answer from instead of the network
+"""
+
+import os
+import threading
+import time
+from importlib.util import find_spec
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+import request_metrics
+import response_cache
+from capture_archive import CAPTURE_FILE, REPLAY_FILE, CapturedExchange, ReplayedResponse, open_archive
+
+# httpx needs h2 for http2=True
+HTTP2_AVAILABLE = find_spec("httpx") is not None and find_spec("h2") is not None
+
+CONNECT_TIMEOUT = float(os.environ.get("INVIDIOUS_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("INVIDIOUS_READ_TIMEOUT", "10"))
+POOL_SIZE = int(os.environ.get("INVIDIOUS_POOL_SIZE", "16"))
+USE_HTTP2 = os.environ.get("INVIDIOUS_HTTP2", "1") != "0"
+
+# Public Invidious instances shared by the library modules
+INVIDIOUS_INSTANCES = [
+    "https://y.com.sb",
+    "https://invidious.slipfox.xyz",
+    "https://invidious.projectsegfau.lt",
+    "https://invidious.privacyredirect.com",
+    "https://inv.riverside.rocks",
+    "https://invidious.snopyta.org",
+    "https://yewtu.be",
+    "https://invidious.kavin.rocks",
+]
+
+# Bytes read at a time from streamed responses
+CHUNK_SIZE = 16 * 1024
+
+# Number of distinct hosts whose connection pools are kept around
+MAX_HOSTS = 32
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "User-Agent": "combineStreamer-tools/0.1",
+}
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+def _httpx_trace(timing: request_metrics.RequestTiming) -> Callable[[str, Dict[str, Any]], None]:
+    """httpx trace hook recording connect (DNS included) and TLS timings"""
+    started: Dict[str, float] = {}
+
+    def trace(event: str, info: Dict[str, Any]):
+        step, _, state = event.rpartition(".")
+        if state == "started":
+            started[step] = time.perf_counter()
+        elif state == "complete" and step in started:
+            elapsed = time.perf_counter() - started[step]
+            if step == "connection.connect_tcp":
+                timing.connect = elapsed
+            elif step == "connection.start_tls":
+                timing.tls = elapsed
+
+    return trace
+
+
+def _timed_json(response, timing: request_metrics.RequestTiming) -> Callable[..., Any]:
+    """Wrap response.json so decode time is recorded against the request"""
+    decode = response.json
+
+    def json(**kwargs):
+        started = time.perf_counter()
+        data = decode(**kwargs)
+        request_metrics.get_recorder().observe_decode(timing, time.perf_counter() - started)
+        return data
+
+    return json
+
+
+class InvidiousClient:
+    """
+    Pooled HTTP client shared by all Invidious scripts
+
+    Args:
+        connect_timeout: Seconds allowed to establish a connection
+        read_timeout: Seconds allowed between bytes of the response
+        pool_size: Keep-alive connections kept per host
+        http2: Use HTTP/2 via httpx (None = use it when available)
+        capture: Archive path to record every exchange into
+        replay: Archive path to answer from; URLs missing from it fail
+            with ConnectionError instead of reaching the network
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        pool_size: int = POOL_SIZE,
+        http2: Optional[bool] = None,
+        capture: Optional[str] = CAPTURE_FILE,
+        replay: Optional[str] = REPLAY_FILE,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_size = pool_size
+        self.http2 = HTTP2_AVAILABLE and USE_HTTP2 if http2 is None else (http2 and HTTP2_AVAILABLE)
+        self.capture = open_archive(capture) if capture else None
+        self.replay = open_archive(replay) if replay else None
+        self._lock = threading.Lock()
+        self._session = None
+
+    def _get_session(self):
+        """Create the underlying session on first use"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        if self.http2:
+            import httpx
+            return httpx.Client(
+                http2=True,
+                headers=DEFAULT_HEADERS,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size * MAX_HOSTS,
+                    max_keepalive_connections=self.pool_size * MAX_HOSTS,
+                ),
+                follow_redirects=True,
+            )
+
+        import requests
+        from timed_adapter import TimedHTTPAdapter
+
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        # No automatic retries - callers fail over to the next instance instead
+        adapter = TimedHTTPAdapter(pool_connections=MAX_HOSTS, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _timeout(self, timeout: Optional[Timeout]) -> Tuple[float, float]:
+        if timeout is None:
+            return (self.connect_timeout, self.read_timeout)
+        if isinstance(timeout, tuple):
+            return timeout
+        return (min(self.connect_timeout, timeout), timeout)
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[Timeout] = None,
+        cache: bool = False,
+        stream: bool = False,
+        follow_redirects: bool = True,
+    ):
+        """
+        Send a GET request over the pooled session
+
+        Args:
+            url: Full request URL
+            params: Optional query parameters
+            headers: Extra headers merged over the defaults
+            timeout: Seconds, or a (connect, read) tuple; defaults to the client settings
+            cache: Serve from / store in the local response cache (see response_cache)
+            stream: Return as soon as headers arrive and leave the body unread;
+                read it with iter_chunks() and close() the response when done.
+                Ignored when cache is set, since the cache needs the whole body.
+            follow_redirects: Follow 3xx answers; when False they are
+                returned as they are, for callers that check each hop
+
+        Returns:
+            Response object with status_code, headers, text, content and json()
+
+        Raises:
+            requests.exceptions.RequestException (or a subclass) on failure,
+            regardless of which HTTP backend is in use
+        """
+        if cache:
+            if params:
+                url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+            return response_cache.get_cache().fetch(
+                url,
+                lambda request_headers: self._send(url, None, request_headers, timeout),
+                headers,
+            )
+        return self._send(url, params, headers, timeout, stream, follow_redirects)
+
+    def post(
+        self,
+        url: str,
+        json_body: Any,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[Timeout] = None,
+    ):
+        """
+        Send a JSON POST request over the pooled session (used for GraphQL APIs)
+
+        POSTs are neither cached nor captured. In replay mode they fail with
+        ConnectionError, because the archive is keyed by URL alone.
+
+        Args:
+            url: Full request URL
+            json_body: Value sent as the JSON request body
+            headers: Extra headers merged over the defaults
+            timeout: Seconds, or a (connect, read) tuple; defaults to the client settings
+
+        Returns:
+            Response object with status_code, headers, text, content and json()
+        """
+        if self.replay is not None:
+            import requests
+            raise requests.exceptions.ConnectionError(f"POST {url} cannot be replayed")
+        return self._send_network(url, None, headers, timeout, json_body=json_body)
+
+    def _send(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[Timeout],
+        stream: bool = False,
+        follow_redirects: bool = True,
+    ):
+        if self.replay is None and self.capture is None:
+            return self._send_network(url, params, headers, timeout, stream, follow_redirects=follow_redirects)
+
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+        if self.replay is not None:
+            exchange = self.replay.latest(url)
+            if exchange is None:
+                import requests
+                raise requests.exceptions.ConnectionError(f"No captured response for {url}")
+            return ReplayedResponse(exchange)
+
+        started = time.monotonic()
+        response = self._send_network(url, None, headers, timeout, stream, follow_redirects=follow_redirects)
+        # The archive needs the whole body; a streamed caller still gets
+        # iter_chunks() over the buffered content
+        if hasattr(response, "read"):
+            response.read()
+        body = response.content
+        self.capture.append(CapturedExchange(
+            url=url,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            body=body,
+            elapsed=time.monotonic() - started,
+            request_headers=dict(headers or {}),
+        ))
+        return response
+
+    def _send_network(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[Timeout],
+        stream: bool = False,
+        json_body: Any = None,
+        follow_redirects: bool = True,
+    ):
+        import requests
+
+        recorder = request_metrics.get_recorder()
+        timing = recorder.start(url)
+        try:
+            # Always stream so time to first byte and body download are measured apart
+            response = self._open(url, params, headers, timeout, timing, json_body, follow_redirects)
+            timing.ttfb = max(0.0, timing.elapsed() - timing.connection_time())
+            response.timing = timing
+            if stream and response.status_code == 200:
+                # iter_chunks() records the body phase as the caller reads it
+                return response
+            started = time.perf_counter()
+            body = _read_body(response)
+        except requests.exceptions.RequestException as e:
+            recorder.finish(timing, error=type(e).__name__)
+            raise
+        timing.body = time.perf_counter() - started
+        timing.bytes = len(body)
+        recorder.finish(timing, response.status_code)
+        response.json = _timed_json(response, timing)
+        return response
+
+    def _open(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[Timeout],
+        timing: request_metrics.RequestTiming,
+        json_body: Any = None,
+        follow_redirects: bool = True,
+    ):
+        """Send the request (a POST if json_body is given) and return once the response headers are in"""
+        session = self._get_session()
+        connect, read = self._timeout(timeout)
+        method = "GET" if json_body is None else "POST"
+
+        if not self.http2:
+            return session.request(method, url, params=params, headers=headers, json=json_body,
+                                   timeout=(connect, read), stream=True, allow_redirects=follow_redirects)
+
+        import httpx
+        try:
+            request = session.build_request(
+                method,
+                url,
+                params=params,
+                json=json_body,
+                headers=headers,
+                timeout=httpx.Timeout(read, connect=connect),
+                extensions={"trace": _httpx_trace(timing)},
+            )
+            return session.send(request, stream=True, follow_redirects=follow_redirects)
+        except httpx.HTTPError as e:
+            raise _map_httpx_error(e) from e
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+_client: Optional[InvidiousClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> InvidiousClient:
+    """Return the process-wide shared client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = InvidiousClient()
+    return _client
+
+
+def configure(**kwargs) -> InvidiousClient:
+    """
+    Replace the shared client with one built from the given settings
+
+    Accepts the same keyword arguments as InvidiousClient.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = InvidiousClient(**kwargs)
+    return _client
+
+
+def get(url: str, **kwargs):
+    """Send a GET request through the shared client (see InvidiousClient.get)"""
+    return get_client().get(url, **kwargs)
+
+
+def post(url: str, json_body: Any, **kwargs):
+    """Send a JSON POST request through the shared client (see InvidiousClient.post)"""
+    return get_client().post(url, json_body, **kwargs)
+
+
+def _map_httpx_error(error: Exception) -> Exception:
+    """Translate an httpx error into the matching requests exception"""
+    import httpx
+    import requests
+
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(error))
+    if isinstance(error, httpx.TransportError):
+        return requests.exceptions.ConnectionError(str(error))
+    return requests.exceptions.RequestException(str(error))
+
+
+def _read_body(response) -> bytes:
+    """Read the whole body of a streamed response from either backend"""
+    if hasattr(response, "iter_bytes"):  # httpx
+        import httpx
+        try:
+            return response.read()
+        except httpx.HTTPError as e:
+            raise _map_httpx_error(e) from e
+    return response.content
+
+
+def _raw_chunks(response, chunk_size: int) -> Iterator[bytes]:
+    if hasattr(response, "iter_content"):
+        yield from response.iter_content(chunk_size=chunk_size)
+    elif hasattr(response, "iter_bytes"):
+        import httpx
+        try:
+            yield from response.iter_bytes(chunk_size=chunk_size)
+        except httpx.HTTPError as e:
+            raise _map_httpx_error(e) from e
+    else:
+        yield response.content
+
+
+def iter_chunks(response, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Iterate over the body of a response from either backend
+
+    Works for streamed and already-read responses alike. For a streamed
+    response the time spent waiting on the network is recorded as the body
+    phase and the time the caller spends between chunks as the decode phase.
+
+    Raises:
+        requests.exceptions.RequestException if the connection fails mid-body
+    """
+    import requests
+
+    timing = getattr(response, "timing", None)
+    if timing is None or timing.finished:
+        yield from _raw_chunks(response, chunk_size)
+        return
+
+    recorder = request_metrics.get_recorder()
+    chunks = _raw_chunks(response, chunk_size)
+    started = time.perf_counter()
+    waited = 0.0
+    error = None
+    try:
+        while True:
+            before = time.perf_counter()
+            try:
+                chunk = next(chunks, None)
+            except requests.exceptions.RequestException as e:
+                error = type(e).__name__
+                raise
+            finally:
+                waited += time.perf_counter() - before
+            if chunk is None:
+                break
+            timing.bytes += len(chunk)
+            yield chunk
+    finally:
+        timing.body = waited
+        recorder.finish(timing, response.status_code, error)
+        if error is None:
+            recorder.observe_decode(timing, max(0.0, time.perf_counter() - started - waited))
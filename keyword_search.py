@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Keyword-based live stream discovery
+
+The web app finds YouTube streams two ways: a fixed list of channels and
+an Invidious search for YOUTUBE_SEARCH_KEYWORDS (lib/stream-api.ts). This
+module is the Python side of the second way. It runs one live-video search
+per keyword concurrently, following up to SEARCH_PAGES result pages each.
+It merges the results by video ID and keeps only the titles that really
+mention the game. Search results are loose, and often include unrelated
+streams.
+
+Titles are checked with one precompiled regular expression that covers
+every keyword, so each title is scanned once however many keywords there
+are. Titles and keywords are both NFKC-normalised and case-folded first.
+Full-width letters, half-width katakana and roman numerals ("ＳＣ６",
+"SOULCALIBUR Ⅵ") therefore match their plain forms. Spaces, dashes and
+dots inside a keyword are optional ("soulcalibur 6" matches "SoulCalibur6"
+and "Soul-Calibur 6"), and ASCII keywords must stand on word boundaries,
+so "sc6" does not match "disc6".
+
+Usage:
+    python keyword_search.py > live.jsonl
+    python keyword_search.py --keyword "tekken 8" --keyword "鉄拳8"
+"""
+
+import argparse
+import json
+import re
+import sys
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import quote
+
+from instance_health import HealthStore, get_store
+from invidious_http import INVIDIOUS_INSTANCES
+from pagination import Page, paginate
+from rate_limit import InstanceRateLimiter, pick_instance
+from streaming_json import iter_search_videos
+from video_entry import VideoEntry
+
+# Keep in sync with YOUTUBE_SEARCH_KEYWORDS in lib/stream-api.ts
+SEARCH_KEYWORDS = ["soulcalibur 6", "soul calibur 6", "soulcalibur vi", "sc6", "calibur 6", "ソウルキャリバー6"]
+
+# Characters that may separate (or be missing between) the words of a keyword
+SEPARATORS = r"[\s\-_.:/・·]*"
+
+# Searches in flight at once
+SEARCH_WORKERS = 8
+
+# Result pages followed at most per keyword
+SEARCH_PAGES = 3
+
+
+def normalise_text(text: str) -> str:
+    """NFKC-normalise and case-fold text for matching"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+def _keyword_pattern(keyword: str) -> str:
+    words = normalise_text(keyword).split()
+    pattern = SEPARATORS.join(re.escape(word) for word in words)
+    if _is_word_char(words[0][0]):
+        pattern = r"(?<![a-z0-9])" + pattern
+    if _is_word_char(words[-1][-1]):
+        pattern += r"(?![a-z0-9])"
+    return pattern
+
+
+class KeywordMatcher:
+    """
+    Single-pass matcher for a set of keywords
+
+    Args:
+        keywords: Keywords to look for; blank ones are ignored
+    """
+
+    def __init__(self, keywords: Iterable[str] = SEARCH_KEYWORDS):
+        self.keywords: List[str] = []
+        patterns: Dict[str, int] = {}
+        for keyword in keywords:
+            if not keyword.strip():
+                continue
+            pattern = _keyword_pattern(keyword)
+            if pattern not in patterns:
+                patterns[pattern] = len(self.keywords)
+                self.keywords.append(keyword)
+        # Longest first, so the most specific keyword is reported
+        ordered = sorted(patterns.items(), key=lambda item: len(item[0]), reverse=True)
+        self._regex = re.compile("|".join(f"(?P<k{index}>{pattern})" for pattern, index in ordered)) if ordered else None
+
+    def search(self, text: Optional[str]) -> Optional[str]:
+        """
+        Find a keyword in a text
+
+        Returns:
+            The keyword that matched, or None
+        """
+        if not text or self._regex is None:
+            return None
+        match = self._regex.search(normalise_text(text))
+        return self.keywords[int(match.lastgroup[1:])] if match else None
+
+    def matches(self, text: Optional[str]) -> bool:
+        return self.search(text) is not None
+
+
+def search_page(
+    keyword: str,
+    page: int,
+    instances: List[str],
+    store: HealthStore,
+    limiter: InstanceRateLimiter,
+) -> Optional[List[VideoEntry]]:
+    """
+    Fetch one page of a live-video search, failing over across instances
+
+    Returns:
+        The video results, or None if no instance answered
+    """
+    import requests
+
+    ranked = store.ranked(instances, include_throttled=True)
+    tried: Set[str] = set()
+    path = f"/api/v1/search?q={quote(keyword)}&type=video&features=live&sort=views&page={page}"
+    while True:
+        instance = pick_instance(ranked, tried, limiter)
+        if instance is None:
+            return None
+        tried.add(instance)
+        try:
+            status, videos = store.get_json(
+                instance, path, lambda response: [VideoEntry.from_dict(item) for item in iter_search_videos(response)])
+        except (requests.exceptions.RequestException, ValueError):
+            # Recorded by the store; ValueError is a wrong payload shape or truncated body
+            continue
+        if status == 200:
+            return videos
+
+
+def search_live(
+    keyword: str,
+    instances: List[str],
+    store: HealthStore,
+    limiter: InstanceRateLimiter,
+    max_pages: int = SEARCH_PAGES,
+    min_viewers: int = 0,
+) -> Optional[List[VideoEntry]]:
+    """
+    Run one live-video search over up to max_pages result pages
+
+    Results are sorted by viewers, so paging stops at the first page that
+    reaches below min_viewers, or that comes back empty.
+
+    Returns:
+        The video results, or None if no instance answered the first page
+    """
+    first = search_page(keyword, 1, instances, store, limiter)
+    if first is None:
+        return None
+
+    def fetch(cursor: Optional[str]) -> Page[VideoEntry]:
+        number = int(cursor or 1)
+        videos = first if number == 1 else search_page(keyword, number, instances, store, limiter) or []
+        return Page(videos, str(number + 1) if videos else None)
+
+    until = (lambda video: video.view_count < min_viewers) if min_viewers > 0 else None
+    return paginate(fetch, until=until, max_pages=max_pages)
+
+
+def discover_streams(
+    keywords: List[str] = SEARCH_KEYWORDS,
+    instances: List[str] = INVIDIOUS_INSTANCES,
+    store: Optional[HealthStore] = None,
+    limiter: Optional[InstanceRateLimiter] = None,
+    matcher: Optional[KeywordMatcher] = None,
+    workers: int = SEARCH_WORKERS,
+    max_pages: int = SEARCH_PAGES,
+    min_viewers: int = 0,
+) -> List[VideoEntry]:
+    """
+    Find live streams whose titles mention one of the keywords
+
+    Args:
+        keywords: Search queries, one search each
+        instances: Candidate instance URLs
+        store: Health store used for ranking and outcome tracking
+        limiter: Per-instance rate limiter
+        matcher: Title filter (default: built from keywords)
+        workers: Searches in flight at once
+        max_pages: Result pages followed at most per keyword
+        min_viewers: Viewer count below which paging stops and streams are dropped
+
+    Returns:
+        Live entries, de-duplicated by video ID, most viewers first
+    """
+    store = store or get_store()
+    limiter = limiter or InstanceRateLimiter()
+    matcher = matcher or KeywordMatcher(keywords)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(
+            lambda keyword: search_live(keyword, instances, store, limiter, max_pages, min_viewers), keywords))
+
+    found: Dict[str, VideoEntry] = {}
+    for videos in results:
+        for video in videos or ():
+            if (video.video_id not in found and video.live_now and video.view_count >= min_viewers
+                    and matcher.matches(video.title)):
+                found[video.video_id] = video
+    return sorted(found.values(), key=lambda v: v.view_count, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find live YouTube streams by title keywords")
+    parser.add_argument("--keyword", action="append", dest="keywords",
+                        help="Keyword to search for (repeatable; default: the SoulCalibur VI keywords)")
+    parser.add_argument("--instances", help="Comma-separated Invidious instances to use")
+    parser.add_argument("--workers", type=int, default=SEARCH_WORKERS,
+                        help=f"Searches in flight at once (default: {SEARCH_WORKERS})")
+    parser.add_argument("--pages", type=int, default=SEARCH_PAGES,
+                        help=f"Result pages followed at most per keyword (default: {SEARCH_PAGES})")
+    parser.add_argument("--min-viewers", type=int, default=0,
+                        help="Drop streams below this many viewers and stop paging when results get there")
+    args = parser.parse_args()
+
+    keywords = args.keywords or SEARCH_KEYWORDS
+    instances = args.instances.split(",") if args.instances else INVIDIOUS_INSTANCES
+    store = get_store()
+    streams = discover_streams(keywords, instances, store, workers=args.workers,
+                               max_pages=args.pages, min_viewers=args.min_viewers)
+    for video in streams:
+        print(json.dumps(video.to_stream_record(), ensure_ascii=False), flush=True)
+    print(f"Found {len(streams)} live stream(s) for {len(keywords)} keyword(s)", file=sys.stderr)
+    store.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -35,166 +35,162 @@ interface TwitchGqlStream {
   freeformTags?: { name: string }[];
 }
 
+interface TwitchGqlStreamConnection {
+  edges: Array<{
+    cursor: string;
+    node: TwitchGqlStream;
+  }>;
+  pageInfo: {
+    hasNextPage: boolean;
+    endCursor?: string | null;
+  };
+}
+
 interface TwitchGqlGameStreamsResponse {
   data: {
     game: {
-      streams: {
-        edges: Array<{
-          cursor: string;
-          node: TwitchGqlStream;
-        }>;
-        pageInfo: {
-          hasNextPage: boolean;
-        };
-      };
+      streams: TwitchGqlStreamConnection;
     } | null;
   };
 }
 
 interface TwitchGqlTopStreamsResponse {
   data: {
-    streams: {
-      edges: Array<{
-        cursor: string;
-        node: TwitchGqlStream;
-      }>;
-      pageInfo: {
-        hasNextPage: boolean;
-      };
-    };
+    streams: TwitchGqlStreamConnection;
   };
 }
 
-/**
- * Fetch Twitch streams using GQL API (similar to Xtra app)
- * This uses Twitch's internal GraphQL API with persisted queries
- */
-async function fetchTwitchStreamsGql(gameSlug?: string): Promise<Stream[]> {
-  try {
-    // Using persisted query approach like Xtra
-    // This query fetches streams for a specific game by slug
-    const body = gameSlug
-      ? {
-          extensions: {
-            persistedQuery: {
-              sha256Hash: "76cb069d835b8a02914c08dc42c421d0dafda8af5b113a3f19141824b901402f",
-              version: 1,
-            },
+// Streams per GQL page, and the most pages followed per fetch (same as stream_aggregator.py)
+const TWITCH_PAGE_SIZE = 30;
+const TWITCH_MAX_PAGES = 10;
+
+function twitchGqlBody(gameSlug: string | undefined, cursor: string | null) {
+  // Using persisted query approach like Xtra
+  // This query fetches streams for a specific game by slug
+  return gameSlug
+    ? {
+        extensions: {
+          persistedQuery: {
+            sha256Hash: "76cb069d835b8a02914c08dc42c421d0dafda8af5b113a3f19141824b901402f",
+            version: 1,
           },
-          operationName: "DirectoryPage_Game",
-          variables: {
-            cursor: null,
-            imageWidth: 50,
-            includeCostreaming: true,
-            limit: 30,
-            options: {
-              broadcasterLanguages: [],
-              freeformTags: [],
-              sort: "VIEWER_COUNT",
-            },
-            slug: gameSlug,
-            sortTypeIsRecency: false,
+        },
+        operationName: "DirectoryPage_Game",
+        variables: {
+          cursor,
+          imageWidth: 50,
+          includeCostreaming: true,
+          limit: TWITCH_PAGE_SIZE,
+          options: {
+            broadcasterLanguages: [],
+            freeformTags: [],
+            sort: "VIEWER_COUNT",
           },
-        }
-      : {
-          // Fallback to top streams if no game specified
-          extensions: {
-            persistedQuery: {
-              sha256Hash: "fb60a7f9b2fe8f9c9a080f41585bd4564bea9d3030f4d7cb8ab7f9e99b1cee67",
-              version: 1,
-            },
+          slug: gameSlug,
+          sortTypeIsRecency: false,
+        },
+      }
+    : {
+        // Fallback to top streams if no game specified
+        extensions: {
+          persistedQuery: {
+            sha256Hash: "fb60a7f9b2fe8f9c9a080f41585bd4564bea9d3030f4d7cb8ab7f9e99b1cee67",
+            version: 1,
           },
-          operationName: "BrowsePage_Popular",
-          variables: {
-            cursor: null,
-            imageWidth: 50,
-            includeCostreaming: true,
-            limit: 30,
-            options: {
-              broadcasterLanguages: [],
-              freeformTags: [],
-              sort: "VIEWER_COUNT",
-            },
-            platformType: "all",
-            sortTypeIsRecency: false,
+        },
+        operationName: "BrowsePage_Popular",
+        variables: {
+          cursor,
+          imageWidth: 50,
+          includeCostreaming: true,
+          limit: TWITCH_PAGE_SIZE,
+          options: {
+            broadcasterLanguages: [],
+            freeformTags: [],
+            sort: "VIEWER_COUNT",
           },
-        };
+          platformType: "all",
+          sortTypeIsRecency: false,
+        },
+      };
+}
 
-    logger.log(`[Client] Fetching Twitch streams via GQL${gameSlug ? ` for game: ${gameSlug}` : ""}...`);
+function twitchGqlStream(node: TwitchGqlStream): Stream {
+  return {
+    id: `twitch-${node.id}`,
+    platform: "twitch" as Platform,
+    streamerName: node.broadcaster?.displayName || "Unknown",
+    profilePictureUrl: node.broadcaster?.profileImageURL,
+    title: node.title || node.broadcaster?.broadcastSettings?.title || "Untitled Stream",
+    thumbnailUrl: node.previewImageURL || `https://static-cdn.jtvnw.net/previews-ttv/live_user_${node.broadcaster?.login || "unknown"}-320x180.jpg`,
+    viewerCount: node.viewersCount || 0,
+    streamUrl: `https://twitch.tv/${node.broadcaster?.login || ""}`,
+    isLive: true,
+    startedAt: node.createdAt,
+  };
+}
 
-    const response = await fetch(TWITCH_GQL_URL, {
-      method: "POST",
-      headers: {
-        "Client-Id": TWITCH_CLIENT_ID,
-        "Content-Type": "application/json",
-        Accept: "application/json",
-      },
-      body: JSON.stringify(body),
-      signal: AbortSignal.timeout(15000),
-    });
+/**
+ * Fetch Twitch streams using GQL API (similar to Xtra app)
+ * This uses Twitch's internal GraphQL API with persisted queries.
+ * Listing cursors are followed until there is no next page, a page
+ * comes back empty, or TWITCH_MAX_PAGES is reached; if a later page
+ * fails, the streams from the pages before it are kept.
+ */
+async function fetchTwitchStreamsGql(gameSlug?: string): Promise<Stream[]> {
+  logger.log(`[Client] Fetching Twitch streams via GQL${gameSlug ? ` for game: ${gameSlug}` : ""}...`);
 
-    if (!response.ok) {
-      logger.warn(`[Client] Twitch GQL API returned ${response.status}`);
-      return [];
-    }
+  const streams: Stream[] = [];
+  const seen = new Set<string>();
+  let cursor: string | null = null;
 
-    const data = await response.json();
+  for (let page = 0; page < TWITCH_MAX_PAGES; page++) {
+    let connection: TwitchGqlStreamConnection | undefined;
+    try {
+      const response = await fetch(TWITCH_GQL_URL, {
+        method: "POST",
+        headers: {
+          "Client-Id": TWITCH_CLIENT_ID,
+          "Content-Type": "application/json",
+          Accept: "application/json",
+        },
+        body: JSON.stringify(twitchGqlBody(gameSlug, cursor)),
+        signal: AbortSignal.timeout(15000),
+      });
 
-    // Handle game-specific response
-    if (gameSlug) {
-      const gameData = data as TwitchGqlGameStreamsResponse;
-      if (!gameData.data?.game?.streams?.edges) {
-        logger.warn("[Client] No game data found in Twitch GQL response");
-        return [];
+      if (!response.ok) {
+        logger.warn(`[Client] Twitch GQL API returned ${response.status}`);
+        break;
       }
 
-      const streams: Stream[] = gameData.data.game.streams.edges
-        .filter((edge) => edge.node && edge.node.type === "live")
-        .map((edge) => ({
-          id: `twitch-${edge.node.id}`,
-          platform: "twitch" as Platform,
-          streamerName: edge.node.broadcaster?.displayName || "Unknown",
-          profilePictureUrl: edge.node.broadcaster?.profileImageURL,
-          title: edge.node.title || edge.node.broadcaster?.broadcastSettings?.title || "Untitled Stream",
-          thumbnailUrl: edge.node.previewImageURL || `https://static-cdn.jtvnw.net/previews-ttv/live_user_${edge.node.broadcaster?.login || "unknown"}-320x180.jpg`,
-          viewerCount: edge.node.viewersCount || 0,
-          streamUrl: `https://twitch.tv/${edge.node.broadcaster?.login || ""}`,
-          isLive: true,
-          startedAt: edge.node.createdAt,
-        }));
-
-      logger.log(`[Client] Found ${streams.length} Twitch streams via GQL`);
-      return streams;
+      const data = await response.json();
+      // Handle game-specific response, then top streams response
+      connection = gameSlug
+        ? (data as TwitchGqlGameStreamsResponse).data?.game?.streams
+        : (data as TwitchGqlTopStreamsResponse).data?.streams;
+    } catch (error) {
+      logger.warn("[Client] Failed to fetch Twitch streams via GQL:", error);
+      break;
     }
 
-    // Handle top streams response
-    const topData = data as TwitchGqlTopStreamsResponse;
-    if (!topData.data?.streams?.edges) {
-      logger.warn("[Client] No streams found in Twitch GQL response");
-      return [];
+    if (!connection?.edges) {
+      logger.warn(`[Client] No ${gameSlug ? "game data" : "streams"} found in Twitch GQL response`);
+      break;
     }
 
-    const streams: Stream[] = topData.data.streams.edges
-      .filter((edge) => edge.node && edge.node.type === "live")
-      .map((edge) => ({
-        id: `twitch-${edge.node.id}`,
-        platform: "twitch" as Platform,
-        streamerName: edge.node.broadcaster?.displayName || "Unknown",
-        profilePictureUrl: edge.node.broadcaster?.profileImageURL,
-        title: edge.node.title || edge.node.broadcaster?.broadcastSettings?.title || "Untitled Stream",
-        thumbnailUrl: edge.node.previewImageURL || `https://static-cdn.jtvnw.net/previews-ttv/live_user_${edge.node.broadcaster?.login || "unknown"}-320x180.jpg`,
-        viewerCount: edge.node.viewersCount || 0,
-        streamUrl: `https://twitch.tv/${edge.node.broadcaster?.login || ""}`,
-        isLive: true,
-        startedAt: edge.node.createdAt,
-      }));
+    for (const edge of connection.edges) {
+      if (!edge.node || edge.node.type !== "live" || seen.has(edge.node.id)) continue;
+      seen.add(edge.node.id);
+      streams.push(twitchGqlStream(edge.node));
+    }
 
-    logger.log(`[Client] Found ${streams.length} Twitch streams via GQL`);
-    return streams;
-  } catch (error) {
-    logger.warn("[Client] Failed to fetch Twitch streams via GQL:", error);
-    return [];
+    const edges = connection.edges;
+    cursor = connection.pageInfo?.endCursor || edges[edges.length - 1]?.cursor || null;
+    if (!connection.pageInfo?.hasNextPage || edges.length === 0 || !cursor) break;
   }
+
+  logger.log(`[Client] Found ${streams.length} Twitch streams via GQL`);
+  return streams;
 }
 
 /**
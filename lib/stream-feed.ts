@@ -0,0 +1,106 @@
+import { Platform, Stream, StreamApiResponse } from "@/types/stream";
+import { logger } from "@/lib/logger";
+
+/**
+ * Base URL of the central stream feed (stream_server.py), e.g. https://feed.example.com
+ * When unset, the app keeps querying Twitch and Invidious directly from the browser
+ */
+export const STREAM_FEED_URL = (process.env.NEXT_PUBLIC_STREAM_FEED_URL || "").replace(/\/$/, "");
+
+/**
+ * Platforms assumed covered by a feed that does not list them (servers older
+ * than the platforms field only polled the YouTube roster)
+ */
+export const FEED_DEFAULT_PLATFORMS: Platform[] = ["youtube"];
+
+const FEED_CHANGE_EVENTS = ["went_live", "ended", "title_changed", "viewers_changed"] as const;
+
+interface StreamFeedEvent {
+  type: (typeof FEED_CHANGE_EVENTS)[number];
+  id: string;
+  at: string;
+  stream?: Stream;
+}
+
+/**
+ * With its image cache enabled, the feed sends thumbnails and avatars as
+ * paths on the feed server (/img?...); make them absolute
+ */
+function withFeedImages(stream: Stream): Stream {
+  const resolve = (url: string) => (url.startsWith("/") ? `${STREAM_FEED_URL}${url}` : url);
+  return {
+    ...stream,
+    thumbnailUrl: resolve(stream.thumbnailUrl),
+    profilePictureUrl: stream.profilePictureUrl && resolve(stream.profilePictureUrl),
+  };
+}
+
+export function feedPlatforms(data: StreamApiResponse): Platform[] {
+  return data.platforms ?? FEED_DEFAULT_PLATFORMS;
+}
+
+function sortByViewers(streams: Iterable<Stream>): Stream[] {
+  return [...streams].sort((a, b) => b.viewerCount - a.viewerCount);
+}
+
+/**
+ * Fetch the merged stream list from the feed once
+ */
+export async function fetchFeedStreams(): Promise<StreamApiResponse> {
+  const response = await fetch(`${STREAM_FEED_URL}/api/streams`, {
+    headers: { Accept: "application/json" },
+    signal: AbortSignal.timeout(10000),
+  });
+  if (!response.ok) {
+    throw new Error(`Stream feed returned ${response.status}`);
+  }
+  const data = (await response.json()) as StreamApiResponse;
+  return { ...data, streams: data.streams.map(withFeedImages), platforms: feedPlatforms(data) };
+}
+
+/**
+ * Follow the feed's server-sent events
+ * The first event is a full snapshot; later events only carry what changed.
+ * onUpdate receives the complete, viewer-sorted list after every event,
+ * along with the platforms the feed covers (from the last snapshot).
+ * onError is called whenever the connection drops or cannot be opened;
+ * EventSource keeps retrying, and the next snapshot or event means the
+ * feed is back.
+ * Returns a function that closes the connection.
+ */
+export function subscribeToStreamFeed(
+  onUpdate: (streams: Stream[], lastUpdated: string, platforms: Platform[]) => void,
+  onError?: (error: Error) => void,
+): () => void {
+  const streams = new Map<string, Stream>();
+  let platforms = FEED_DEFAULT_PLATFORMS;
+  const source = new EventSource(`${STREAM_FEED_URL}/api/events`);
+
+  source.addEventListener("snapshot", (message) => {
+    const data = JSON.parse((message as MessageEvent).data) as StreamApiResponse;
+    streams.clear();
+    data.streams.forEach((stream) => streams.set(stream.id, withFeedImages(stream)));
+    platforms = feedPlatforms(data);
+    logger.log(`[Feed] Snapshot with ${streams.size} streams (${platforms.join(", ")})`);
+    onUpdate(sortByViewers(streams.values()), data.lastUpdated, platforms);
+  });
+
+  const applyChange = (message: Event) => {
+    const event = JSON.parse((message as MessageEvent).data) as StreamFeedEvent;
+    if (event.type === "ended") {
+      streams.delete(event.id);
+    } else if (event.stream) {
+      streams.set(event.id, withFeedImages(event.stream));
+    }
+    onUpdate(sortByViewers(streams.values()), event.at, platforms);
+  };
+  FEED_CHANGE_EVENTS.forEach((type) => source.addEventListener(type, applyChange));
+
+  // EventSource reconnects on its own and resumes from the last event ID
+  source.onerror = () => {
+    logger.warn("[Feed] Connection lost, reconnecting...");
+    onError?.(new Error("Stream feed connection lost"));
+  };
+
+  return () => source.close();
+}
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Incremental live-state diffing for the scanner and poller
+
+Keeps the last known state of every channel (its live streams with their
+titles and viewer counts, and its latest video ID) and turns each new poll
+into a list of change events:
+
+    went_live        a stream appeared (carries the full Stream record)
+    ended            a stream is no longer live
+    title_changed    a live stream was renamed
+    viewers_changed  a live stream's viewer count crossed one of VIEWER_THRESHOLDS
+    new_video        the newest entry of the channel's listing changed
+
+Consumers apply the events to their own copy of the stream list, so their
+work grows with the number of changes rather than the roster size. A poll
+that failed produces no events: an unreachable instance says nothing about
+whether a channel is still live.
+
+State can be saved to a JSON file so one-shot scans diff against the
+previous run.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from video_entry import VideoEntry
+
+# Viewer counts whose crossing (either way) is reported
+VIEWER_THRESHOLDS = (10, 25, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000)
+
+EVENT_TYPES = ("went_live", "ended", "title_changed", "viewers_changed", "new_video")
+
+
+def viewer_level(count: int, thresholds=VIEWER_THRESHOLDS) -> int:
+    """Number of thresholds a viewer count has reached"""
+    return sum(1 for threshold in thresholds if count >= threshold)
+
+
+@dataclass
+class LiveSnapshot:
+    """Last seen state of one live stream"""
+    title: Optional[str]
+    viewer_count: int
+
+
+@dataclass
+class ChannelState:
+    """Last seen state of one channel"""
+    channel_id: str
+    latest_video_id: Optional[str] = None
+    live: Dict[str, LiveSnapshot] = field(default_factory=dict)
+
+
+@dataclass
+class LiveEvent:
+    """One change between two polls of a channel"""
+    type: str
+    channel_id: str
+    video_id: Optional[str]
+    title: Optional[str] = None
+    viewer_count: Optional[int] = None
+    previous: Any = None
+    stream: Optional[Dict[str, Any]] = None
+    at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready dict without the empty fields"""
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+class DiffTracker:
+    """
+    Per-channel state and diffing
+
+    Not thread-safe: the scanner and poller apply results on one thread.
+
+    Args:
+        state_file: JSON file to load the previous state from and save to (optional)
+        thresholds: Viewer counts whose crossing is reported
+    """
+
+    def __init__(self, state_file: Optional[str] = None, thresholds=VIEWER_THRESHOLDS):
+        self.state_file = state_file
+        self.thresholds = thresholds
+        self.channels: Dict[str, ChannelState] = {}
+        if state_file:
+            self.load()
+
+    def load(self):
+        """Load the previous state, ignoring a missing or corrupt file"""
+        try:
+            with open(self.state_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in data.get("channels", []):
+            try:
+                live = {vid: LiveSnapshot(**snap) for vid, snap in item.get("live", {}).items()}
+                state = ChannelState(item["channel_id"], item.get("latest_video_id"), live)
+            except (KeyError, TypeError, AttributeError):
+                continue
+            self.channels[state.channel_id] = state
+
+    def save(self):
+        """Write the state to state_file atomically"""
+        if not self.state_file:
+            return
+        data = {
+            "updated": datetime.now(timezone.utc).isoformat(),
+            "channels": [asdict(state) for state in self.channels.values()],
+        }
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    def update(
+        self,
+        channel_id: str,
+        live: List[VideoEntry],
+        latest_video_id: Optional[str] = None,
+    ) -> List[LiveEvent]:
+        """
+        Apply one successful poll of a channel and return what changed
+
+        Args:
+            channel_id: Channel polled
+            live: Entries judged live by this poll
+            latest_video_id: ID of the newest listing entry (None to skip new_video)
+
+        Returns:
+            Events in a stable order: ended, went_live, title_changed,
+            viewers_changed, new_video
+        """
+        state = self.channels.get(channel_id)
+        first_poll = state is None
+        if state is None:
+            state = self.channels[channel_id] = ChannelState(channel_id)
+
+        current = {video.video_id: video for video in live}
+        events: List[LiveEvent] = []
+
+        for video_id, snapshot in state.live.items():
+            if video_id not in current:
+                events.append(LiveEvent("ended", channel_id, video_id, snapshot.title,
+                                        previous=snapshot.viewer_count))
+
+        changes: List[LiveEvent] = []
+        for video_id, video in current.items():
+            snapshot = state.live.get(video_id)
+            if snapshot is None:
+                events.append(LiveEvent("went_live", channel_id, video_id, video.title, video.view_count,
+                                        stream=video.to_stream_record()))
+                continue
+            if video.title and video.title != snapshot.title:
+                changes.append(LiveEvent("title_changed", channel_id, video_id, video.title,
+                                         previous=snapshot.title))
+            if viewer_level(video.view_count, self.thresholds) != viewer_level(snapshot.viewer_count, self.thresholds):
+                changes.append(LiveEvent("viewers_changed", channel_id, video_id, video.title, video.view_count,
+                                         previous=snapshot.viewer_count))
+        events.extend(sorted(changes, key=lambda e: EVENT_TYPES.index(e.type)))
+
+        if latest_video_id is not None:
+            if not first_poll and latest_video_id != state.latest_video_id:
+                events.append(LiveEvent("new_video", channel_id, latest_video_id, previous=state.latest_video_id))
+            state.latest_video_id = latest_video_id
+
+        snapshots: Dict[str, LiveSnapshot] = {}
+        for video_id, video in current.items():
+            # Keep the known title if this poll's entry has none
+            old = state.live.get(video_id)
+            snapshots[video_id] = LiveSnapshot(video.title or (old.title if old else None), video.view_count)
+        state.live = snapshots
+        return events
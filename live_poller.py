@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Continuous live-stream poller with adaptive per-channel intervals
+
+Tracks a roster of channels and decides each channel's next check from
+what the last checks saw:
+
+- live channels are polled every LIVE_INTERVAL seconds
+- channels that published seconds/minutes ago (the test_sc6_channel.py
+  heuristic) every RECENT_INTERVAL seconds
+- quiet channels start at DORMANT_INTERVAL and back off exponentially up
+  to MAX_INTERVAL for every check that finds nothing new
+
+Every poll draws one token from a global requests-per-second budget on top
+of the per-instance limits, so a large roster never hammers the public
+mirrors. Every further listing page it follows draws one more, and so
+does every video detail lookup made by --verify (failover to a second
+instance for the same request is not charged again).
+Live streams are written to stdout as Stream JSON lines after every poll.
+With --diff only changes are written instead (see live_diff.py), so a
+consumer's work follows the number of changes rather than the roster size.
+With --snapshots every poll is also appended to the observation history
+(snapshot_store.py).
+
+Usage:
+    python live_poller.py channels.txt
+    python live_poller.py channels.txt --budget 0.5 --workers 4
+    python live_poller.py channels.txt --diff poll_state.json
+    python live_poller.py channels.txt --snapshots
+"""
+
+import argparse
+import heapq
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dns_cache import prune_instances
+from instance_health import get_store
+from invidious_http import INVIDIOUS_INSTANCES
+from live_diff import DiffTracker
+from live_scanner import fetch_channel_videos, log, read_roster, resolve_roster
+from live_verifier import TOP_K, LiveVerifier
+from rate_limit import DEFAULT_BURST, DEFAULT_RATE, InstanceRateLimiter, TokenBucket
+from snapshot_store import SNAPSHOT_DIR, SnapshotStore
+from video_entry import VideoEntry
+
+# Poll intervals in seconds
+LIVE_INTERVAL = 60
+RECENT_INTERVAL = 120
+DORMANT_INTERVAL = 300
+MAX_INTERVAL = 3600
+
+# Retry delay after a poll where no instance answered (doubles per failure)
+FAILURE_INTERVAL = 60
+
+# Random spread applied to every interval so channels don't poll in lockstep
+JITTER = 0.1
+
+# Default global budget in requests per second across all instances
+DEFAULT_BUDGET = 1.0
+
+DEFAULT_WORKERS = 4
+
+# Seconds between saves of the --diff state file; it is also saved on exit
+TRACKER_SAVE_INTERVAL = 30
+
+
+@dataclass
+class ChannelSchedule:
+    """Polling state for one channel"""
+    channel_id: str
+    interval: float = DORMANT_INTERVAL
+    next_due: float = 0.0
+    idle_polls: int = 0
+    failures: int = 0
+    latest_video_id: Optional[str] = None
+    live: bool = False
+
+
+def next_interval(schedule: ChannelSchedule, videos: Optional[List[VideoEntry]]) -> float:
+    """
+    Update a schedule from a poll result and return the delay until the next poll
+
+    Args:
+        schedule: The channel's schedule (updated in place)
+        videos: The streams listing, or None if the poll failed
+
+    Returns:
+        Seconds until the channel should be polled again
+    """
+    if videos is None:
+        schedule.failures += 1
+        return min(MAX_INTERVAL, FAILURE_INTERVAL * 2 ** (schedule.failures - 1))
+    schedule.failures = 0
+
+    latest = videos[0].video_id if videos else None
+    changed = latest != schedule.latest_video_id
+    schedule.latest_video_id = latest
+    schedule.live = any(v.live_now for v in videos)
+    recent = any(v.recent for v in videos[:5])
+
+    if schedule.live:
+        schedule.idle_polls = 0
+        return LIVE_INTERVAL
+    if recent:
+        schedule.idle_polls = 0
+        return RECENT_INTERVAL
+    if changed:
+        schedule.idle_polls = 0
+    # The first quiet check still waits DORMANT_INTERVAL; each one after it doubles
+    delay = min(MAX_INTERVAL, DORMANT_INTERVAL * 2 ** schedule.idle_polls)
+    if not changed:
+        schedule.idle_polls += 1
+    return delay
+
+
+def _jittered(delay: float) -> float:
+    return delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+class LivePoller:
+    """
+    Scheduler that polls channels when they are due, within a global budget
+
+    Args:
+        channel_ids: Channels to track
+        instances: Invidious instances to use
+        budget: Global requests per second across all instances
+        workers: Polls allowed in flight at once
+        limiter: Per-instance rate limiter
+        live_now_only: Ignore the "published seconds/minutes ago" live heuristic
+        verifier: Confirms live candidates via the video detail endpoint;
+            its status cache is reused across polls, and each lookup it
+            sends is charged to the budget
+        tracker: When set, only changes are written instead of every live stream
+        sink: When set, called with (channel_id, live entries) after every
+            successful poll instead of writing to stdout
+        snapshots: When set, every poll is recorded in this history
+
+    Raises:
+        ValueError if budget is not positive
+    """
+
+    def __init__(
+        self,
+        channel_ids: List[str],
+        instances: List[str] = INVIDIOUS_INSTANCES,
+        budget: float = DEFAULT_BUDGET,
+        workers: int = DEFAULT_WORKERS,
+        limiter: Optional[InstanceRateLimiter] = None,
+        live_now_only: bool = False,
+        verifier: Optional[LiveVerifier] = None,
+        tracker: Optional[DiffTracker] = None,
+        sink: Optional[Callable[[str, List[VideoEntry]], None]] = None,
+        snapshots: Optional[SnapshotStore] = None,
+    ):
+        if budget <= 0:
+            raise ValueError(f"budget must be positive, got {budget:g}")
+        self.instances = instances
+        self.workers = max(1, workers)
+        self.budget = TokenBucket(budget, max(1, int(budget)))
+        self.limiter = limiter or InstanceRateLimiter()
+        self.live_now_only = live_now_only
+        self.verifier = verifier
+        self.tracker = tracker
+        self._tracker_dirty = False
+        self._tracker_saved = time.monotonic()
+        self.sink = sink
+        self.snapshots = snapshots
+        self._stop = threading.Event()
+        self.store = get_store()
+        self.schedules: Dict[str, ChannelSchedule] = {}
+        self._heap: List[tuple] = []
+
+        # Spread the first round over the budget instead of firing it all at once
+        now = time.monotonic()
+        for i, channel_id in enumerate(dict.fromkeys(channel_ids)):
+            schedule = ChannelSchedule(channel_id, next_due=now + i / budget)
+            self.schedules[channel_id] = schedule
+            heapq.heappush(self._heap, (schedule.next_due, channel_id))
+
+    def poll(
+        self,
+        channel_id: str,
+    ) -> Tuple[Optional[List[VideoEntry]], Optional[List[VideoEntry]], Optional[str]]:
+        """
+        Fetch one channel (runs on a worker thread)
+
+        Returns:
+            (listing, verified live entries, instance that answered); the
+            second item is None when no verifier is configured
+        """
+        instance, videos = fetch_channel_videos(channel_id, self.instances, self.store, self.limiter,
+                                               budget=self.budget)
+        if videos is None or self.verifier is None:
+            return videos, None, instance
+        return videos, self.verifier.verify({channel_id: videos}, self.budget)[channel_id], instance
+
+    def on_result(
+        self,
+        channel_id: str,
+        videos: Optional[List[VideoEntry]],
+        verified: Optional[List[VideoEntry]] = None,
+        instance: Optional[str] = None,
+    ):
+        """Handle a finished poll: report live streams and reschedule"""
+        schedule = self.schedules[channel_id]
+        delay = _jittered(next_interval(schedule, videos))
+        schedule.interval = delay
+        schedule.next_due = time.monotonic() + delay
+        heapq.heappush(self._heap, (schedule.next_due, channel_id))
+
+        if videos is None:
+            if self.snapshots is not None:
+                self.snapshots.record_poll(channel_id, None, None)
+            log(f"  [FAIL] {channel_id}: no instance answered, retry in {delay:.0f}s")
+            return
+        if verified is not None:
+            live = verified
+        else:
+            live = [v for v in videos if v.is_live(self.live_now_only)]
+        if self.snapshots is not None:
+            self.snapshots.record_poll(channel_id, instance, live)
+        if self.sink is not None:
+            self.sink(channel_id, live)
+            return
+        if self.tracker is None:
+            for video in live:
+                print(json.dumps(video.to_stream_record(), ensure_ascii=False), flush=True)
+            log(f"  {channel_id}: {len(live)} live, next poll in {delay:.0f}s")
+            return
+        events = self.tracker.update(channel_id, live, videos[0].video_id if videos else None)
+        for event in events:
+            print(json.dumps(event.to_dict(), ensure_ascii=False), flush=True)
+        self._tracker_dirty = True
+        self.save_tracker(force=False)
+        log(f"  {channel_id}: {len(live)} live, {len(events)} change(s), next poll in {delay:.0f}s")
+
+    def save_tracker(self, force: bool = True):
+        """
+        Save the --diff state if it changed since the last save
+
+        Args:
+            force: Save now instead of waiting for TRACKER_SAVE_INTERVAL
+        """
+        if self.tracker is None or not self._tracker_dirty:
+            return
+        now = time.monotonic()
+        if not force and now - self._tracker_saved < TRACKER_SAVE_INTERVAL:
+            return
+        self.tracker.save()
+        self._tracker_dirty = False
+        self._tracker_saved = now
+
+    def run(self, duration: Optional[float] = None):
+        """
+        Poll until interrupted (or for duration seconds)
+
+        Results are handled on the calling thread, so schedule state needs
+        no locking. The --diff state is saved on an interval and once more
+        on the way out.
+        """
+        stop_at = None if duration is None else time.monotonic() + duration
+        in_flight = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                while (stop_at is None or time.monotonic() < stop_at) and not self._stop.is_set():
+                    now = time.monotonic()
+                    while (self._heap and self._heap[0][0] <= now
+                           and len(in_flight) < self.workers and self.budget.try_acquire()):
+                        _, channel_id = heapq.heappop(self._heap)
+                        future = executor.submit(self.poll, channel_id)
+                        in_flight[future] = channel_id
+
+                    # Sleep until the next channel is due, a token frees up or a poll finishes
+                    timeout = 1.0
+                    if self._heap and len(in_flight) < self.workers:
+                        timeout = max(self._heap[0][0] - now, self.budget.wait_time(), 0.01)
+                    if stop_at is not None:
+                        timeout = min(timeout, max(0.0, stop_at - now))
+
+                    if in_flight:
+                        done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            channel_id = in_flight.pop(future)
+                            self.on_result(channel_id, *future.result())
+                    else:
+                        self._stop.wait(timeout)
+
+                for future in in_flight:
+                    future.cancel()
+        finally:
+            self.save_tracker()
+
+    def stop(self):
+        """Make run() return after the polls in flight (safe from any thread)"""
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continuously poll a roster of YouTube channels for live streams")
+    parser.add_argument("roster", help="File with one channel ID, handle or URL per line")
+    parser.add_argument("--instances", help="Comma-separated Invidious instances to use")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help=f"Global requests per second across all instances (default: {DEFAULT_BUDGET})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Polls in flight at once (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"Requests per second per instance (default: {DEFAULT_RATE})")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: run forever)")
+    parser.add_argument("--live-now-only", action="store_true",
+                        help="Ignore the 'published seconds/minutes ago' heuristic")
+    parser.add_argument("--verify", action="store_true",
+                        help="Confirm live candidates with the video detail endpoint before reporting them")
+    parser.add_argument("--verify-top-k", type=int, default=TOP_K,
+                        help=f"Candidates verified per channel, most recent first (default: {TOP_K})")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="Skip the DNS/TCP check that drops unreachable instances up front")
+    parser.add_argument("--diff", nargs="?", const="", metavar="STATE_FILE",
+                        help="Write change events instead of live streams; STATE_FILE keeps the state across runs")
+    parser.add_argument("--snapshots", nargs="?", const=SNAPSHOT_DIR, metavar="DIR",
+                        help=f"Append every poll to the observation history in DIR (default: {SNAPSHOT_DIR})")
+    args = parser.parse_args()
+    if args.budget <= 0:
+        parser.error("--budget must be positive")
+
+    instances = args.instances.split(",") if args.instances else INVIDIOUS_INSTANCES
+    limiter = InstanceRateLimiter(args.rate, DEFAULT_BURST)
+    store = get_store()
+    if not args.no_preflight:
+        instances = prune_instances(instances, store, log)
+    channel_ids = resolve_roster(read_roster(args.roster), instances, args.workers, limiter, store)
+
+    log(f"Polling {len(channel_ids)} channel(s) with a budget of {args.budget:g} req/s...")
+    verifier = None
+    if args.verify:
+        verifier = LiveVerifier(instances, store, limiter, top_k=args.verify_top_k,
+                                live_now_only=args.live_now_only)
+    tracker = DiffTracker(args.diff or None) if args.diff is not None else None
+    snapshots = SnapshotStore(args.snapshots) if args.snapshots else None
+    poller = LivePoller(channel_ids, instances, args.budget, args.workers, limiter, args.live_now_only, verifier,
+                        tracker, snapshots=snapshots)
+    try:
+        poller.run(args.duration)
+    except KeyboardInterrupt:
+        log("Stopped")
+    finally:
+        if verifier:
+            verifier.close()
+        if snapshots:
+            snapshots.close()
+        store.save()
+
+
+if __name__ == "__main__":
+    main()
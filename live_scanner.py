@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Batch live-stream scanner for a roster of YouTube channels
+
+Reads a file of channel IDs and/or handles (one per line, # starts a
+comment), fetches /api/v1/channels/{id}/streams for all of them
+concurrently through Invidious, and writes every live stream as soon as
+it is found. Records use the Stream shape from types/stream.ts so the web
+app can consume them directly. Progress goes to stderr, results to stdout.
+
+With --diff STATE_FILE only changes since the previous run are written
+(went_live, ended, title_changed, viewers_changed, new_video events; see
+live_diff.py), and the new state is saved for the next run.
+
+With --search, live streams are also discovered by searching Invidious for
+the SoulCalibur VI keywords (keyword_search.py); the roster becomes
+optional. Results from roster channels are left to the roster scan.
+
+With --snapshots, every channel's result is also appended to the
+observation history (snapshot_store.py).
+
+Usage:
+    python live_scanner.py channels.txt > live.jsonl
+    python live_scanner.py channels.txt --workers 32 --rate 1
+    python live_scanner.py channels.txt --format json > streams.json
+    python live_scanner.py channels.txt --diff scan_state.json > events.jsonl
+    python live_scanner.py --search > live.jsonl
+    python live_scanner.py channels.txt --snapshots > live.jsonl
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+from channel_resolver import parse_channel_ref, resolve_handle
+from dns_cache import prune_instances
+from instance_health import HealthStore, get_store
+from keyword_search import SEARCH_KEYWORDS, discover_streams
+from live_diff import DiffTracker
+from invidious_http import INVIDIOUS_INSTANCES
+from live_verifier import TOP_K, LiveVerifier
+from pagination import Page, paginate
+from rate_limit import DEFAULT_BURST, DEFAULT_RATE, InstanceRateLimiter, TokenBucket, pick_instance
+from resolution_cache import get_cache, normalise_handle
+from snapshot_store import SNAPSHOT_DIR, SnapshotStore
+from video_entry import VideoEntry, iter_entries
+
+# Channels fetched at the same time
+DEFAULT_WORKERS = 16
+
+# Listing pages followed at most per channel (see fetch_channel_videos)
+LISTING_PAGES = 5
+
+
+def log(message: str):
+    """Print progress to stderr so stdout stays machine-readable"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def read_roster(path: str) -> List[str]:
+    """Read non-empty, non-comment lines from a roster file ('-' for stdin)"""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        entries = []
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                entries.append(line)
+        return entries
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _read_listing(response) -> Page[VideoEntry]:
+    """Parse a streams listing, keeping its continuation token"""
+    siblings: Dict[str, Any] = {}
+    videos = list(iter_entries(response, siblings=siblings))
+    return Page(videos, siblings.get("continuation") or None)
+
+
+def fetch_listing_page(
+    channel_id: str,
+    instances: List[str],
+    store: HealthStore,
+    limiter: InstanceRateLimiter,
+    continuation: Optional[str] = None,
+) -> Tuple[Optional[str], Optional[Page[VideoEntry]]]:
+    """
+    Fetch one page of a channel's streams listing, failing over across instances
+
+    Args:
+        continuation: Token from the previous page (None for the first page)
+
+    Returns:
+        (instance, page) on success, (None, None) if every instance failed
+    """
+    import requests
+
+    path = f"/api/v1/channels/{channel_id}/streams"
+    if continuation:
+        path += f"?continuation={quote(continuation)}"
+    ranked = store.ranked(instances, include_throttled=True)
+    tried: Set[str] = set()
+    while True:
+        instance = pick_instance(ranked, tried, limiter)
+        if instance is None:
+            return None, None
+        tried.add(instance)
+        try:
+            status, page = store.get_json(instance, path, _read_listing)
+        except (requests.exceptions.RequestException, ValueError):
+            # Recorded by the store; ValueError is a wrong payload shape or truncated body
+            continue
+        if status == 200:
+            return instance, page
+
+
+def _past_live_entries(video: VideoEntry) -> bool:
+    """Listings are newest first, so the first finished entry ends the live ones"""
+    return not video.is_live() and not video.is_upcoming
+
+
+def fetch_channel_videos(
+    channel_id: str,
+    instances: List[str],
+    store: HealthStore,
+    limiter: InstanceRateLimiter,
+    max_pages: int = LISTING_PAGES,
+    budget: Optional[TokenBucket] = None,
+    prefetch: bool = False,
+) -> Tuple[Optional[str], Optional[List[VideoEntry]]]:
+    """
+    Fetch a channel's streams listing, failing over across instances
+
+    Further pages are only followed while every entry so far is live or
+    upcoming, so a channel running many streams at once is covered in full
+    without paging through its archive.
+
+    Args:
+        budget: When set, every page after the first waits for a token from
+            it (the caller charges the first page when it schedules the poll)
+        prefetch: Request the next page on a worker thread as each one
+            arrives. Off by default: the listing is collected before it is
+            returned, so nothing overlaps the request in flight (see the
+            paging workflows in benchmark.py)
+
+    Returns:
+        (instance, videos) on success, (None, None) if every instance failed
+        on the first page; a later page that fails ends the listing early
+    """
+    instance, first = fetch_listing_page(channel_id, instances, store, limiter)
+    if first is None:
+        return None, None
+
+    def fetch(continuation: Optional[str]) -> Page[VideoEntry]:
+        if continuation is None:
+            return first
+        if budget is not None:
+            budget.acquire()
+        return fetch_listing_page(channel_id, instances, store, limiter, continuation)[1] or Page()
+
+    return instance, paginate(fetch, until=_past_live_entries, max_pages=max_pages, prefetch=prefetch)
+
+
+def scan_channels(
+    channel_ids: List[str],
+    instances: List[str] = INVIDIOUS_INSTANCES,
+    workers: int = DEFAULT_WORKERS,
+    limiter: Optional[InstanceRateLimiter] = None,
+    store: Optional[HealthStore] = None,
+) -> Iterator[Tuple[str, Optional[str], Optional[List[VideoEntry]]]]:
+    """
+    Fetch streams listings for many channels concurrently
+
+    Yields:
+        (channel_id, instance, videos) in completion order; instance and
+        videos are None for channels no instance could answer
+    """
+    store = store or get_store()
+    limiter = limiter or InstanceRateLimiter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(fetch_channel_videos, channel_id, instances, store, limiter): channel_id
+            for channel_id in channel_ids
+        }
+        for future in as_completed(futures):
+            instance, videos = future.result()
+            yield futures[future], instance, videos
+
+
+def resolve_roster(
+    entries: List[str],
+    instances: List[str],
+    workers: int,
+    limiter: InstanceRateLimiter,
+    store: HealthStore,
+) -> List[str]:
+    """Turn roster entries into a de-duplicated list of channel IDs"""
+    channel_ids: List[str] = []
+    handles: List[str] = []
+    for entry in entries:
+        kind, value = parse_channel_ref(entry)
+        (channel_ids if kind == "id" else handles).append(value)
+
+    # Known handles come straight from the cache; only misses hit the network
+    cache = get_cache()
+    unique = list(dict.fromkeys(normalise_handle(h) for h in handles))
+    cached = cache.get_many(unique)
+    misses = [h for h in unique if h not in cached]
+    for entry in cached.values():
+        if entry.channel_id:
+            channel_ids.append(entry.channel_id)
+        else:
+            log(f"  [FAIL] @{entry.handle} is cached as not found")
+
+    if misses:
+        log(f"Resolving {len(misses)} handle(s) ({len(unique) - len(misses)} cached)...")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(resolve_handle, handle, instances, store, limiter, cache): handle
+                for handle in misses
+            }
+            for future in as_completed(futures):
+                channel_id = future.result()
+                if channel_id:
+                    channel_ids.append(channel_id)
+                else:
+                    log(f"  [FAIL] Could not resolve @{futures[future]}")
+
+    return list(dict.fromkeys(channel_ids))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a roster of YouTube channels for live streams")
+    parser.add_argument("roster", nargs="?",
+                        help="File with one channel ID, handle or URL per line ('-' for stdin)")
+    parser.add_argument("--instances", help="Comma-separated Invidious instances to use")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Channels fetched concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"Requests per second per instance (default: {DEFAULT_RATE})")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST,
+                        help=f"Back-to-back requests per instance (default: {DEFAULT_BURST})")
+    parser.add_argument("--live-now-only", action="store_true",
+                        help="Ignore the 'published seconds/minutes ago' heuristic")
+    parser.add_argument("--format", choices=["jsonl", "json"], default="jsonl",
+                        help="jsonl streams one Stream per line; json writes a StreamApiResponse at the end")
+    parser.add_argument("--verify", action="store_true",
+                        help="Confirm live candidates with the video detail endpoint before reporting them")
+    parser.add_argument("--verify-top-k", type=int, default=TOP_K,
+                        help=f"Candidates verified per channel, most recent first (default: {TOP_K})")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="Skip the DNS/TCP check that drops unreachable instances up front")
+    parser.add_argument("--diff", metavar="STATE_FILE",
+                        help="Write only changes since the run that saved STATE_FILE, then update it")
+    parser.add_argument("--search", action="store_true",
+                        help="Also discover live streams by searching for the SoulCalibur VI keywords")
+    parser.add_argument("--snapshots", nargs="?", const=SNAPSHOT_DIR, metavar="DIR",
+                        help=f"Append every channel's result to the observation history in DIR (default: {SNAPSHOT_DIR})")
+    args = parser.parse_args()
+    if not args.roster and not args.search:
+        parser.error("a roster file is required unless --search is given")
+
+    instances = args.instances.split(",") if args.instances else INVIDIOUS_INSTANCES
+    store = get_store()
+    if not args.no_preflight:
+        instances = prune_instances(instances, store, log)
+    limiter = InstanceRateLimiter(args.rate, args.burst)
+    started = time.monotonic()
+
+    channel_ids = resolve_roster(read_roster(args.roster), instances, args.workers, limiter, store) if args.roster else []
+    log(f"Scanning {len(channel_ids)} channel(s) across {len(instances)} instance(s)...")
+
+    streams: List[Dict[str, Any]] = []
+    seen: Set[str] = set()
+
+    def emit(videos: List[VideoEntry]):
+        for video in videos:
+            if video.video_id in seen or not video.is_live(args.live_now_only):
+                continue
+            seen.add(video.video_id)
+            record = video.to_stream_record()
+            streams.append(record)
+            if args.format == "jsonl":
+                print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    tracker = DiffTracker(args.diff) if args.diff else None
+    events: List[Dict[str, Any]] = []
+
+    def report(channel_id: str, videos: List[VideoEntry], live: List[VideoEntry]):
+        """Output one channel's live streams, or with --diff only what changed"""
+        if tracker is None:
+            emit(live)
+            return
+        live = [v for v in live if v.is_live(args.live_now_only)]
+        for event in tracker.update(channel_id, live, videos[0].video_id if videos else None):
+            record = event.to_dict()
+            events.append(record)
+            if args.format == "jsonl":
+                print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    snapshots = SnapshotStore(args.snapshots) if args.snapshots else None
+
+    def record(channel_id: str, instance: Optional[str], live: Optional[List[VideoEntry]]):
+        if snapshots is not None:
+            snapshots.record_poll(channel_id, instance, live and [v for v in live if v.is_live(args.live_now_only)])
+
+    # With --verify, listings are collected and their candidates checked in one batch
+    listings: Dict[str, List[VideoEntry]] = {}
+    answered_by: Dict[str, str] = {}
+    failed = 0
+    for channel_id, instance, videos in scan_channels(channel_ids, instances, args.workers, limiter, store):
+        if videos is None:
+            failed += 1
+            record(channel_id, None, None)
+            log(f"  [FAIL] {channel_id}: no instance answered")
+        elif args.verify:
+            listings[channel_id] = videos
+            answered_by[channel_id] = instance
+        else:
+            record(channel_id, instance, videos)
+            report(channel_id, videos, videos)
+
+    if args.verify:
+        verifier = LiveVerifier(instances, store, limiter, top_k=args.verify_top_k,
+                                live_now_only=args.live_now_only)
+        try:
+            for channel_id, live in verifier.verify(listings).items():
+                record(channel_id, answered_by[channel_id], live)
+                report(channel_id, listings[channel_id], live)
+        finally:
+            verifier.close()
+        log(f"Verified candidates with {verifier.lookups} detail lookup(s) "
+            f"({verifier.cache_hits} cached)")
+
+    if args.search:
+        roster = set(channel_ids)
+        found = [v for v in discover_streams(SEARCH_KEYWORDS, instances, store, limiter, workers=args.workers)
+                 if v.author_id not in roster]
+        log(f"Search found {len(found)} live stream(s) outside the roster")
+        # Search results are tracked as one pseudo-channel
+        report("search", [], found)
+
+    if snapshots is not None:
+        snapshots.close()
+    if tracker is not None:
+        tracker.save()
+        if args.format == "json":
+            print(json.dumps({
+                "events": events,
+                "lastUpdated": datetime.now(timezone.utc).isoformat(),
+            }, ensure_ascii=False, indent=2))
+    elif args.format == "json":
+        streams.sort(key=lambda s: s["viewerCount"], reverse=True)
+        print(json.dumps({
+            "streams": streams,
+            "lastUpdated": datetime.now(timezone.utc).isoformat(),
+        }, ensure_ascii=False, indent=2))
+
+    elapsed = time.monotonic() - started
+    rate = len(channel_ids) / elapsed if elapsed > 0 else 0.0
+    found = f"{len(events)} change(s)" if tracker is not None else f"{len(streams)} live stream(s)"
+    log(f"Done: {len(channel_ids) - failed}/{len(channel_ids)} channels, "
+        f"{found}, {elapsed:.1f}s ({rate:.1f} channels/s)")
+
+
+if __name__ == "__main__":
+    main()
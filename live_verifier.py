@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Batched liveNow verification for streams listings
+
+The /streams listing often carries stale liveNow flags, so debug_streams.py
+asks /api/v1/videos/{id} for the real liveNow / isUpcoming / published
+values. Doing that for every entry of every channel is an N+1 pattern;
+this module keeps it to a handful of detail calls per scan:
+
+- only entries that look live are candidates, and only the TOP_K most
+  recent of those per channel are checked
+- candidate IDs are de-duplicated across channels (collab streams show up
+  on several channels)
+- lookups fan out over a small bounded pool, and every answer is cached
+  per video ID for STATUS_TTL seconds; concurrent callers asking for the
+  same ID share one request
+- a caller with a global request budget (live_poller.py) passes it in, and
+  every lookup that goes to the network draws one token from it
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from instance_health import HealthStore, get_store
+from invidious_http import INVIDIOUS_INSTANCES
+from rate_limit import InstanceRateLimiter, TokenBucket, pick_instance
+from video_entry import VideoEntry
+
+# Candidates checked per channel, most recent first
+TOP_K = 3
+
+# Detail lookups in flight at once
+VERIFY_WORKERS = 8
+
+# Seconds a verified status is reused
+STATUS_TTL = 60
+
+# Only ask the instance for the fields we read
+STATUS_FIELDS = "videoId,liveNow,isUpcoming,published,viewCount"
+
+
+@dataclass(slots=True)
+class VideoStatus:
+    """Authoritative live state from /api/v1/videos/{id}"""
+    live_now: bool
+    is_upcoming: bool
+    published: Optional[int]
+    view_count: int
+
+
+def select_candidates(videos: List[VideoEntry], top_k: int = TOP_K, live_now_only: bool = False) -> List[VideoEntry]:
+    """
+    Pick the entries of one channel worth verifying
+
+    Returns:
+        Up to top_k entries that look live, most recently published first
+    """
+    candidates = [v for v in videos if v.is_live(live_now_only)]
+    # Stable sort: entries without a timestamp keep the listing order
+    candidates.sort(key=lambda v: v.published or 0, reverse=True)
+    return candidates[:top_k]
+
+
+def apply_status(entry: VideoEntry, status: Optional[VideoStatus]) -> VideoEntry:
+    """Return the entry updated with its verified status (unchanged if unknown)"""
+    if status is None:
+        return entry
+    return replace(
+        entry,
+        live_now=status.live_now,
+        is_upcoming=status.is_upcoming,
+        published=status.published or entry.published,
+        view_count=status.view_count or entry.view_count,
+    )
+
+
+class LiveVerifier:
+    """
+    Verifies live candidates against the video detail endpoint
+
+    Safe to share between threads; the status cache lives as long as the
+    verifier, so a long-running poller reuses answers across polls.
+
+    Args:
+        instances: Invidious instances to use
+        store: Health store used for ranking and outcome tracking
+        limiter: Per-instance rate limiter shared with the listing fetches
+        top_k: Candidates checked per channel
+        workers: Detail lookups in flight at once
+        ttl: Seconds a verified status is reused
+        live_now_only: Only treat liveNow=true entries as candidates
+    """
+
+    def __init__(
+        self,
+        instances: List[str] = INVIDIOUS_INSTANCES,
+        store: Optional[HealthStore] = None,
+        limiter: Optional[InstanceRateLimiter] = None,
+        top_k: int = TOP_K,
+        workers: int = VERIFY_WORKERS,
+        ttl: float = STATUS_TTL,
+        live_now_only: bool = False,
+    ):
+        self.instances = instances
+        self.store = store or get_store()
+        self.limiter = limiter or InstanceRateLimiter()
+        self.top_k = top_k
+        self.ttl = ttl
+        self.live_now_only = live_now_only
+        self.lookups = 0
+        self.cache_hits = 0
+        self._cache: Dict[str, Tuple[float, VideoStatus]] = {}
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    def fetch_status(self, video_id: str, budget: Optional[TokenBucket] = None) -> Optional[VideoStatus]:
+        """
+        Look up one video, failing over across instances
+
+        Args:
+            budget: When set, the lookup waits for one token from it
+                (failover to another instance is not charged again)
+
+        Returns:
+            The status, or None if no instance answered
+        """
+        import requests
+
+        if budget is not None:
+            budget.acquire()
+        ranked = self.store.ranked(self.instances, include_throttled=True)
+        tried: Set[str] = set()
+        path = f"/api/v1/videos/{video_id}?fields={STATUS_FIELDS}"
+        while True:
+            instance = pick_instance(ranked, tried, self.limiter)
+            if instance is None:
+                return None
+            tried.add(instance)
+            try:
+                response = self.store.get(instance, path)
+                if response.status_code != 200:
+                    continue
+                data = response.json()
+            except (requests.exceptions.RequestException, ValueError):
+                continue
+            if not isinstance(data, dict):
+                continue
+            entry = VideoEntry.from_dict(data)
+            return VideoStatus(entry.live_now, entry.is_upcoming, entry.published, entry.view_count)
+
+    def _lookup(self, video_id: str, budget: Optional[TokenBucket]) -> Optional[VideoStatus]:
+        try:
+            status = self.fetch_status(video_id, budget)
+        finally:
+            with self._lock:
+                self._pending.pop(video_id, None)
+        if status is not None:
+            with self._lock:
+                self._cache[video_id] = (time.monotonic() + self.ttl, status)
+        return status
+
+    def statuses(
+        self,
+        video_ids: Iterable[str],
+        budget: Optional[TokenBucket] = None,
+    ) -> Dict[str, Optional[VideoStatus]]:
+        """
+        Verified status for each video ID (None where every instance failed)
+
+        Cached answers are used as-is; the rest are looked up concurrently,
+        joining any lookup for the same ID that is already in flight.
+
+        Args:
+            video_ids: Videos to check
+            budget: Charged one token per lookup this call starts
+        """
+        results: Dict[str, Optional[VideoStatus]] = {}
+        futures: Dict[str, Future] = {}
+        now = time.monotonic()
+        with self._lock:
+            for video_id in dict.fromkeys(video_ids):
+                cached = self._cache.get(video_id)
+                if cached and cached[0] > now:
+                    results[video_id] = cached[1]
+                    self.cache_hits += 1
+                    continue
+                future = self._pending.get(video_id)
+                if future is None:
+                    future = self._pending[video_id] = self._executor.submit(self._lookup, video_id, budget)
+                    self.lookups += 1
+                futures[video_id] = future
+        for video_id, future in futures.items():
+            results[video_id] = future.result()
+        return results
+
+    def verify(
+        self,
+        listings: Dict[str, List[VideoEntry]],
+        budget: Optional[TokenBucket] = None,
+    ) -> Dict[str, List[VideoEntry]]:
+        """
+        Verify the live candidates of many channels in one batch
+
+        Args:
+            listings: Channel ID -> streams listing
+            budget: Charged one token per detail lookup sent (cache hits are free)
+
+        Returns:
+            Channel ID -> entries confirmed live. Candidates whose lookup
+            failed fall back to the listing's own heuristic.
+        """
+        candidates = {
+            channel_id: select_candidates(videos, self.top_k, self.live_now_only)
+            for channel_id, videos in listings.items()
+        }
+        statuses = self.statuses((v.video_id for videos in candidates.values() for v in videos), budget)
+
+        live: Dict[str, List[VideoEntry]] = {}
+        for channel_id, videos in candidates.items():
+            live[channel_id] = []
+            for video in videos:
+                status = statuses.get(video.video_id)
+                if status is None or status.live_now:
+                    live[channel_id].append(apply_status(video, status))
+        return live
+
+    def close(self):
+        """Stop the lookup pool"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Cursor pagination with one-page prefetch and early stop
+
+Paginated sources (Twitch GQL edges with cursors, Invidious listings with
+continuation tokens, Invidious search pages) all reduce to one function:
+given a cursor (None for the first page), return the page's items and the
+cursor of the next page (None on the last page). Paginator follows the
+cursors and asks for page N+1 on a background thread as soon as page N
+arrives, so the next request is in flight while the caller works through
+the current page. That only pays off when the caller does real work per
+page (stream_aggregator.py emits each page as it arrives); paginate()
+collects everything at once, so it fetches pages in turn instead of
+starting a thread per walk that the caller immediately waits on. The
+paging and paging-prefetch workflows in benchmark.py compare the two on
+multi-page channel listings.
+
+Pages come back ordered (by viewers, or newest first), so a cutoff can end
+the walk early. The "until" check marks the first item past the cutoff;
+the page holding it is still returned whole, but no further page is
+requested and a prefetch already in flight is discarded.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Generic, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Pages fetched at most per walk, so a misbehaving cursor cannot loop forever
+DEFAULT_MAX_PAGES = 10
+
+
+@dataclass
+class Page(Generic[T]):
+    """One page of a paginated source"""
+    items: List[T] = field(default_factory=list)
+    cursor: Optional[str] = None
+
+
+class Paginator(Generic[T]):
+    """
+    Iterate over a paginated source, page by page or item by item
+
+    Args:
+        fetch: Returns the page for a cursor (None for the first page);
+            exceptions end the walk and propagate to the caller
+        until: Returns True for the first item past the cutoff (optional)
+        max_pages: Upper bound on pages fetched
+        prefetch: Request the next page while the current one is consumed
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Optional[str]], Page[T]],
+        until: Optional[Callable[[T], bool]] = None,
+        max_pages: int = DEFAULT_MAX_PAGES,
+        prefetch: bool = True,
+    ):
+        self.fetch = fetch
+        self.until = until
+        self.max_pages = max_pages
+        self.prefetch = prefetch
+        self.pages_fetched = 0
+        self.stopped_early = False
+
+    def pages(self) -> Iterator[Page[T]]:
+        """Yield pages until the last one, a cutoff or max_pages"""
+        executor: Optional[ThreadPoolExecutor] = None
+        pending: Optional[Future] = None
+        try:
+            page = self.fetch(None)
+            self.pages_fetched = 1
+            while True:
+                more = page.cursor is not None and self.pages_fetched < self.max_pages
+                if more and self.until is not None and any(self.until(item) for item in page.items):
+                    self.stopped_early = True
+                    more = False
+                if more and self.prefetch:
+                    if executor is None:
+                        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+                    pending = executor.submit(self.fetch, page.cursor)
+                yield page
+                if not more:
+                    return
+                page = pending.result() if pending is not None else self.fetch(page.cursor)
+                pending = None
+                self.pages_fetched += 1
+        finally:
+            if executor is not None:
+                # A prefetch nobody asked for is left to finish on its own
+                executor.shutdown(wait=False)
+
+    def __iter__(self) -> Iterator[T]:
+        for page in self.pages():
+            yield from page.items
+
+    def collect(self) -> List[T]:
+        """All items of all pages walked"""
+        return list(self)
+
+
+def paginate(fetch: Callable[[Optional[str]], Page[Any]], **kwargs) -> List[Any]:
+    """Shorthand for Paginator(fetch, **kwargs).collect(), without prefetch unless asked for"""
+    kwargs.setdefault("prefetch", False)
+    return Paginator(fetch, **kwargs).collect()
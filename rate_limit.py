@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Token-bucket rate limiting for requests to Invidious instances
+
+Each instance gets its own bucket so bulk tools can spread load across
+mirrors without sending any one of them more than its configured rate.
+
+On top of the buckets, an instance that throttled us (429 or Retry-After,
+recorded by the health store) gets no tokens until its pause is over, so
+failover loops move on to other mirrors instead of hammering it.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from instance_health import HealthStore, get_store
+
+# Default sustained requests per second allowed per instance
+DEFAULT_RATE = 2.0
+
+# Default number of requests that may be sent back-to-back
+DEFAULT_BURST = 4
+
+# Longest pause pick_instance waits out when every untried instance is
+# throttled; beyond this the lookup gives up instead
+MAX_THROTTLE_WAIT = 30.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Args:
+        rate: Tokens added per second
+        burst: Maximum tokens the bucket can hold
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def wait_time(self) -> float:
+        """Seconds until a token will be available (0 if one is available now)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a token is available
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            True if a token was taken, False if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                if now >= deadline:
+                    return False
+                wait = min(wait, deadline - now)
+            time.sleep(wait)
+
+
+class InstanceRateLimiter:
+    """
+    One token bucket per instance, created on first use, gated by the
+    throttle pauses in the health store
+
+    Args:
+        rate: Requests per second allowed per instance
+        burst: Back-to-back requests allowed per instance
+        store: Health store holding throttle pauses (default: the process-wide one)
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 store: Optional[HealthStore] = None):
+        self.rate = rate
+        self.burst = burst
+        self._store = store
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> HealthStore:
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    def bucket(self, instance: str) -> TokenBucket:
+        """Return the bucket for an instance"""
+        with self._lock:
+            bucket = self._buckets.get(instance)
+            if bucket is None:
+                bucket = self._buckets[instance] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def try_acquire(self, instance: str) -> bool:
+        """Take a token for an instance if it is not throttled and one is available right now"""
+        if self.store.throttle_remaining(instance) > 0:
+            return False
+        return self.bucket(instance).try_acquire()
+
+    def wait_time(self, instance: str) -> float:
+        """Seconds until the instance will have a token, throttle pause included"""
+        return max(self.store.throttle_remaining(instance), self.bucket(instance).wait_time())
+
+    def acquire(self, instance: str, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the instance is no longer throttled and has a token
+
+        Args:
+            instance: Instance URL
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            True if a token was taken, False if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pause = self.store.throttle_remaining(instance)
+            if pause <= 0:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if self.bucket(instance).acquire(remaining):
+                    # A 429 may have arrived while this thread waited for the token
+                    if self.store.throttle_remaining(instance) <= 0:
+                        return True
+                    continue
+                return False
+            if deadline is not None:
+                if time.monotonic() + pause > deadline:
+                    return False
+            time.sleep(pause)
+
+
+def pick_instance(ranked: List[str], tried: Set[str], limiter: InstanceRateLimiter,
+                  max_wait: float = MAX_THROTTLE_WAIT) -> Optional[str]:
+    """
+    Choose the next instance for a failover loop and take a token for it
+
+    Prefers the best-ranked untried instance with a free token; if none has
+    one, waits on the untried instance that frees up first. Throttled
+    instances are only waited for if their pause ends within max_wait.
+
+    Returns:
+        The instance, or None once every instance has been tried (or is
+        throttled for longer than max_wait)
+    """
+    while True:
+        untried = [i for i in ranked if i not in tried]
+        for instance in untried:
+            if limiter.try_acquire(instance):
+                return instance
+        if not untried:
+            return None
+        instance = min(untried, key=limiter.wait_time)
+        if limiter.store.throttle_remaining(instance) > max_wait:
+            return None
+        if limiter.acquire(instance, max_wait):
+            return instance
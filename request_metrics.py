@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Per-phase timing of outbound Invidious requests
+
+The shared HTTP client (invidious_http) times every request it sends and
+records the phases here:
+
+    dns      name resolution (new connections only)
+    connect  TCP handshake (new connections only)
+    tls      TLS handshake (new HTTPS connections only)
+    ttfb     request sent until response headers arrived
+    body     reading the response body
+    decode   JSON decoding by the caller
+
+Phases that did not happen (a reused keep-alive connection has no dns,
+connect or tls) are left out rather than recorded as zero. Under the httpx
+backend DNS is part of connect.
+
+Results are kept per instance and endpoint and can be exported as JSON
+lines (one "request" event per request, plus a "decode" event when the
+caller decodes the body) and as Prometheus counters and histograms.
+
+Settings:
+    INVIDIOUS_METRICS_FILE     JSON lines file to append events to
+    INVIDIOUS_PROMETHEUS_FILE  file to write Prometheus text to at exit
+"""
+
+import atexit
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+METRICS_FILE = os.environ.get("INVIDIOUS_METRICS_FILE") or None
+PROMETHEUS_FILE = os.environ.get("INVIDIOUS_PROMETHEUS_FILE") or None
+
+PHASES = ("dns", "connect", "tls", "ttfb", "body", "decode")
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Samples kept per instance and phase for the summary percentiles
+SUMMARY_SAMPLES = 1000
+
+# Path segments replaced with a placeholder so endpoints group together
+ENDPOINT_PATTERNS = [
+    (re.compile(r"^/api/v1/channels/[^/]+"), "/api/v1/channels/:id"),
+    (re.compile(r"^/api/v1/videos/[^/]+"), "/api/v1/videos/:id"),
+]
+
+
+def split_url(url: str) -> Tuple[str, str]:
+    """Split a request URL into (instance, endpoint template)"""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path)
+    return f"{parts.scheme}://{parts.netloc}", path
+
+
+@dataclass
+class RequestTiming:
+    """Phase durations of one request, in seconds"""
+    request_id: int
+    instance: str
+    endpoint: str
+    started_at: float = field(default_factory=time.time)
+    dns: Optional[float] = None
+    connect: Optional[float] = None
+    tls: Optional[float] = None
+    ttfb: Optional[float] = None
+    body: Optional[float] = None
+    decode: Optional[float] = None
+    status: Optional[int] = None
+    error: Optional[str] = None
+    bytes: int = 0
+    finished: bool = False
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def elapsed(self) -> float:
+        """Seconds since the request started"""
+        return time.perf_counter() - self._started
+
+    def connection_time(self) -> float:
+        return (self.dns or 0.0) + (self.connect or 0.0) + (self.tls or 0.0)
+
+    def phases(self) -> Dict[str, float]:
+        """Recorded phases only"""
+        return {phase: getattr(self, phase) for phase in PHASES if getattr(self, phase) is not None}
+
+    def total(self) -> float:
+        return sum(self.phases().values())
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRecorder:
+    """
+    Thread-safe collector for request timings
+
+    Args:
+        jsonl_path: File to append JSON line events to (optional)
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = METRICS_FILE):
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._bytes: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._histograms: Dict[Tuple[str, str, str], _Histogram] = defaultdict(_Histogram)
+        self._samples: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+
+    def start(self, url: str) -> RequestTiming:
+        """Begin timing a request; it becomes this thread's current request"""
+        instance, endpoint = split_url(url)
+        timing = RequestTiming(next(self._ids), instance, endpoint)
+        self._local.current = timing
+        return timing
+
+    def current(self) -> Optional[RequestTiming]:
+        """The request most recently started on this thread"""
+        return getattr(self._local, "current", None)
+
+    def _observe(self, timing: RequestTiming, phase: str, value: float):
+        """Record one phase sample (lock held)"""
+        self._histograms[(timing.instance, timing.endpoint, phase)].observe(value)
+        samples = self._samples[(timing.instance, phase)]
+        samples.append(value)
+        if len(samples) > SUMMARY_SAMPLES:
+            del samples[: len(samples) - SUMMARY_SAMPLES]
+
+    def _write(self, event: Dict[str, Any]):
+        if not self.jsonl_path:
+            return
+        with open(self.jsonl_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+    def finish(self, timing: RequestTiming, status: Optional[int] = None, error: Optional[str] = None):
+        """Record a completed (or failed) request once"""
+        with self._lock:
+            if timing.finished:
+                return
+            timing.finished = True
+            timing.status = status
+            timing.error = error
+            status_label = str(status) if status is not None else "error"
+            self._requests[(timing.instance, timing.endpoint, status_label)] += 1
+            self._bytes[(timing.instance, timing.endpoint)] += timing.bytes
+            for phase, value in timing.phases().items():
+                if phase != "decode":
+                    self._observe(timing, phase, value)
+            self._write({
+                "event": "request",
+                "id": timing.request_id,
+                "ts": round(timing.started_at, 3),
+                "instance": timing.instance,
+                "endpoint": timing.endpoint,
+                "status": status,
+                "error": error,
+                "bytes": timing.bytes,
+                **{phase: round(value, 6) for phase, value in timing.phases().items() if phase != "decode"},
+            })
+
+    def observe_decode(self, timing: RequestTiming, seconds: float):
+        """Record the caller's JSON decode time for a request"""
+        with self._lock:
+            timing.decode = (timing.decode or 0.0) + seconds
+            self._observe(timing, "decode", seconds)
+            self._write({
+                "event": "decode",
+                "id": timing.request_id,
+                "instance": timing.instance,
+                "endpoint": timing.endpoint,
+                "decode": round(seconds, 6),
+            })
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP invidious_requests_total Outbound requests by instance, endpoint and status",
+            "# TYPE invidious_requests_total counter",
+        ]
+        with self._lock:
+            for (instance, endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f"invidious_requests_total{_labels(instance=instance, endpoint=endpoint, status=status)} {count}")
+
+            lines += [
+                "# HELP invidious_response_bytes_total Response body bytes received",
+                "# TYPE invidious_response_bytes_total counter",
+            ]
+            for (instance, endpoint), count in sorted(self._bytes.items()):
+                lines.append(f"invidious_response_bytes_total{_labels(instance=instance, endpoint=endpoint)} {count}")
+
+            lines += [
+                "# HELP invidious_request_phase_seconds Time spent per request phase",
+                "# TYPE invidious_request_phase_seconds histogram",
+            ]
+            for (instance, endpoint, phase), histogram in sorted(self._histograms.items()):
+                base = dict(instance=instance, endpoint=endpoint, phase=phase)
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    lines.append(f"invidious_request_phase_seconds_bucket{_labels(**base, le=f'{bound:g}')} {count}")
+                lines.append(f"invidious_request_phase_seconds_bucket{_labels(**base, le='+Inf')} {histogram.count}")
+                lines.append(f"invidious_request_phase_seconds_sum{_labels(**base)} {histogram.sum:.6f}")
+                lines.append(f"invidious_request_phase_seconds_count{_labels(**base)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write prometheus_text() to a file atomically"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def phase_median(self, instance: str, phase: str) -> Optional[float]:
+        """Median of the recent samples of a phase on an instance"""
+        with self._lock:
+            samples = sorted(self._samples.get((instance, phase), ()))
+        return samples[len(samples) // 2] if samples else None
+
+
+def format_ms(seconds: Optional[float]) -> str:
+    """Seconds as a short millisecond string ("-" when missing)"""
+    return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+
+def print_table(headers: List[str], rows: List[List[str]]):
+    """Print rows as a left-aligned fixed-width table"""
+    widths = [max(len(h), *(len(r[i]) for r in rows)) if rows else len(h) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(cell.ljust(w) for cell, w in zip(row, widths)))
+
+
+_recorder: Optional[MetricsRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder() -> MetricsRecorder:
+    """Return the process-wide recorder (writes PROMETHEUS_FILE at exit if set)"""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = MetricsRecorder()
+                if PROMETHEUS_FILE:
+                    atexit.register(_recorder.write_prometheus, PROMETHEUS_FILE)
+    return _recorder
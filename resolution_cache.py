@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Persistent handle → channel ID cache
+
+A handle's channel ID almost never changes, so resolved handles are kept
+in a small SQLite database and reused until their TTL expires. Handles that
+could not be resolved are cached too (for a shorter time) so typos and
+deleted channels don't trigger a search on every run.
+
+The database lives in channel_cache.sqlite3 by default; override the path
+with INVIDIOUS_RESOLUTION_CACHE.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+CACHE_FILE = os.environ.get("INVIDIOUS_RESOLUTION_CACHE", "channel_cache.sqlite3")
+
+# Seconds a resolved handle stays valid
+POSITIVE_TTL = 30 * 24 * 3600
+
+# Seconds a handle that did not resolve stays cached as "not found"
+NEGATIVE_TTL = 24 * 3600
+
+
+@dataclass
+class CachedHandle:
+    """Cached resolution result; channel_id is None for negative entries"""
+    handle: str
+    channel_id: Optional[str]
+    author: Optional[str]
+    resolved_at: float
+
+
+def normalise_handle(handle: str) -> str:
+    """Handles are case-insensitive and may be written with or without @"""
+    return handle.strip().lstrip("@").lower()
+
+
+def is_channel_result(result: Any) -> bool:
+    """Whether a search result is a channel that can be cached"""
+    return isinstance(result, dict) and result.get("type") == "channel" and bool(result.get("authorId"))
+
+
+def channel_handle(channel: dict) -> str:
+    """A channel search result's handle, normalised like the cache keys"""
+    return normalise_handle(channel.get("channelHandle") or "")
+
+
+def pick_channel(results: Iterable[Any], handle: str) -> Optional[dict]:
+    """
+    Choose the channel result that best matches a handle
+
+    Every tool that writes search answers to the cache picks through this,
+    so a handle resolves to the same channel whichever tool looked it up.
+    Prefers an exact channelHandle match, then the first channel result.
+    Stops consuming results at the exact match, so a streamed search
+    response is only read as far as needed.
+    """
+    key = normalise_handle(handle)
+    first = None
+    for channel in results:
+        if not is_channel_result(channel):
+            continue
+        if channel_handle(channel) == key:
+            return channel
+        if first is None:
+            first = channel
+    return first
+
+
+class ResolutionCache:
+    """
+    SQLite-backed handle cache, safe to share between threads
+
+    Args:
+        path: Database file (":memory:" for a throwaway cache)
+        ttl: Seconds positive entries stay valid
+        negative_ttl: Seconds negative entries stay valid
+    """
+
+    def __init__(self, path: str = CACHE_FILE, ttl: float = POSITIVE_TTL, negative_ttl: float = NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS handles ("
+            " handle TEXT PRIMARY KEY,"
+            " channel_id TEXT,"
+            " author TEXT,"
+            " resolved_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _is_fresh(self, channel_id: Optional[str], resolved_at: float, now: float) -> bool:
+        ttl = self.ttl if channel_id else self.negative_ttl
+        return now - resolved_at < ttl
+
+    def get(self, handle: str) -> Optional[CachedHandle]:
+        """
+        Look up a handle
+
+        Returns:
+            The cached entry if present and not expired, otherwise None
+        """
+        key = normalise_handle(handle)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT channel_id, author, resolved_at FROM handles WHERE handle = ?", (key,)
+            ).fetchone()
+        if row is None or not self._is_fresh(row[0], row[2], time.time()):
+            return None
+        return CachedHandle(key, row[0], row[1], row[2])
+
+    def get_many(self, handles: Iterable[str]) -> Dict[str, CachedHandle]:
+        """Look up several handles at once; only fresh hits are returned"""
+        keys = list(dict.fromkeys(normalise_handle(h) for h in handles))
+        now = time.time()
+        hits: Dict[str, CachedHandle] = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT handle, channel_id, author, resolved_at FROM handles"
+                    f" WHERE handle IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, channel_id, author, resolved_at in rows:
+                    if self._is_fresh(channel_id, resolved_at, now):
+                        hits[key] = CachedHandle(key, channel_id, author, resolved_at)
+        return hits
+
+    def put(self, handle: str, channel_id: Optional[str], author: Optional[str] = None):
+        """Store a resolution result (channel_id None records a negative entry)"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO handles (handle, channel_id, author, resolved_at) VALUES (?, ?, ?, ?)",
+                (normalise_handle(handle), channel_id, author, time.time()),
+            )
+            self._db.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed"""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM handles WHERE"
+                " (channel_id IS NOT NULL AND resolved_at < ?)"
+                " OR (channel_id IS NULL AND resolved_at < ?)",
+                (now - self.ttl, now - self.negative_ttl),
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_cache: Optional[ResolutionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResolutionCache:
+    """Return the process-wide cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResolutionCache()
+    return _cache
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Local HTTP response cache for Invidious API calls
+
+Responses are keyed by full URL (instance + path + query) and stored in
+SQLite together with their ETag / Last-Modified validators. A fresh entry
+is served without touching the network; a stale entry with validators is
+revalidated with a conditional request, so an unchanged resource costs a
+304 instead of a full download.
+
+Freshness comes from Cache-Control max-age when the instance sends it,
+otherwise from the per-endpoint TTLs in ENDPOINT_TTLS. The cache is
+bounded by total body size and evicts least-recently-used entries.
+
+Settings:
+    INVIDIOUS_RESPONSE_CACHE      database path (default response_cache.sqlite3)
+    INVIDIOUS_RESPONSE_CACHE_MB   maximum total body size in MB (default 64)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CACHE_FILE = os.environ.get("INVIDIOUS_RESPONSE_CACHE", "response_cache.sqlite3")
+MAX_BYTES = int(float(os.environ.get("INVIDIOUS_RESPONSE_CACHE_MB", "64")) * 1024 * 1024)
+
+# Fallback freshness (seconds) when the response has no Cache-Control max-age.
+# First matching pattern wins; paths that match nothing are not cached.
+ENDPOINT_TTLS: List[Tuple[re.Pattern, float]] = [
+    (re.compile(r"^/api/v1/channels/[^/?]+/(streams|videos)"), 60),
+    (re.compile(r"^/api/v1/channels/[^/?]+(\?|$)"), 600),
+    (re.compile(r"^/api/v1/videos/"), 60),
+    (re.compile(r"^/api/v1/search"), 300),
+]
+
+# Response headers worth keeping with the cached body
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Date")
+
+MAX_AGE_PATTERN = re.compile(r"max-age\s*=\s*(\d+)")
+
+
+class CachedResponse:
+    """
+    Response served from the cache
+
+    Mirrors the parts of requests.Response the scripts use.
+    cache_status is "hit" (no request sent) or "revalidated" (304 received).
+    """
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes, cache_status: str):
+        from requests.structures import CaseInsensitiveDict
+
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.cache_status = cache_status
+        self.encoding = "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self, **kwargs) -> Any:
+        return json.loads(self.content, **kwargs)
+
+    def close(self):
+        """Nothing to release - present so callers can treat all responses alike"""
+
+
+def _path_of(url: str) -> str:
+    """Strip scheme and host, keeping path and query"""
+    match = re.match(r"^[a-z]+://[^/]+(/.*)?$", url)
+    return (match.group(1) or "/") if match else url
+
+
+def freshness(url: str, headers: Dict[str, str]) -> Optional[float]:
+    """
+    Seconds a response may be served without revalidation
+
+    Returns:
+        The lifetime, or None if the response must not be stored
+    """
+    cache_control = (headers.get("Cache-Control") or "").lower()
+    if "no-store" in cache_control or "private" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+    match = MAX_AGE_PATTERN.search(cache_control)
+    if match:
+        return float(match.group(1))
+
+    path = _path_of(url)
+    for pattern, ttl in ENDPOINT_TTLS:
+        if pattern.search(path):
+            return ttl
+    return None
+
+
+class ResponseCache:
+    """
+    SQLite-backed, size-bounded LRU response cache, safe to share between threads
+
+    Args:
+        path: Database file (":memory:" for a throwaway cache)
+        max_bytes: Total body size kept before least-recently-used entries are evicted
+    """
+
+    def __init__(self, path: str = CACHE_FILE, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY,"
+            " status INTEGER NOT NULL,"
+            " headers TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._db.commit()
+
+    def _load(self, url: str) -> Optional[Tuple[int, Dict[str, str], bytes, float]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, expires_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+                self._db.commit()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2], row[3]
+
+    def _store(self, url: str, status: int, headers: Dict[str, str], body: bytes, ttl: float):
+        now = time.time()
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, status, headers, body, size, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, status, json.dumps(headers), body, len(body), now + ttl, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _touch(self, url: str, headers: Dict[str, str], ttl: float):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE responses SET headers = ?, expires_at = ?, last_access = ? WHERE url = ?",
+                (json.dumps(headers), now + ttl, now, url),
+            )
+            self._db.commit()
+
+    def _evict(self):
+        """Drop least-recently-used entries until the size bound holds (lock held)"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall():
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def fetch(self, url: str, send: Callable[[Dict[str, str]], Any], headers: Optional[Dict[str, str]] = None):
+        """
+        Serve a GET from the cache, revalidating or fetching as needed
+
+        Args:
+            url: Full request URL (the cache key)
+            send: Performs the real request given the request headers
+            headers: Caller's request headers
+
+        Returns:
+            A CachedResponse for hits and 304 revalidations, otherwise the
+            response returned by send (with cache_status set to "miss")
+        """
+        headers = dict(headers or {})
+        cached = self._load(url)
+
+        if cached is not None:
+            status, stored_headers, body, expires_at = cached
+            if time.time() < expires_at:
+                return CachedResponse(url, status, stored_headers, body, "hit")
+            if stored_headers.get("ETag"):
+                headers["If-None-Match"] = stored_headers["ETag"]
+            if stored_headers.get("Last-Modified"):
+                headers["If-Modified-Since"] = stored_headers["Last-Modified"]
+
+        response = send(headers)
+
+        if response.status_code == 304 and cached is not None:
+            status, stored_headers, body, _ = cached
+            merged = dict(stored_headers)
+            merged.update({k: response.headers[k] for k in KEPT_HEADERS if k in response.headers})
+            ttl = freshness(url, merged)
+            self._touch(url, merged, ttl or 0.0)
+            return CachedResponse(url, status, merged, body, "revalidated")
+
+        response.cache_status = "miss"
+        if response.status_code == 200:
+            kept = {k: response.headers[k] for k in KEPT_HEADERS if k in response.headers}
+            ttl = freshness(url, kept)
+            if ttl is not None:
+                self._store(url, response.status_code, kept, response.content, ttl)
+        return response
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Return the process-wide response cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
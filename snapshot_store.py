@@ -0,0 +1,743 @@
+#!/usr/bin/env python3
+"""
+Append-only history of stream observations in columnar day partitions
+
+Every poll of a channel becomes one or more observation rows: the channel,
+the live video (if any) with its viewer count and liveNow flag, the
+instance that answered, and the time. Rows are split into one directory
+per UTC day. Each column lives in its own file of fixed-width binary
+values, in native byte order:
+
+    snapshots/2026-10-18/time.col       int64    Unix seconds
+                         channel.col    uint32   string ID
+                         video.col      uint32   string ID ("" = nothing live)
+                         instance.col   uint32   string ID ("" = none answered)
+                         viewers.col    uint32
+                         flags.col      uint8    LIVE_NOW | ANSWERED | PROBE
+                         strings.txt    the partition's strings, one per line
+
+Appending a row writes a few bytes to each column file. Nothing is
+rewritten, and a crash can at most leave a partial row, which is cut off
+the next time the partition is opened. Queries memory-map the column files
+and read only the columns and rows they need.
+
+Once a day is over, seal() rewrites its partition sorted by channel and
+time, next to two small binary indexes: each channel's row range
+(channels.idx) and hourly probe counts per instance (probes.idx).
+sealed.json is written last and marks the partition complete. A viewer
+time series is then a bisected slice of a few columns, and instance
+uptime reads only the probe index, so queries over months of history
+take milliseconds. Sealed partitions are read-only.
+The current day is scanned; it is sealed when the writer moves on to the
+next day.
+
+Uptime counts PROBE rows: one per instance check, such as each instance
+answering (or not) in test_invidious_channel.py. Scanner and poller rows
+are not probes, because a failed poll does not say which instances were
+down.
+
+Any number of processes may read and write a directory at the same time
+(the scanner, the poller, the feed server and the instance probe all
+default to snapshots/). Writers take turns through an exclusive lock on
+snapshots/.lock for each append, and pick up the strings the others
+added before writing their own.
+
+Settings:
+    SNAPSHOT_DIR   snapshot directory (default snapshots)
+
+Usage:
+    python snapshot_store.py stats
+    python snapshot_store.py series UCxxxxxxxxxxxxxxxxxxxxxx --days 30
+    python snapshot_store.py uptime --days 90
+    python snapshot_store.py seal
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from video_entry import VideoEntry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+
+PARTITION_SECONDS = 86400
+BUCKET_SECONDS = 3600
+
+# Column name -> array typecode
+COLUMNS = (
+    ("time", "q"),
+    ("channel", "I"),
+    ("video", "I"),
+    ("instance", "I"),
+    ("viewers", "I"),
+    ("flags", "B"),
+)
+
+# Row flags
+LIVE_NOW = 1   # the listing's liveNow flag was set
+ANSWERED = 2   # an instance answered the poll
+PROBE = 4      # first row of an instance check, counted for uptime
+
+STRINGS_FILE = "strings.txt"
+SEALED_FILE = "sealed.json"
+SORTED_SUFFIX = ".sorted"
+LOCK_FILE = ".lock"
+
+# Indexes written by seal(): uint32 (channel, first row, end row) triples,
+# and int64 (instance, hour, answered, probes) quadruples
+CHANNEL_INDEX = "channels.idx"
+PROBE_INDEX = "probes.idx"
+
+PARTITION_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+MAX_VIEWERS = 2 ** 32 - 1
+
+
+@dataclass
+class Observation:
+    """One row of the snapshot store"""
+    time: int
+    channel_id: str
+    video_id: str = ""
+    live_now: bool = False
+    view_count: int = 0
+    instance: str = ""
+    answered: bool = True
+    probe: bool = False
+
+    @property
+    def flags(self) -> int:
+        return (LIVE_NOW if self.live_now else 0) | (ANSWERED if self.answered else 0) | (PROBE if self.probe else 0)
+
+
+class SeriesPoint(NamedTuple):
+    time: int
+    video_id: str
+    viewers: int
+    live_now: bool
+
+
+@dataclass
+class Uptime:
+    """Probe outcomes for one instance"""
+    answered: int = 0
+    probes: int = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.answered / self.probes if self.probes else 0.0
+
+
+def partition_name(timestamp: float) -> str:
+    """Directory name of the UTC day holding a timestamp"""
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+def partition_start(name: str) -> int:
+    """Unix time at which a partition's day starts"""
+    return int(datetime.strptime(name, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+
+def _column_path(directory: str, column: str, sealed: bool) -> str:
+    return os.path.join(directory, f"{column}.col{SORTED_SUFFIX if sealed else ''}")
+
+
+def _read_strings(directory: str) -> List[str]:
+    try:
+        with open(os.path.join(directory, STRINGS_FILE), "r", encoding="utf-8", newline="\n") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return [""]
+    # A line without its newline was cut short by a crash and is not referenced
+    return text.split("\n")[:-1] or [""]
+
+
+class Partition:
+    """
+    Read-only, memory-mapped view of one day's columns
+
+    Columns, strings and the sealed indexes are loaded on first use, so a
+    query pays only for what it reads.
+
+    Args:
+        directory: Partition directory
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.name = os.path.basename(directory)
+        self.start = partition_start(self.name)
+        self.sealed = os.path.exists(os.path.join(directory, SEALED_FILE))
+        self._maps: List[mmap.mmap] = []
+        self._views: Dict[str, memoryview] = {}
+        self._strings: Optional[List[str]] = None
+        self._ids: Optional[Dict[str, int]] = None
+        self._channels: Optional[Dict[int, Tuple[int, int]]] = None
+        # Sized before the strings are read, so every counted row's strings exist
+        self.rows = min(self._file_size(column) // array(code).itemsize for column, code in COLUMNS)
+
+    def _file_size(self, column: str) -> int:
+        try:
+            return os.path.getsize(_column_path(self.directory, column, self.sealed))
+        except FileNotFoundError:
+            return 0
+
+    def column(self, name: str) -> memoryview:
+        """One column as a sequence of rows numbers"""
+        view = self._views.get(name)
+        if view is None:
+            code = dict(COLUMNS)[name]
+            size = self.rows * array(code).itemsize
+            if size == 0:
+                view = memoryview(array(code))
+            else:
+                with open(_column_path(self.directory, name, self.sealed), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+                self._maps.append(mapped)
+                view = memoryview(mapped).cast(code)
+            self._views[name] = view
+        return view
+
+    @property
+    def strings(self) -> List[str]:
+        if self._strings is None:
+            self._strings = _read_strings(self.directory)
+        return self._strings
+
+    def string_id(self, value: str) -> Optional[int]:
+        if self._ids is None:
+            self._ids = {string: index for index, string in enumerate(self.strings)}
+        return self._ids.get(value)
+
+    def _read_index(self, filename: str, code: str) -> array:
+        values = array(code)
+        path = os.path.join(self.directory, filename)
+        with open(path, "rb") as f:
+            values.fromfile(f, os.path.getsize(path) // values.itemsize)
+        return values
+
+    def channel_rows(self, channel_id: str) -> range:
+        """
+        Row numbers of one channel
+
+        Returns:
+            For a sealed partition, the channel's rows (sorted by time);
+            for an open one, every row, to be filtered by the caller
+        """
+        if not self.sealed:
+            return range(self.rows)
+        index = self.string_id(channel_id)
+        if index is None:
+            return range(0)
+        if self._channels is None:
+            triples = self._read_index(CHANNEL_INDEX, "I")
+            self._channels = {triples[i]: (triples[i + 1], triples[i + 2]) for i in range(0, len(triples), 3)}
+        return range(*self._channels.get(index, (0, 0)))
+
+    def probe_counts(self) -> Iterator[Tuple[str, int, int, int]]:
+        """(instance, hour start, answered, probes) of a sealed partition"""
+        values = self._read_index(PROBE_INDEX, "q")
+        strings = self.strings
+        for i in range(0, len(values), 4):
+            yield strings[values[i]], values[i + 1], values[i + 2], values[i + 3]
+
+    def observation(self, row: int) -> Observation:
+        strings = self.strings
+        flags = self.column("flags")[row]
+        return Observation(
+            time=self.column("time")[row],
+            channel_id=strings[self.column("channel")[row]],
+            video_id=strings[self.column("video")[row]],
+            live_now=bool(flags & LIVE_NOW),
+            view_count=self.column("viewers")[row],
+            instance=strings[self.column("instance")[row]],
+            answered=bool(flags & ANSWERED),
+            probe=bool(flags & PROBE),
+        )
+
+    def close(self):
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+
+class _DirectoryLock:
+    """Exclusive lock shared by every process writing to one snapshot directory"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(os.path.join(directory, LOCK_FILE), "a+b")
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def close(self):
+        self._file.close()
+
+
+class _PartitionWriter:
+    """
+    Appends rows to one unsealed partition
+
+    Other processes may append to the same partition between two calls, so
+    append() must run under the directory lock; it first catches up with
+    their strings and rows.
+    """
+
+    def __init__(self, directory: str):
+        if os.path.exists(os.path.join(directory, SEALED_FILE)):
+            raise ValueError(f"Partition {directory} is sealed")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        # Bytes of strings.txt already loaded into self.strings
+        self._strings_read = 0
+        self._strings_file = open(os.path.join(directory, STRINGS_FILE), "a+b")
+        self._files = {column: open(_column_path(directory, column, False), "ab") for column, _ in COLUMNS}
+
+    def _sync(self):
+        """Load strings other writers added and cut off a partial row or string left by a crash"""
+        if os.path.exists(os.path.join(self.directory, SEALED_FILE)):
+            raise ValueError(f"Partition {self.directory} was sealed by another process")
+        f = self._strings_file
+        f.seek(self._strings_read)
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(self._strings_read + end)
+        for value in data[:end].decode("utf-8").split("\n")[:-1]:
+            self._ids.setdefault(value, len(self.strings))
+            self.strings.append(value)
+        self._strings_read += end
+        if not self.strings:
+            # String 0 is the empty string
+            self._add_string("")
+
+        sizes = {column: os.fstat(f.fileno()).st_size for column, f in self._files.items()}
+        rows = min(sizes[column] // array(code).itemsize for column, code in COLUMNS)
+        for column, code in COLUMNS:
+            if sizes[column] != rows * array(code).itemsize:
+                self._files[column].truncate(rows * array(code).itemsize)
+
+    def _add_string(self, value: str) -> int:
+        index = self._ids[value] = len(self.strings)
+        self.strings.append(value)
+        data = value.encode("utf-8") + b"\n"
+        self._strings_file.write(data)
+        self._strings_read += len(data)
+        return index
+
+    def _intern(self, value: str) -> int:
+        value = value.replace("\n", " ")
+        index = self._ids.get(value)
+        if index is None:
+            index = self._add_string(value)
+        return index
+
+    def append(self, observations: List[Observation]):
+        self._sync()
+        columns = {column: array(code) for column, code in COLUMNS}
+        for obs in observations:
+            columns["time"].append(int(obs.time))
+            columns["channel"].append(self._intern(obs.channel_id))
+            columns["video"].append(self._intern(obs.video_id))
+            columns["instance"].append(self._intern(obs.instance))
+            columns["viewers"].append(min(max(int(obs.view_count), 0), MAX_VIEWERS))
+            columns["flags"].append(obs.flags)
+        # Strings reach the disk before the rows that refer to them
+        self._strings_file.flush()
+        for column, values in columns.items():
+            values.tofile(self._files[column])
+            self._files[column].flush()
+
+    def close(self):
+        self._strings_file.close()
+        for f in self._files.values():
+            f.close()
+
+
+def seal_partition(directory: str) -> bool:
+    """
+    Rewrite a finished partition sorted by (channel, time) and summarise it
+
+    Returns:
+        True if the partition was sealed now, False if it already was
+    """
+    if os.path.exists(os.path.join(directory, SEALED_FILE)):
+        # Remove unsorted columns left by a crash after sealing
+        for column, _ in COLUMNS:
+            if os.path.exists(_column_path(directory, column, False)):
+                os.remove(_column_path(directory, column, False))
+        return False
+
+    part = Partition(directory)
+    try:
+        values = {column: part.column(column).tolist() for column, _ in COLUMNS}
+    finally:
+        part.close()
+    times, channels, flags, instances = values["time"], values["channel"], values["flags"], values["instance"]
+    order = sorted(range(len(times)), key=lambda row: (channels[row], times[row]))
+
+    channel_index = array("I")
+    probes: Dict[Tuple[int, int], List[int]] = {}
+    for position, row in enumerate(order):
+        if not channel_index or channel_index[-3] != channels[row]:
+            channel_index.extend((channels[row], position, position))
+        channel_index[-1] = position + 1
+        if flags[row] & PROBE:
+            counts = probes.setdefault((instances[row], times[row] - times[row] % BUCKET_SECONDS), [0, 0])
+            counts[0] += 1 if flags[row] & ANSWERED else 0
+            counts[1] += 1
+    probe_index = array("q")
+    for (instance, bucket), (answered, total) in sorted(probes.items()):
+        probe_index.extend((instance, bucket, answered, total))
+
+    outputs = [(_column_path(directory, column, True), array(code, (values[column][row] for row in order)))
+               for column, code in COLUMNS]
+    outputs += [(os.path.join(directory, CHANNEL_INDEX), channel_index),
+                (os.path.join(directory, PROBE_INDEX), probe_index)]
+    for path, data in outputs:
+        with open(path + ".tmp", "wb") as f:
+            data.tofile(f)
+        os.replace(path + ".tmp", path)
+
+    # sealed.json goes last: it is what marks the sorted files as complete
+    tmp_path = os.path.join(directory, SEALED_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"rows": len(order), "channels": len(channel_index) // 3}, f)
+    os.replace(tmp_path, os.path.join(directory, SEALED_FILE))
+    for column, _ in COLUMNS:
+        os.remove(_column_path(directory, column, False))
+    return True
+
+
+class SnapshotStore:
+    """
+    Writer and query interface for a snapshot directory, safe to share between threads
+
+    Args:
+        directory: Snapshot directory (one subdirectory per UTC day)
+    """
+
+    def __init__(self, directory: str = SNAPSHOT_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._writer: Optional[_PartitionWriter] = None
+        self._writer_name: Optional[str] = None
+        self._directory_lock: Optional[_DirectoryLock] = None
+        # Sealed partitions never change, so their maps are kept open
+        self._sealed: Dict[str, Partition] = {}
+
+    def _write_lock(self) -> _DirectoryLock:
+        """The lock between writing processes (call with self._lock held)"""
+        if self._directory_lock is None:
+            self._directory_lock = _DirectoryLock(self.directory)
+        return self._directory_lock
+
+    # --- writing ---
+
+    def append(self, observations: Iterable[Observation]):
+        """Append rows; sealing every earlier day once a new day starts"""
+        by_partition: Dict[str, List[Observation]] = {}
+        for obs in observations:
+            by_partition.setdefault(partition_name(obs.time), []).append(obs)
+        with self._lock, self._write_lock():
+            for name in sorted(by_partition):
+                try:
+                    if name != self._writer_name:
+                        rolled_over = self._writer_name is not None and name > self._writer_name
+                        self._close_writer()
+                        if rolled_over:
+                            self._seal_before(name)
+                        self._writer = _PartitionWriter(os.path.join(self.directory, name))
+                        self._writer_name = name
+                    self._writer.append(by_partition[name])
+                except ValueError as e:
+                    # Another process sealed the day since these rows were observed
+                    self._close_writer()
+                    print(f"[SKIP] {e}: {len(by_partition[name])} row(s) not recorded", file=sys.stderr)
+
+    def record_poll(
+        self,
+        channel_id: str,
+        instance: Optional[str],
+        live: Optional[List[VideoEntry]],
+        at: Optional[float] = None,
+        probe: bool = False,
+    ):
+        """
+        Record one poll of a channel
+
+        Args:
+            channel_id: Channel polled
+            instance: Instance that answered, or the one probed
+            live: Live entries found, or None if the poll failed
+            at: Poll time (default: now)
+            probe: Count the poll towards the instance's uptime
+        """
+        at = int(at if at is not None else time.time())
+        if not live:
+            self.append([Observation(at, channel_id, instance=instance or "", answered=live is not None,
+                                     probe=probe)])
+            return
+        self.append([
+            Observation(at, channel_id, video.video_id, video.live_now, video.view_count, instance or "",
+                        probe=probe and index == 0)
+            for index, video in enumerate(live)
+        ])
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+        self._writer_name = None
+
+    def _seal_before(self, name: str) -> int:
+        if self._writer_name is not None and self._writer_name < name:
+            self._close_writer()
+        sealed = 0
+        for other in self.partition_names():
+            if other < name and seal_partition(os.path.join(self.directory, other)):
+                sealed += 1
+        return sealed
+
+    def seal(self) -> int:
+        """
+        Seal every partition before the current UTC day
+
+        Returns:
+            Number of partitions sealed
+        """
+        with self._lock, self._write_lock():
+            return self._seal_before(partition_name(time.time()))
+
+    # --- reading ---
+
+    def partition_names(self, start: Optional[float] = None, end: Optional[float] = None) -> List[str]:
+        """Day partitions overlapping [start, end), oldest first"""
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if PARTITION_PATTERN.match(name))
+        except FileNotFoundError:
+            return []
+        return [name for name in names
+                if (start is None or partition_start(name) + PARTITION_SECONDS > start)
+                and (end is None or partition_start(name) < end)]
+
+    def _partitions(self, start: Optional[float], end: Optional[float]) -> Iterator[Partition]:
+        for name in self.partition_names(start, end):
+            part = self._sealed.get(name)
+            if part is not None:
+                yield part
+                continue
+            part = Partition(os.path.join(self.directory, name))
+            if part.sealed:
+                with self._lock:
+                    part = self._sealed.setdefault(name, part)
+                yield part
+                continue
+            try:
+                yield part
+            finally:
+                part.close()
+
+    def viewer_series(
+        self,
+        channel_id: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> List[SeriesPoint]:
+        """
+        Viewer counts of a channel's live videos over time
+
+        Args:
+            channel_id: Channel to look up
+            start: Earliest Unix time included (default: all history)
+            end: Unix time before which points are included (default: now)
+
+        Returns:
+            One point per live video per poll, oldest first
+        """
+        points: List[SeriesPoint] = []
+        for part in self._partitions(start, end):
+            rows = part.channel_rows(channel_id)
+            if not rows:
+                continue
+            times = part.column("time")
+            first, last = rows.start, rows.stop
+            if part.sealed:
+                # A sealed channel's rows are in time order: bisect to the range
+                if start is not None:
+                    first = bisect.bisect_left(times, int(start), first, last)
+                if end is not None:
+                    last = bisect.bisect_left(times, int(end), first, last)
+                selected = range(last - first)
+            else:
+                index = part.string_id(channel_id)
+                channels = part.column("channel").tolist()
+                selected = [row for row, channel in enumerate(channels) if channel == index
+                            and (start is None or times[row] >= start) and (end is None or times[row] < end)]
+                first, last = 0, part.rows
+            columns = [part.column(name)[first:last].tolist() for name in ("time", "video", "viewers", "flags")]
+            strings = part.strings
+            for row in selected:
+                moment, video, viewers, flags = (values[row] for values in columns)
+                if video:
+                    points.append(SeriesPoint(moment, strings[video], viewers, bool(flags & LIVE_NOW)))
+        return points
+
+    def instance_uptime(self, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, Uptime]:
+        """
+        Share of probes each instance answered
+
+        Sealed days are counted by the hour, so start and end are rounded
+        to whole hours there.
+
+        Returns:
+            Instance URL -> probe counts
+        """
+        uptime: Dict[str, Uptime] = {}
+        for part in self._partitions(start, end):
+            if part.sealed:
+                counts = ((instance, answered, probes) for instance, bucket, answered, probes in part.probe_counts()
+                          if (start is None or bucket + BUCKET_SECONDS > start) and (end is None or bucket < end))
+            else:
+                times = part.column("time")
+                instances = part.column("instance")
+                counts = ((part.strings[instances[row]], 1 if flags & ANSWERED else 0, 1)
+                          for row, flags in enumerate(part.column("flags").tolist())
+                          if flags & PROBE and (start is None or times[row] >= start)
+                          and (end is None or times[row] < end))
+            for instance, answered, probes in counts:
+                entry = uptime.get(instance)
+                if entry is None:
+                    entry = uptime[instance] = Uptime()
+                entry.answered += answered
+                entry.probes += probes
+        uptime.pop("", None)
+        return uptime
+
+    def observations(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Observation]:
+        """Every row in [start, end), partition by partition"""
+        for part in self._partitions(start, end):
+            times = part.column("time")
+            for row in range(part.rows):
+                if (start is None or times[row] >= start) and (end is None or times[row] < end):
+                    yield part.observation(row)
+
+    def stats(self) -> Dict[str, Any]:
+        names = self.partition_names()
+        size = sum(entry.stat().st_size for name in names
+                   for entry in os.scandir(os.path.join(self.directory, name)))
+        sealed = sum(1 for name in names if os.path.exists(os.path.join(self.directory, name, SEALED_FILE)))
+        rows = 0
+        for part in self._partitions(None, None):
+            rows += part.rows
+        return {"partitions": len(names), "sealed": sealed, "rows": rows, "bytes": size}
+
+    def drop_before(self, timestamp: float) -> int:
+        """
+        Delete whole days that end before a timestamp
+
+        Returns:
+            Number of partitions deleted
+        """
+        dropped = 0
+        with self._lock, self._write_lock():
+            for name in self.partition_names(end=timestamp):
+                if partition_start(name) + PARTITION_SECONDS > timestamp or name == self._writer_name:
+                    continue
+                part = self._sealed.pop(name, None)
+                if part is not None:
+                    part.close()
+                shutil.rmtree(os.path.join(self.directory, name))
+                dropped += 1
+        return dropped
+
+    def close(self):
+        with self._lock:
+            self._close_writer()
+            if self._directory_lock is not None:
+                self._directory_lock.close()
+                self._directory_lock = None
+            for part in self._sealed.values():
+                part.close()
+            self._sealed = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the stream observation history")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help=f"Snapshot directory (default: {SNAPSHOT_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Partitions, rows and size on disk")
+    series = commands.add_parser("series", help="Viewer counts of one channel over time (JSON lines)")
+    series.add_argument("channel_id")
+    series.add_argument("--days", type=float, default=30, help="Days of history (default: 30)")
+    uptime = commands.add_parser("uptime", help="Share of probes each instance answered")
+    uptime.add_argument("--days", type=float, default=30, help="Days of history (default: 30)")
+    commands.add_parser("seal", help="Seal every finished day")
+    prune = commands.add_parser("prune", help="Delete days older than --days")
+    prune.add_argument("--days", type=float, required=True)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.dir)
+    started = time.perf_counter()
+    try:
+        if args.command == "stats":
+            stats = store.stats()
+            print(f"{stats['partitions']} partition(s) ({stats['sealed']} sealed), "
+                  f"{stats['rows']} row(s), {stats['bytes'] / 1024:.0f} KiB")
+        elif args.command == "series":
+            points = store.viewer_series(args.channel_id, time.time() - args.days * 86400)
+            for point in points:
+                print(json.dumps(point._asdict()))
+            print(f"{len(points)} point(s) in {(time.perf_counter() - started) * 1000:.1f} ms",
+                  file=sys.stderr)
+        elif args.command == "uptime":
+            uptime = store.instance_uptime(time.time() - args.days * 86400)
+            elapsed = (time.perf_counter() - started) * 1000
+            for instance, entry in sorted(uptime.items(), key=lambda item: item[1].ratio, reverse=True):
+                print(f"{entry.ratio:7.1%}  {entry.answered:>6}/{entry.probes:<6}  {instance}")
+            print(f"({len(uptime)} instance(s) in {elapsed:.1f} ms)")
+        elif args.command == "seal":
+            print(f"[OK] Sealed {store.seal()} partition(s)")
+        elif args.command == "prune":
+            print(f"[OK] Deleted {store.drop_before(time.time() - args.days * 86400)} partition(s)")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
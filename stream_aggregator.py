@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Cross-platform stream aggregation: Twitch, YouTube and Kick in one pass
+
+Python counterpart of fetchAllStreams() in lib/stream-api.ts. Each platform
+is a source that runs on its own thread, and all of them share one
+deadline, so a refresh takes as long as the slowest source rather than the
+sum of all sources:
+
+    twitch   Twitch GQL DirectoryPage_Game persisted query for the game slug,
+             following the directory's cursors (pagination.py)
+    youtube  the roster's /streams listings through Invidious, plus the
+             keyword search (keyword_search.py); the instance pre-flight
+             and handle lookups run inside the source, under the deadline
+    kick     Kick's public livestream listing for the category
+
+Sources hand over records as they find them. A source still running when
+the deadline passes keeps what it delivered so far and is reported as
+partial. A source that fails is reported with its error, and the others
+are unaffected. The merged list is de-duplicated by stream ID and sorted
+by viewers, in the Stream shape from types/stream.ts.
+
+Settings:
+    TWITCH_GQL_URL   Twitch GQL endpoint (default https://gql.twitch.tv/gql)
+    KICK_API_URL     Kick livestream listing (default https://kick.com/stream/livestreams/en)
+
+Usage:
+    python stream_aggregator.py > streams.json
+    python stream_aggregator.py --roster channels.txt --deadline 10
+    python stream_aggregator.py --no-kick --format jsonl
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import invidious_http
+from dns_cache import prune_instances
+from instance_health import HealthStore, get_store
+from invidious_http import INVIDIOUS_INSTANCES
+from keyword_search import SEARCH_KEYWORDS, SEARCH_PAGES, discover_streams
+from live_scanner import DEFAULT_WORKERS, log, read_roster, resolve_roster, scan_channels
+from pagination import Page, Paginator
+from rate_limit import DEFAULT_BURST, DEFAULT_RATE, InstanceRateLimiter
+
+# Seconds a whole refresh may take, across all sources
+DEFAULT_DEADLINE = 20.0
+
+# Twitch GQL, with the public web client ID (same as lib/stream-api.ts)
+TWITCH_GQL_URL = os.environ.get("TWITCH_GQL_URL", "https://gql.twitch.tv/gql")
+TWITCH_CLIENT_ID = "kimne78kx3ncx6brgo4mv6wki5h1ko"
+TWITCH_DIRECTORY_HASH = "76cb069d835b8a02914c08dc42c421d0dafda8af5b113a3f19141824b901402f"
+TWITCH_GAME_SLUG = "soulcalibur-vi"
+TWITCH_PAGE_SIZE = 30
+TWITCH_PAGES = 10
+
+KICK_API_URL = os.environ.get("KICK_API_URL", "https://kick.com/stream/livestreams/en")
+KICK_CATEGORY = "soulcalibur-vi"
+KICK_PAGE_SIZE = 24
+
+Emit = Callable[[List[Dict[str, Any]]], None]
+
+
+@dataclass
+class SourceResult:
+    """Outcome of one source in an aggregation run"""
+    name: str
+    streams: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed: Optional[float] = None
+    error: Optional[str] = None
+    complete: bool = False
+
+
+def twitch_stream_record(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Twitch GQL stream node to the Stream shape (as in fetchTwitchStreamsGql)"""
+    broadcaster = node.get("broadcaster") or {}
+    login = broadcaster.get("login") or ""
+    record = {
+        "id": f"twitch-{node.get('id')}",
+        "platform": "twitch",
+        "streamerName": broadcaster.get("displayName") or "Unknown",
+        "title": node.get("title") or (broadcaster.get("broadcastSettings") or {}).get("title") or "Untitled Stream",
+        "thumbnailUrl": node.get("previewImageURL")
+                        or f"https://static-cdn.jtvnw.net/previews-ttv/live_user_{login or 'unknown'}-320x180.jpg",
+        "viewerCount": node.get("viewersCount") or 0,
+        "streamUrl": f"https://twitch.tv/{login}",
+        "isLive": True,
+    }
+    if broadcaster.get("profileImageURL"):
+        record["profilePictureUrl"] = broadcaster["profileImageURL"]
+    if node.get("createdAt"):
+        record["startedAt"] = node["createdAt"]
+    return record
+
+
+def fetch_twitch_page(game_slug: str, cursor: Optional[str] = None, limit: int = TWITCH_PAGE_SIZE) -> Page[Dict[str, Any]]:
+    """
+    Fetch one page of a Twitch game directory
+
+    Returns:
+        The page's live streams, with the cursor of the next page if there is one
+
+    Raises:
+        requests.exceptions.RequestException on transport failure
+        ValueError on an error status or an unexpected payload
+    """
+    body = {
+        "extensions": {"persistedQuery": {"sha256Hash": TWITCH_DIRECTORY_HASH, "version": 1}},
+        "operationName": "DirectoryPage_Game",
+        "variables": {
+            "cursor": cursor,
+            "imageWidth": 50,
+            "includeCostreaming": True,
+            "limit": limit,
+            "options": {"broadcasterLanguages": [], "freeformTags": [], "sort": "VIEWER_COUNT"},
+            "slug": game_slug,
+            "sortTypeIsRecency": False,
+        },
+    }
+    response = invidious_http.post(TWITCH_GQL_URL, body, headers={"Client-Id": TWITCH_CLIENT_ID})
+    if response.status_code != 200:
+        raise ValueError(f"HTTP {response.status_code}")
+    data = response.json()
+    if isinstance(data, dict) and data.get("errors"):
+        raise ValueError(data["errors"][0].get("message", "GQL error"))
+    game = ((data or {}).get("data") or {}).get("game")
+    if game is None:
+        raise ValueError(f"unknown game {game_slug!r}")
+    streams = game.get("streams") or {}
+    edges = streams.get("edges") or []
+    records = [twitch_stream_record(edge["node"]) for edge in edges
+               if edge.get("node") and edge["node"].get("type") == "live"]
+    next_cursor = None
+    if (streams.get("pageInfo") or {}).get("hasNextPage") and edges:
+        next_cursor = edges[-1].get("cursor") or None
+    return Page(records, next_cursor)
+
+
+def fetch_twitch(emit: Emit, game_slug: str = TWITCH_GAME_SLUG, max_pages: int = TWITCH_PAGES,
+                 min_viewers: int = 0):
+    """
+    Fetch the live streams of a Twitch game directory, following its cursors
+
+    The directory is sorted by viewers, so paging stops at the first page
+    that reaches below min_viewers. Each page is emitted as it arrives.
+
+    Raises:
+        requests.exceptions.RequestException or ValueError if a page fails;
+        pages emitted before that are kept
+    """
+    until = (lambda record: record["viewerCount"] < min_viewers) if min_viewers > 0 else None
+    for page in Paginator(lambda cursor: fetch_twitch_page(game_slug, cursor), until, max_pages).pages():
+        emit([record for record in page.items if record["viewerCount"] >= min_viewers])
+
+
+def kick_stream_record(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Kick livestream listing entry to the Stream shape"""
+    channel = item.get("channel") or {}
+    user = channel.get("user") or {}
+    slug = channel.get("slug") or user.get("username") or ""
+    thumbnail = item.get("thumbnail") or {}
+    record = {
+        "id": f"kick-{item.get('id')}",
+        "platform": "kick",
+        "streamerName": user.get("username") or slug or "Unknown",
+        "title": item.get("session_title") or "Untitled Stream",
+        "thumbnailUrl": thumbnail.get("src") or thumbnail.get("url") or "",
+        "viewerCount": item.get("viewer_count") or item.get("viewers") or 0,
+        "streamUrl": f"https://kick.com/{slug}",
+        "isLive": True,
+    }
+    picture = user.get("profile_pic") or user.get("profilepic")
+    if picture:
+        record["profilePictureUrl"] = picture
+    started = item.get("start_time") or item.get("created_at")
+    if started:
+        record["startedAt"] = started
+    return record
+
+
+def fetch_kick(emit: Emit, category: str = KICK_CATEGORY, limit: int = KICK_PAGE_SIZE):
+    """
+    Fetch the live streams of a Kick category
+
+    Kick puts bot protection in front of its API, so a 403 here is common
+    and simply leaves the source empty for this run.
+
+    Raises:
+        requests.exceptions.RequestException on transport failure
+        ValueError on an error status or an unexpected payload
+    """
+    response = invidious_http.get(KICK_API_URL, params={
+        "page": 1, "limit": limit, "subcategory": category, "sort": "desc",
+    })
+    if response.status_code != 200:
+        raise ValueError(f"HTTP {response.status_code}")
+    data = response.json()
+    items = data.get("data") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise ValueError("unexpected payload")
+    emit([kick_stream_record(item) for item in items if item.get("id") is not None])
+
+
+def youtube_fetcher(
+    roster: List[str],
+    instances: List[str],
+    store: HealthStore,
+    limiter: InstanceRateLimiter,
+    workers: int = DEFAULT_WORKERS,
+    search: bool = True,
+    live_now_only: bool = False,
+    search_pages: int = SEARCH_PAGES,
+    min_viewers: int = 0,
+    preflight: bool = True,
+) -> Callable[[Emit], None]:
+    """
+    YouTube source: roster listings plus keyword search, both through Invidious
+
+    The DNS/TCP pre-flight and the roster's handle lookups run inside the
+    source, so they count against the shared deadline like every request.
+
+    Args:
+        roster: Channel IDs, handles or URLs, resolved when the source runs
+        preflight: Drop unreachable instances before the first request
+
+    Returns:
+        A fetch function that emits each channel's streams as its listing
+        arrives, then the search results. It raises if the keyword search
+        failed, after the roster's streams have been emitted.
+    """
+    def fetch(emit: Emit):
+        usable = prune_instances(instances, store, log) if preflight else instances
+        search_thread = None
+        search_errors: List[str] = []
+        if search:
+            def run_search():
+                try:
+                    found = discover_streams(SEARCH_KEYWORDS, usable, store, limiter,
+                                             max_pages=search_pages, min_viewers=min_viewers)
+                    emit([video.to_stream_record() for video in found])
+                except Exception as e:
+                    search_errors.append(str(e) or type(e).__name__)
+            search_thread = threading.Thread(target=run_search, name="youtube-search", daemon=True)
+            search_thread.start()
+        channel_ids = resolve_roster(roster, usable, workers, limiter, store) if roster else []
+        for _, _, videos in scan_channels(channel_ids, usable, workers, limiter, store):
+            if videos:
+                emit([v.to_stream_record() for v in videos if v.is_live(live_now_only)])
+        if search_thread is not None:
+            search_thread.join()
+        if search_errors:
+            raise RuntimeError(f"keyword search: {search_errors[0]}")
+    return fetch
+
+
+def merge_streams(results: List[SourceResult]) -> List[Dict[str, Any]]:
+    """De-duplicate records by stream ID (first source wins) and sort by viewers"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        for record in result.streams:
+            merged.setdefault(record["id"], record)
+    return sorted(merged.values(), key=lambda s: s["viewerCount"], reverse=True)
+
+
+def aggregate(
+    sources: Dict[str, Callable[[Emit], None]],
+    deadline: float = DEFAULT_DEADLINE,
+) -> Tuple[List[Dict[str, Any]], List[SourceResult]]:
+    """
+    Run sources concurrently under one deadline
+
+    Each source runs on a daemon thread, so one that overruns the deadline
+    is abandoned rather than waited for.
+
+    Args:
+        sources: Source name -> fetch function taking an emit callback
+        deadline: Seconds to wait for all sources together
+
+    Returns:
+        (merged Stream records, one SourceResult per source in input order)
+    """
+    started = time.monotonic()
+    lock = threading.Lock()
+    results = {name: SourceResult(name) for name in sources}
+    finished: "queue.Queue[str]" = queue.Queue()
+
+    def run(name: str, fetch: Callable[[Emit], None]):
+        result = results[name]
+
+        def emit(records: List[Dict[str, Any]]):
+            with lock:
+                result.streams.extend(records)
+
+        try:
+            fetch(emit)
+            error = None
+        except Exception as e:
+            # One broken source must not take the others down
+            error = str(e) or type(e).__name__
+        with lock:
+            result.elapsed = time.monotonic() - started
+            result.error = error
+            result.complete = error is None
+        finished.put(name)
+
+    for name, fetch in sources.items():
+        threading.Thread(target=run, args=(name, fetch), name=f"source-{name}", daemon=True).start()
+
+    pending = set(sources)
+    while pending:
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        try:
+            pending.discard(finished.get(timeout=remaining))
+        except queue.Empty:
+            break
+
+    with lock:
+        # Snapshot what late sources delivered; they may keep emitting after this
+        snapshot = []
+        for name in sources:
+            result = results[name]
+            if name in pending:
+                result.elapsed = time.monotonic() - started
+            snapshot.append(SourceResult(result.name, list(result.streams), result.elapsed,
+                                         result.error, result.complete))
+    return merge_streams(snapshot), snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch live streams from Twitch, YouTube and Kick at once")
+    parser.add_argument("--roster", help="File with one YouTube channel ID, handle or URL per line")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE,
+                        help=f"Seconds the whole refresh may take (default: {DEFAULT_DEADLINE})")
+    parser.add_argument("--no-twitch", action="store_true", help="Skip Twitch")
+    parser.add_argument("--no-youtube", action="store_true", help="Skip YouTube")
+    parser.add_argument("--no-kick", action="store_true", help="Skip Kick")
+    parser.add_argument("--no-search", action="store_true", help="Skip the YouTube keyword search")
+    parser.add_argument("--twitch-game", default=TWITCH_GAME_SLUG,
+                        help=f"Twitch game slug (default: {TWITCH_GAME_SLUG})")
+    parser.add_argument("--kick-category", default=KICK_CATEGORY,
+                        help=f"Kick category slug (default: {KICK_CATEGORY})")
+    parser.add_argument("--twitch-pages", type=int, default=TWITCH_PAGES,
+                        help=f"Twitch directory pages followed at most (default: {TWITCH_PAGES})")
+    parser.add_argument("--search-pages", type=int, default=SEARCH_PAGES,
+                        help=f"YouTube search pages followed at most per keyword (default: {SEARCH_PAGES})")
+    parser.add_argument("--min-viewers", type=int, default=0,
+                        help="Stop paging Twitch and YouTube search results below this many viewers")
+    parser.add_argument("--instances", help="Comma-separated Invidious instances to use")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"YouTube channels fetched concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"Requests per second per Invidious instance (default: {DEFAULT_RATE})")
+    parser.add_argument("--live-now-only", action="store_true",
+                        help="Ignore the 'published seconds/minutes ago' heuristic")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="Skip the DNS/TCP check that drops unreachable instances up front")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json",
+                        help="json writes a StreamApiResponse; jsonl one Stream per line")
+    args = parser.parse_args()
+
+    sources: Dict[str, Callable[[Emit], None]] = {}
+    if not args.no_twitch:
+        sources["twitch"] = lambda emit: fetch_twitch(emit, args.twitch_game, args.twitch_pages, args.min_viewers)
+    if not args.no_youtube:
+        instances = args.instances.split(",") if args.instances else INVIDIOUS_INSTANCES
+        roster = read_roster(args.roster) if args.roster else []
+        sources["youtube"] = youtube_fetcher(roster, instances, get_store(), InstanceRateLimiter(args.rate, DEFAULT_BURST),
+                                             args.workers, search=not args.no_search,
+                                             live_now_only=args.live_now_only, search_pages=args.search_pages,
+                                             min_viewers=args.min_viewers, preflight=not args.no_preflight)
+    if not args.no_kick:
+        sources["kick"] = lambda emit: fetch_kick(emit, args.kick_category)
+    if not sources:
+        parser.error("every source is disabled")
+
+    streams, results = aggregate(sources, args.deadline)
+    for result in results:
+        elapsed = f"{result.elapsed:.1f}s" if result.elapsed is not None else "-"
+        if result.error:
+            log(f"  [FAIL] {result.name}: {result.error} ({elapsed})")
+        elif result.complete:
+            log(f"  [OK] {result.name}: {len(result.streams)} stream(s) ({elapsed})")
+        else:
+            log(f"  [SKIP] {result.name}: deadline passed, kept {len(result.streams)} stream(s) found so far")
+
+    if args.format == "jsonl":
+        for record in streams:
+            print(json.dumps(record, ensure_ascii=False))
+    else:
+        print(json.dumps({
+            "streams": streams,
+            "lastUpdated": datetime.now(timezone.utc).isoformat(),
+        }, ensure_ascii=False, indent=2))
+    log(f"Done: {len(streams)} live stream(s) from {len(results)} source(s)")
+
+
+if __name__ == "__main__":
+    main()
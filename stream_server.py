@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Central live-stream feed for the web app
+
+Polls a roster of channels once, centrally, with the adaptive live poller
+and serves the merged result to any number of visitors, so upstream load
+no longer grows with the audience:
+
+    GET /api/streams   the current StreamApiResponse (types/stream.ts), with
+                       ETag / If-None-Match and gzip; its "platforms" lists
+                       the platforms the feed covers
+    GET /api/events    server-sent events: a "snapshot" event with the full
+                       StreamApiResponse, then went_live / ended /
+                       title_changed / viewers_changed events as they happen
+    GET /healthz       poller and feed status
+    GET /img           cached stream images, with --images (image_proxy.py)
+
+Events carry the stream ID ("youtube-<videoId>") and, except for "ended",
+the full Stream record. Reconnecting clients send Last-Event-ID and get the
+events they missed, or a fresh snapshot if those are no longer buffered.
+
+With --search, streams found by searching for the SoulCalibur VI keywords
+(keyword_search.py) are merged into the feed too, refreshed every
+SEARCH_INTERVAL seconds. --twitch and --kick add those platforms' game
+directories (stream_aggregator.py), refreshed every PLATFORM_INTERVAL
+seconds. With any of them the roster becomes optional. A source whose
+refresh fails keeps its last good streams in the feed.
+
+With --images, thumbnails and avatars in the feed point at /img paths on
+this server, which serves them from the image proxy cache. Images of
+streams that just went live are fetched before any visitor asks for them.
+
+With --snapshots, every roster poll is also appended to the observation
+history (snapshot_store.py).
+
+Settings:
+    STREAM_SERVER_ORIGIN  Access-Control-Allow-Origin value (default *)
+
+Usage:
+    python stream_server.py channels.txt
+    python stream_server.py channels.txt --port 8787 --budget 2 --verify
+    python stream_server.py channels.txt --search --twitch --kick --images
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from dns_cache import prune_instances
+from instance_health import get_store
+from invidious_http import INVIDIOUS_INSTANCES
+from keyword_search import SEARCH_KEYWORDS, discover_streams
+from live_poller import DEFAULT_BUDGET, DEFAULT_WORKERS, LivePoller
+from live_scanner import log, read_roster, resolve_roster
+from image_proxy import ImageProxy
+from live_verifier import TOP_K, LiveVerifier
+from stream_aggregator import fetch_kick, fetch_twitch
+from rate_limit import DEFAULT_BURST, DEFAULT_RATE, InstanceRateLimiter
+from snapshot_store import SNAPSHOT_DIR, SnapshotStore
+from video_entry import VideoEntry
+
+DEFAULT_PORT = 8787
+
+ALLOW_ORIGIN = os.environ.get("STREAM_SERVER_ORIGIN", "*")
+
+# Events kept for clients that reconnect with Last-Event-ID
+EVENT_HISTORY = 1000
+
+# Events buffered per client; a client that falls further behind is dropped
+# and gets a fresh snapshot when it reconnects
+CLIENT_QUEUE = 256
+
+# Seconds between SSE keep-alive comments
+HEARTBEAT = 15
+
+# Reconnect delay suggested to SSE clients, in milliseconds
+RETRY_MS = 3000
+
+# Seconds between keyword searches with --search
+SEARCH_INTERVAL = 120
+
+# Seconds between Twitch / Kick directory refreshes with --twitch / --kick
+PLATFORM_INTERVAL = 60
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _close(subscriber: queue.Queue):
+    """Replace whatever a subscriber has queued with the end-of-feed marker"""
+    while True:
+        try:
+            subscriber.get_nowait()
+        except queue.Empty:
+            break
+    subscriber.put_nowait(None)
+
+
+class StreamHub:
+    """
+    Merged live streams from all sources, plus the change feed
+
+    Each source (one polled channel, for example) reports its complete list
+    of live Stream records; the hub merges them by stream ID, works out
+    what changed for visitors and publishes it to every subscriber.
+
+    Every viewer count change is published, so clients following the events
+    show the same counts as /api/streams.
+
+    Args:
+        history: Events kept for reconnecting clients
+        transform: Applied to every incoming record first (e.g. ImageProxy.rewrite)
+        platforms: Platforms the feed covers, reported to clients so they
+            query the others themselves
+    """
+
+    def __init__(self, history: int = EVENT_HISTORY,
+                 transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                 platforms: Iterable[str] = ("youtube",)):
+        self.transform = transform
+        self.platforms = sorted(platforms)
+        self.last_updated = _now()
+        self.last_polled: Optional[str] = None
+        self._lock = threading.Lock()
+        self._sources: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._sequence = 0
+        self._history: Deque[Tuple[int, str, bytes]] = deque(maxlen=history)
+        self._subscribers: List[queue.Queue] = []
+        self._snapshot: Optional[Tuple[bytes, bytes, str]] = None
+
+    def _merged(self) -> Dict[str, Dict[str, Any]]:
+        """Stream ID -> record over all sources; the first source listing a stream wins"""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for records in self._sources.values():
+            for stream_id, record in records.items():
+                merged.setdefault(stream_id, record)
+        return merged
+
+    def _changes(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> List[str]:
+        if old is None:
+            return ["went_live"]
+        if new is None:
+            return ["ended"]
+        changes = []
+        if new["title"] != old["title"]:
+            changes.append("title_changed")
+        if new["viewerCount"] != old["viewerCount"]:
+            changes.append("viewers_changed")
+        return changes
+
+    def update(self, source: str, records: List[Dict[str, Any]]):
+        """
+        Replace one source's live streams and publish what changed
+
+        Args:
+            source: Source key, e.g. "youtube:UC..."
+            records: Every stream the source currently reports live
+        """
+        if self.transform is not None:
+            records = [self.transform(record) for record in records]
+        with self._lock:
+            before = self._merged()
+            self._sources[source] = {record["id"]: record for record in records}
+            after = self._merged()
+            self.last_polled = _now()
+            if after == before:
+                return
+            # Only a real change moves lastUpdated, so unchanged polls keep the ETag
+            self.last_updated = self.last_polled
+            self._snapshot = None
+
+            for stream_id in list(before) + [i for i in after if i not in before]:
+                old, new = before.get(stream_id), after.get(stream_id)
+                for event in self._changes(old, new):
+                    data = {"type": event, "id": stream_id, "at": self.last_updated}
+                    if new is not None:
+                        data["stream"] = new
+                    self._publish(event, data)
+
+    def _publish(self, event: str, data: Dict[str, Any]):
+        """Buffer an event and hand it to every subscriber (lock held)"""
+        self._sequence += 1
+        message = (self._sequence, event, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        self._history.append(message)
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Too slow - drop it; the client reconnects with Last-Event-ID
+                self._subscribers.remove(subscriber)
+                _close(subscriber)
+
+    def snapshot(self) -> Tuple[bytes, bytes, str]:
+        """
+        The current StreamApiResponse
+
+        Returns:
+            (json body, gzipped body, etag), rebuilt only after a change
+        """
+        with self._lock:
+            if self._snapshot is None:
+                streams = sorted(self._merged().values(), key=lambda s: s["viewerCount"], reverse=True)
+                body = json.dumps({"streams": streams, "lastUpdated": self.last_updated,
+                                   "platforms": self.platforms}, ensure_ascii=False).encode("utf-8")
+                self._snapshot = (body, gzip.compress(body, 6), f'"{hashlib.sha1(body).hexdigest()[:16]}"')
+            return self._snapshot
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Tuple[queue.Queue, Optional[List[Tuple[int, str, bytes]]], int]:
+        """
+        Register a feed client
+
+        Args:
+            last_event_id: The last event the client saw, if reconnecting
+
+        Returns:
+            (queue of new events, missed events or None if the client needs
+            a snapshot, current sequence number)
+        """
+        subscriber: queue.Queue = queue.Queue(CLIENT_QUEUE)
+        with self._lock:
+            self._subscribers.append(subscriber)
+            backlog = None
+            oldest = self._history[0][0] if self._history else self._sequence + 1
+            if last_event_id is not None and oldest - 1 <= last_event_id <= self._sequence:
+                backlog = [message for message in self._history if message[0] > last_event_id]
+            return subscriber, backlog, self._sequence
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sources": len(self._sources),
+                "platforms": self.platforms,
+                "streams": len(self._merged()),
+                "subscribers": len(self._subscribers),
+                "events": self._sequence,
+                "lastUpdated": self.last_updated,
+                "lastPolled": self.last_polled,
+            }
+
+
+def youtube_sink(hub: StreamHub):
+    """LivePoller sink that reports each polled channel to the hub"""
+    def sink(channel_id: str, live: List[VideoEntry]):
+        hub.update(f"youtube:{channel_id}", [video.to_stream_record() for video in live])
+    return sink
+
+
+def source_loop(hub: StreamHub, source: str, fetch: Callable[[], List[Dict[str, Any]]],
+                stop: threading.Event, interval: float):
+    """
+    Publish fetch() results to the hub under source every interval seconds until stop is set
+
+    A failed fetch leaves the source's last good streams in place.
+    """
+    while not stop.is_set():
+        try:
+            hub.update(source, fetch())
+        except Exception as e:
+            log(f"  [FAIL] {source}: {e}")
+        stop.wait(interval)
+
+
+def collect(fetch: Callable[..., None], *args) -> Callable[[], List[Dict[str, Any]]]:
+    """Adapt a stream_aggregator fetcher (which emits records) to return them instead"""
+    def run() -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        fetch(records.extend, *args)
+        return records
+    return run
+
+
+def make_handler(hub: StreamHub, images: Optional[ImageProxy] = None):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path == "/img" and images is not None:
+                self._image()
+            elif path == "/api/streams":
+                self._streams()
+            elif path == "/api/events":
+                self._events()
+            elif path == "/healthz":
+                self._send(200, json.dumps(hub.status()).encode("utf-8"))
+            else:
+                self._send(404, b'{"error": "Not found"}')
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self._cors()
+            self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
+            self.send_header("Access-Control-Allow-Headers", "Last-Event-ID, If-None-Match")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def _cors(self):
+            self.send_header("Access-Control-Allow-Origin", ALLOW_ORIGIN)
+
+        def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+            self.send_response(status)
+            self._cors()
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _streams(self):
+            body, compressed, etag = hub.snapshot()
+            headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self._cors()
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                headers["Content-Encoding"] = "gzip"
+                body = compressed
+            self._send(200, body, headers)
+
+        def _image(self):
+            status, headers, body = images.respond(self.path.partition("?")[2], self.headers.get("If-None-Match"))
+            self.send_response(status)
+            self._cors()
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_event(self, event_id: int, event: str, data: bytes):
+            self.wfile.write(b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode("ascii"), data))
+
+        def _events(self):
+            try:
+                last_event_id = int(self.headers.get("Last-Event-ID", ""))
+            except ValueError:
+                last_event_id = None
+            subscriber, backlog, sequence = hub.subscribe(last_event_id)
+            try:
+                self.send_response(200)
+                self._cors()
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("X-Accel-Buffering", "no")
+                self.end_headers()
+                self.wfile.write(b"retry: %d\n\n" % RETRY_MS)
+                if backlog is None:
+                    self._write_event(sequence, "snapshot", hub.snapshot()[0])
+                else:
+                    for message in backlog:
+                        self._write_event(*message)
+                self.wfile.flush()
+                while True:
+                    try:
+                        message = subscriber.get(timeout=HEARTBEAT)
+                    except queue.Empty:
+                        self.wfile.write(b": ping\n\n")
+                    else:
+                        if message is None:
+                            break
+                        # Events queued before the snapshot/backlog was sent are already covered
+                        if message[0] > sequence:
+                            self._write_event(*message)
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                hub.unsubscribe(subscriber)
+                self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll a roster centrally and serve live streams to the web app")
+    parser.add_argument("roster", nargs="?", help="File with one channel ID, handle or URL per line")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--instances", help="Comma-separated Invidious instances to use")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help=f"Global requests per second across all instances (default: {DEFAULT_BUDGET})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Polls in flight at once (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"Requests per second per instance (default: {DEFAULT_RATE})")
+    parser.add_argument("--live-now-only", action="store_true",
+                        help="Ignore the 'published seconds/minutes ago' heuristic")
+    parser.add_argument("--verify", action="store_true",
+                        help="Confirm live candidates with the video detail endpoint before publishing them")
+    parser.add_argument("--verify-top-k", type=int, default=TOP_K,
+                        help=f"Candidates verified per channel, most recent first (default: {TOP_K})")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="Skip the DNS/TCP check that drops unreachable instances up front")
+    parser.add_argument("--search", action="store_true",
+                        help="Also publish streams found by searching for the SoulCalibur VI keywords")
+    parser.add_argument("--search-interval", type=float, default=SEARCH_INTERVAL,
+                        help=f"Seconds between keyword searches (default: {SEARCH_INTERVAL})")
+    parser.add_argument("--twitch", action="store_true", help="Also publish the Twitch game directory")
+    parser.add_argument("--kick", action="store_true", help="Also publish the Kick category")
+    parser.add_argument("--platform-interval", type=float, default=PLATFORM_INTERVAL,
+                        help=f"Seconds between Twitch / Kick refreshes (default: {PLATFORM_INTERVAL})")
+    parser.add_argument("--images", action="store_true",
+                        help="Serve thumbnails and avatars from a local cache at /img (see image_proxy.py)")
+    parser.add_argument("--snapshots", nargs="?", const=SNAPSHOT_DIR, metavar="DIR",
+                        help=f"Append every roster poll to the observation history in DIR (default: {SNAPSHOT_DIR})")
+    args = parser.parse_args()
+    if not (args.roster or args.search or args.twitch or args.kick):
+        parser.error("a roster file is required unless --search, --twitch or --kick is given")
+    if args.budget <= 0:
+        parser.error("--budget must be positive")
+
+    instances = args.instances.split(",") if args.instances else INVIDIOUS_INSTANCES
+    store = get_store()
+    if not args.no_preflight:
+        instances = prune_instances(instances, store, log)
+    limiter = InstanceRateLimiter(args.rate, DEFAULT_BURST)
+    channel_ids = resolve_roster(read_roster(args.roster), instances, args.workers, limiter, store) if args.roster else []
+
+    images = ImageProxy() if args.images else None
+    platforms = [name for name, enabled in (("youtube", channel_ids or args.search), ("twitch", args.twitch),
+                                            ("kick", args.kick)) if enabled]
+    hub = StreamHub(transform=images.rewrite if images else None, platforms=platforms)
+    verifier = None
+    if args.verify:
+        verifier = LiveVerifier(instances, store, limiter, top_k=args.verify_top_k,
+                                live_now_only=args.live_now_only)
+    snapshots = SnapshotStore(args.snapshots) if args.snapshots else None
+    poller = LivePoller(channel_ids, instances, args.budget, args.workers, limiter, args.live_now_only, verifier,
+                        sink=youtube_sink(hub), snapshots=snapshots)
+    poll_thread = threading.Thread(target=poller.run, name="poller", daemon=True)
+    stop_sources = threading.Event()
+    sources: Dict[str, Tuple[Callable[[], List[Dict[str, Any]]], float]] = {}
+    if args.search:
+        sources["youtube:search"] = (
+            lambda: [v.to_stream_record() for v in discover_streams(SEARCH_KEYWORDS, instances, store, limiter)],
+            args.search_interval,
+        )
+    if args.twitch:
+        sources["twitch:directory"] = (collect(fetch_twitch), args.platform_interval)
+    if args.kick:
+        sources["kick:category"] = (collect(fetch_kick), args.platform_interval)
+    source_threads = [
+        threading.Thread(target=source_loop, name=source, daemon=True,
+                         args=(hub, source, fetch, stop_sources, interval))
+        for source, (fetch, interval) in sources.items()
+    ]
+
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(hub, images))
+    httpd.daemon_threads = True
+    if channel_ids:
+        poll_thread.start()
+    for thread in source_threads:
+        thread.start()
+    log(f"Serving {len(channel_ids)} channel(s) on http://{args.host}:{httpd.server_address[1]}/api/streams "
+        f"(events: /api/events)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        log("Stopped")
+    finally:
+        poller.stop()
+        stop_sources.set()
+        httpd.server_close()
+        if poll_thread.is_alive():
+            poll_thread.join(timeout=5)
+        for thread in source_threads:
+            thread.join(timeout=5)
+        if verifier:
+            verifier.close()
+        if images:
+            images.close()
+        if snapshots:
+            snapshots.close()
+        store.save()
+
+
+if __name__ == "__main__":
+    main()
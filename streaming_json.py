@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Incremental parsing of large Invidious list responses
+
+The channel, streams and search endpoints return big JSON arrays, but the
+tools only need a few fields from the first handful of entries. This module
+reads the response body chunk by chunk, finds the item boundaries of the
+video array with a small depth-tracking scanner, and decodes one item at a
+time. Callers can project each item down to the fields they use and stop
+reading as soon as they have enough matches, so a big channel page never
+has to be held in memory as a whole.
+
+Both payload shapes are handled: a bare top-level array, or an object with
+the array under a known key ("videos", "latestVideos", ...). Scalar members
+next to the array, such as the "continuation" token of a paginated listing,
+can be collected on the way.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+import invidious_http
+
+# Fields the scripts read from video entries
+VIDEO_FIELDS = (
+    "videoId",
+    "title",
+    "author",
+    "authorId",
+    "liveNow",
+    "isUpcoming",
+    "viewCount",
+    "published",
+    "publishedText",
+    "lengthSeconds",
+    "videoThumbnails",
+    "authorThumbnails",
+)
+
+# Fields the scripts read from channel search results
+CHANNEL_FIELDS = ("type", "author", "authorId", "channelHandle", "subCount")
+
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING_END = re.compile(r'["\\]')
+_NON_SPACE = re.compile(r"\S")
+_PRIMITIVE_END = re.compile(r"[,\]}\s]")
+
+
+class _Scanner:
+    """
+    Growable text buffer over a byte-chunk iterator
+
+    Everything before mark may be discarded when more data is read; pos is
+    the next character to look at.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.mark = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        """Read the next chunk, compacting the buffer; False at end of input"""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                break
+        else:
+            text = self._decoder.decode(b"", final=True)
+            self.eof = True
+            if not text:
+                return False
+        self.buf = self.buf[self.mark:] + text
+        self.pos -= self.mark
+        self.mark = 0
+        return True
+
+    def search(self, pattern: re.Pattern, retain: bool = True) -> Optional[re.Match]:
+        """Find pattern from pos, reading more input as needed"""
+        while True:
+            match = pattern.search(self.buf, self.pos)
+            if match:
+                return match
+            if not retain:
+                self.mark = self.pos = len(self.buf)
+            if not self.more():
+                return None
+
+    def next_char(self) -> Optional[str]:
+        """Return the next non-whitespace character and move past it"""
+        match = self.search(_NON_SPACE, retain=False)
+        if match is None:
+            return None
+        self.pos = match.end()
+        return match.group()
+
+    def skip_string(self, retain: bool = True):
+        """Move pos past the end of a string whose opening quote was consumed"""
+        while True:
+            match = self.search(_STRING_END, retain)
+            if match is None:
+                raise ValueError("Truncated JSON string")
+            if match.group() == '"':
+                self.pos = match.end()
+                return
+            # Backslash escape: skip it and the escaped character
+            while match.end() >= len(self.buf):
+                if not self.more():
+                    raise ValueError("Truncated JSON string")
+                match = _STRING_END.search(self.buf, self.pos)
+            self.pos = match.end() + 1
+
+    def skip_value(self, first: str, retain: bool = True):
+        """Move pos past a value whose first character was consumed"""
+        if first == '"':
+            self.skip_string(retain)
+            return
+        if first not in "[{":
+            match = self.search(_PRIMITIVE_END, retain)
+            self.pos = match.start() if match else len(self.buf)
+            return
+
+        depth = 1
+        while depth:
+            match = self.search(_STRUCTURE, retain)
+            if match is None:
+                raise ValueError("Truncated JSON value")
+            self.pos = match.end()
+            char = match.group()
+            if char == '"':
+                self.skip_string(retain)
+            elif char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+            if not retain:
+                self.mark = self.pos
+
+
+def _read_key(scanner: _Scanner) -> str:
+    """Decode an object key whose opening quote was consumed, and its colon"""
+    # Keep the key text in the buffer until it has been decoded
+    scanner.mark = scanner.pos - 1
+    scanner.skip_string()
+    key = json.loads(scanner.buf[scanner.mark:scanner.pos])
+    if scanner.next_char() != ":":
+        raise ValueError("Malformed JSON object")
+    return key
+
+
+def _read_member(scanner: _Scanner, key: str, value_start: Optional[str], siblings: Optional[Dict[str, Any]]):
+    """Skip an object member's value, keeping it in siblings if it is a scalar"""
+    if value_start is None:
+        raise ValueError("Truncated JSON object")
+    if siblings is None or value_start in "[{":
+        scanner.skip_value(value_start, retain=False)
+        return
+    scanner.mark = scanner.pos - 1
+    scanner.skip_value(value_start)
+    siblings[key] = json.loads(scanner.buf[scanner.mark:scanner.pos])
+    scanner.mark = scanner.pos
+
+
+def _enter_array(scanner: _Scanner, keys: Sequence[str], siblings: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Position the scanner just inside the video array
+
+    Returns:
+        True if the array sits inside a top-level object
+    """
+    first = scanner.next_char()
+    if first == "[":
+        return False
+    if first != "{":
+        raise ValueError("Unexpected response format: not a JSON array or object")
+
+    while True:
+        char = scanner.next_char()
+        if char is None or char == "}":
+            raise ValueError(f"Unexpected response format: no {'/'.join(keys)} array")
+        if char == ",":
+            continue
+        if char != '"':
+            raise ValueError("Malformed JSON object")
+        key = _read_key(scanner)
+        value_start = scanner.next_char()
+        if key in keys and value_start == "[":
+            return True
+        _read_member(scanner, key, value_start, siblings)
+
+
+def _read_rest(scanner: _Scanner, siblings: Dict[str, Any]):
+    """Read the members after the array up to the end of the top-level object"""
+    while True:
+        char = scanner.next_char()
+        if char is None:
+            raise ValueError("Truncated JSON object")
+        if char == "}":
+            return
+        if char == ",":
+            continue
+        if char != '"':
+            raise ValueError("Malformed JSON object")
+        key = _read_key(scanner)
+        _read_member(scanner, key, scanner.next_char(), siblings)
+
+
+def iter_array_items(
+    chunks: Iterable[bytes],
+    keys: Sequence[str] = ("videos",),
+    siblings: Optional[Dict[str, Any]] = None,
+) -> Iterator[Any]:
+    """
+    Decode the items of a JSON array one at a time
+
+    Args:
+        chunks: Raw body chunks
+        keys: Object keys that may hold the array when the top level is an object
+        siblings: If given, filled with the scalar members of the enclosing
+            object (e.g. "continuation") once the array has been read to the end
+
+    Yields:
+        Each decoded array item
+
+    Raises:
+        ValueError if the payload has neither shape or is malformed
+    """
+    scanner = _Scanner(chunks)
+    in_object = _enter_array(scanner, keys, siblings)
+
+    while True:
+        char = scanner.next_char()
+        if char is None:
+            raise ValueError("Truncated JSON array")
+        if char == "]":
+            if in_object and siblings is not None:
+                _read_rest(scanner, siblings)
+            return
+        if char == ",":
+            continue
+        scanner.mark = scanner.pos - 1
+        scanner.skip_value(char)
+        yield json.loads(scanner.buf[scanner.mark:scanner.pos])
+        scanner.mark = scanner.pos
+
+
+def project(item: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """Keep only the given fields of a decoded item"""
+    return {field: item[field] for field in fields if field in item}
+
+
+def iter_items(
+    response,
+    keys: Sequence[str] = ("videos",),
+    fields: Optional[Sequence[str]] = VIDEO_FIELDS,
+    where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    limit: Optional[int] = None,
+    siblings: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream dict items out of a list response, stopping early if asked
+
+    The response is closed when iteration ends, including on early stop.
+
+    Args:
+        response: Response from invidious_http.get(..., stream=True)
+        keys: Object keys that may hold the array
+        fields: Fields to keep per item (None keeps everything)
+        where: Only yield items for which this returns True
+        limit: Stop after this many yielded items
+        siblings: Filled with the object's scalar members, such as the
+            continuation token, if the array is read to the end
+
+    Raises:
+        ValueError if the payload has neither shape or is malformed
+    """
+    count = 0
+    try:
+        for item in iter_array_items(invidious_http.iter_chunks(response), keys, siblings):
+            if not isinstance(item, dict):
+                continue
+            if where is not None and not where(item):
+                continue
+            yield project(item, fields) if fields else item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+    finally:
+        response.close()
+
+
+def iter_videos(response, **kwargs) -> Iterator[Dict[str, Any]]:
+    """iter_items for /streams, /videos and channel latestVideos payloads"""
+    kwargs.setdefault("keys", ("videos", "latestVideos"))
+    return iter_items(response, **kwargs)
+
+
+def iter_search_channels(response, **kwargs) -> Iterator[Dict[str, Any]]:
+    """iter_items for /search?type=channel payloads, channel results only"""
+    kwargs.setdefault("keys", ())
+    kwargs.setdefault("fields", CHANNEL_FIELDS)
+    kwargs.setdefault("where", lambda item: item.get("type") == "channel")
+    return iter_items(response, **kwargs)
+
+
+def iter_search_videos(response, **kwargs) -> Iterator[Dict[str, Any]]:
+    """iter_items for /search?type=video payloads, video results only"""
+    kwargs.setdefault("keys", ())
+    kwargs.setdefault("fields", VIDEO_FIELDS)
+    kwargs.setdefault("where", lambda item: item.get("type") == "video" and bool(item.get("videoId")))
+    return iter_items(response, **kwargs)
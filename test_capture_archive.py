@@ -0,0 +1,71 @@
+"""
+Unit tests for capture_archive.py: round trips, lookups and crash recovery
+
+Usage:
+    python -m pytest -q test_capture_archive.py
+"""
+
+import os
+
+import pytest
+
+from capture_archive import CaptureArchive, CapturedExchange, ReplayedResponse, path_key
+
+
+def exchange(url, body=b'{"ok": true}', status=200):
+    return CapturedExchange(url, status, {"Content-Type": "application/json"}, body, elapsed=0.25)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "traffic.capture")
+
+
+def test_round_trip_and_latest_capture_wins(path):
+    archive = CaptureArchive(path)
+    archive.append(exchange("https://a/api/v1/stats", b"1"))
+    archive.append(exchange("https://b/api/v1/stats", b"2"))
+    archive.append(exchange("https://a/api/v1/stats", b"3", status=500))
+
+    reopened = CaptureArchive(path)
+    assert len(reopened) == 3
+    assert [e.body for e in reopened] == [b"1", b"2", b"3"]
+    latest = reopened.latest("https://a/api/v1/stats")
+    assert (latest.body, latest.status_code, latest.elapsed) == (b"3", 500, 0.25)
+    assert reopened.latest_for_path("/api/v1/stats").body == b"3"
+    assert reopened.latest("https://c/api/v1/stats") is None
+
+
+def test_missing_index_is_rebuilt(path):
+    archive = CaptureArchive(path)
+    archive.append(exchange("https://a/api/v1/videos/x?fields=liveNow"))
+    os.remove(archive.index_path)
+    rebuilt = CaptureArchive(path)
+    assert rebuilt.latest_for_path("/api/v1/videos/x?fields=liveNow").status_code == 200
+    assert os.path.exists(rebuilt.index_path)
+
+
+def test_torn_frame_is_ignored_and_overwritten(path):
+    archive = CaptureArchive(path)
+    archive.append(exchange("https://a/one"))
+    os.remove(archive.index_path)
+    with open(path, "ab") as f:
+        f.write(b"\x00\x00\x10\x00partial")
+
+    recovered = CaptureArchive(path)
+    assert len(recovered) == 1
+    recovered.append(exchange("https://a/two", b"two"))
+    assert [e.url for e in CaptureArchive(path)] == ["https://a/one", "https://a/two"]
+    assert recovered.latest("https://a/two").body == b"two"
+
+
+def test_replayed_response_streams_the_body():
+    response = ReplayedResponse(exchange("https://a/x", b'{"videos": []}'))
+    assert response.headers["content-type"] == "application/json"
+    assert b"".join(response.iter_content(chunk_size=3)) == b'{"videos": []}'
+    assert response.json() == {"videos": []}
+
+
+def test_path_key():
+    assert path_key("https://yewtu.be/api/v1/search?q=sc6&type=channel") == "/api/v1/search?q=sc6&type=channel"
+    assert path_key("https://yewtu.be/api/v1/stats") == "/api/v1/stats"
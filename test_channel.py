@@ -3,11 +3,15 @@
 Test script for Invidious API - test a specific channel by handle
 """
 
-import requests
 import json
 import sys
 from typing import Optional
 
+from instance_health import get_store
+from resolution_cache import get_cache, is_channel_result, pick_channel
+from streaming_json import iter_search_channels
+from video_entry import iter_entries
+
 INVIDIOUS_INSTANCES = [
     "https://y.com.sb",
     "https://invidious.slipfox.xyz",
@@ -35,28 +39,42 @@ def resolve_channel_handle(handle: str) -> Optional[str]:
     
     print(f"Resolving channel handle: @{clean_handle}")
     
-    for instance in INVIDIOUS_INSTANCES:
+    cache = get_cache()
+    cached = cache.get(clean_handle)
+    if cached:
+        if cached.channel_id:
+            print(f"  [OK] Cached: {cached.author or clean_handle} (ID: {cached.channel_id})")
+        else:
+            print(f"  [FAIL] Cached as not found")
+        return cached.channel_id
+    
+    health = get_store()
+    answered = False
+    for instance in health.ranked(INVIDIOUS_INSTANCES):
         try:
             # Try searching for the channel
-            search_url = f"{instance}/api/v1/search?q={clean_handle}&type=channel"
             print(f"  Trying {instance}...")
             
-            response = requests.get(search_url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list) and len(data) > 0:
-                    # Get the first channel result
-                    for item in data:
-                        if item.get('type') == 'channel':
-                            channel_id = item.get('authorId')
-                            channel_name = item.get('author')
-                            if channel_id:
-                                print(f"  [OK] Found: {channel_name} (ID: {channel_id})")
-                                return channel_id
+            # Same pick as channel_resolver: exact handle match, else the first channel.
+            # The store records one outcome, after the body has parsed.
+            status, channels = health.get_json(
+                instance, f"/api/v1/search?q={clean_handle}&type=channel",
+                lambda response: list(iter_search_channels(response, where=is_channel_result)))
+            if status == 200:
+                item = pick_channel(channels, clean_handle)
+                answered = True
+                if item:
+                    channel_id = item.get('authorId')
+                    channel_name = item.get('author')
+                    print(f"  [OK] Found: {channel_name} (ID: {channel_id})")
+                    cache.put(clean_handle, channel_id, channel_name)
+                    return channel_id
         except Exception as e:
             continue
     
     print(f"  [FAIL] Could not resolve channel handle")
+    if answered:
+        cache.put(clean_handle, None)
     return None
 
 
@@ -68,44 +86,36 @@ def test_channel_streams(instance: str, channel_id: str):
     print(f"URL: {url}")
     
     try:
-        response = requests.get(url, headers={"Accept": "application/json"}, timeout=10)
+        # Handles both list and {"videos": [...]} response formats
+        status, videos = get_store().get_json(instance, f"/api/v1/channels/{channel_id}/streams",
+                                              lambda response: list(iter_entries(response)))
         
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Handle both list and dict response formats
-            videos = []
-            if isinstance(data, list):
-                videos = data
-            elif isinstance(data, dict) and 'videos' in data:
-                videos = data['videos']
-            
+        if status == 200:
             print(f"[OK] SUCCESS - Found {len(videos)} videos")
             
             # Filter for live streams
-            live_streams = [v for v in videos if v.get("liveNow") == True]
+            live_streams = [v for v in videos if v.live_now]
             print(f"   Live streams: {len(live_streams)}")
             
             if live_streams:
                 print(f"\n   [LIVE] LIVE STREAMS:")
                 for i, stream in enumerate(live_streams[:5], 1):
-                    print(f"   {i}. {stream.get('title', 'N/A')}")
-                    print(f"      Author: {stream.get('author', 'N/A')}")
-                    print(f"      Viewers: {stream.get('viewCount', 0)}")
-                    print(f"      URL: https://youtube.com/watch?v={stream.get('videoId', '')}")
+                    print(f"   {i}. {stream.title or 'N/A'}")
+                    print(f"      Author: {stream.author or 'N/A'}")
+                    print(f"      Viewers: {stream.view_count}")
+                    print(f"      URL: https://youtube.com/watch?v={stream.video_id}")
                     print()
             
             # Show some recent videos too
             if videos and not live_streams:
                 print(f"\n   [VIDEO] Recent videos (not live):")
                 for i, video in enumerate(videos[:3], 1):
-                    print(f"   {i}. {video.get('title', 'N/A')}")
-                    print(f"      Published: {video.get('publishedText', 'N/A')}")
+                    print(f"   {i}. {video.title or 'N/A'}")
+                    print(f"      Published: {video.published_text or 'N/A'}")
             
             return True
         else:
-            print(f"[FAIL] HTTP {response.status_code}")
-            print(f"   Response: {response.text[:200]}")
+            print(f"[FAIL] HTTP {status}")
             
     except Exception as e:
         print(f"[FAIL] Error: {str(e)}")
@@ -114,6 +124,9 @@ def test_channel_streams(instance: str, channel_id: str):
 
 
 def main():
+    if sys.argv[1:2] in (["-h"], ["--help"]):
+        print(f"usage: {sys.argv[0]} [@handle | channel ID]  (default: @JingleBells_Gaming)")
+        return
     if len(sys.argv) > 1:
         channel_input = sys.argv[1]
     else:
@@ -0,0 +1,108 @@
+"""
+Unit tests for channel_resolver.py: bulk handle resolution and search-result sharing
+
+Usage:
+    python -m pytest -q test_channel_resolver.py
+"""
+
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import invidious_http
+from channel_resolver import resolve_handle, resolve_handles
+from conftest import FakeResponse
+from instance_health import HealthStore
+from rate_limit import InstanceRateLimiter
+from resolution_cache import ResolutionCache
+
+
+def channel(handle, channel_id):
+    return {"type": "channel", "author": handle.title(), "authorId": channel_id, "channelHandle": f"@{handle}"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HealthStore(str(tmp_path / "health.json"))
+
+
+@pytest.fixture
+def cache():
+    cache = ResolutionCache(":memory:")
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def search(monkeypatch):
+    """Serve /api/v1/search from a dict of query -> results; unknown queries get a 502"""
+    results = {}
+    queries = []
+
+    def get(url, **kwargs):
+        query = parse_qs(urlsplit(url).query)["q"][0]
+        queries.append(query)
+        if url.startswith("https://down"):
+            return FakeResponse(502, b"")
+        if query not in results:
+            return FakeResponse(502, b"")
+        return FakeResponse(body=json.dumps(results[query]).encode())
+
+    monkeypatch.setattr(invidious_http, "get", get)
+    return results, queries
+
+
+def resolve(handles, store, cache):
+    limiter = InstanceRateLimiter(rate=1000, burst=1000, store=store)
+    return resolve_handles(handles, ["https://a"], store, limiter, cache, workers=1)
+
+
+def test_results_are_shared_between_handles(store, cache, search):
+    results, queries = search
+    results["alpha"] = [channel("alphafan", "UCfan"), channel("alpha", "UCalpha"), channel("beta", "UCbeta")]
+    resolved = resolve(["@Alpha", "beta", "alpha"], store, cache)
+    assert list(resolved) == ["alpha", "beta"]
+    assert (resolved["alpha"].channel_id, resolved["alpha"].source) == ("UCalpha", "search")
+    assert (resolved["beta"].channel_id, resolved["beta"].source) == ("UCbeta", "shared")
+    assert queries == ["alpha"]
+    assert cache.get("beta").channel_id == "UCbeta"
+
+
+def test_cached_handles_are_not_searched(store, cache, search):
+    cache.put("alpha", "UCalpha", "Alpha")
+    cache.put("gone", None)
+    resolved = resolve(["alpha", "gone"], store, cache)
+    assert [(r.channel_id, r.source) for r in resolved.values()] == [("UCalpha", "cache"), (None, "cache")]
+    assert search[1] == []
+
+
+def test_not_found_is_cached_but_failure_is_not(store, cache, search):
+    results, _ = search
+    results["nobody"] = [{"type": "video", "videoId": "v"}]
+    resolved = resolve(["nobody", "unreachable"], store, cache)
+    assert (resolved["nobody"].channel_id, resolved["nobody"].source) == (None, "search")
+    assert (resolved["unreachable"].channel_id, resolved["unreachable"].source) == (None, "failed")
+    assert cache.get("nobody").channel_id is None
+    assert cache.get("unreachable") is None
+
+
+def test_single_handle_fails_over_and_takes_tokens(store, cache, search):
+    results, queries = search
+    results["alpha"] = [channel("alphafan", "UCfan"), channel("alpha", "UCalpha")]
+    limiter = InstanceRateLimiter(rate=0.001, burst=1, store=store)
+    assert resolve_handle("@alpha", ["https://down", "https://a"], store, limiter, cache) == "UCalpha"
+    assert queries == ["alpha", "alpha"]
+    assert not limiter.try_acquire("https://down") and not limiter.try_acquire("https://a")
+    assert store.get_record("https://down").failures == 1
+    assert cache.get("alpha").channel_id == "UCalpha"
+
+
+def test_single_handle_caches_not_found_only_when_answered(store, cache, search):
+    results, _ = search
+    results["nobody"] = []
+    limiter = InstanceRateLimiter(rate=1000, burst=1000, store=store)
+    assert resolve_handle("nobody", ["https://a"], store, limiter, cache) is None
+    assert resolve_handle("unreachable", ["https://down"], store, limiter, cache) is None
+    assert cache.get("nobody").channel_id is None
+    assert cache.get("unreachable") is None
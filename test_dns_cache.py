@@ -0,0 +1,71 @@
+"""
+Unit tests for dns_cache.py: negative caching and transient resolver failures
+
+Usage:
+    python -m pytest -q test_dns_cache.py
+"""
+
+import socket
+
+import pytest
+
+import dns_cache
+from dns_cache import DnsCache
+
+
+def failing_resolver(errno):
+    calls = []
+
+    def getaddrinfo(host, *args):
+        calls.append(host)
+        raise socket.gaierror(errno, "lookup failed")
+
+    return getaddrinfo, calls
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DnsCache(str(tmp_path / "dns.json"), negative_ttl=60)
+
+
+def test_unknown_name_is_negative_cached(cache, monkeypatch):
+    getaddrinfo, calls = failing_resolver(socket.EAI_NONAME)
+    monkeypatch.setattr(dns_cache.socket, "getaddrinfo", getaddrinfo)
+    record = cache.resolve("gone.example")
+    assert not record.resolved and not record.transient
+    cache.resolve("gone.example")
+    assert calls == ["gone.example"]
+    with pytest.raises(socket.gaierror) as e:
+        cache.getaddrinfo("gone.example", 443)
+    assert e.value.errno == socket.EAI_NONAME
+
+
+@pytest.mark.skipif(not hasattr(socket, "EAI_NODATA"), reason="no EAI_NODATA on this platform")
+def test_name_without_addresses_is_negative_cached(cache, monkeypatch):
+    getaddrinfo, calls = failing_resolver(socket.EAI_NODATA)
+    monkeypatch.setattr(dns_cache.socket, "getaddrinfo", getaddrinfo)
+    record = cache.resolve("noaddr.example")
+    assert not record.resolved and not record.transient
+    assert cache.lookup("noaddr.example") is record
+    cache.resolve("noaddr.example")
+    assert calls == ["noaddr.example"]
+
+
+def test_temporary_failure_is_not_cached(cache, monkeypatch):
+    getaddrinfo, calls = failing_resolver(socket.EAI_AGAIN)
+    monkeypatch.setattr(dns_cache.socket, "getaddrinfo", getaddrinfo)
+    assert cache.resolve("flaky.example").transient
+    assert cache.lookup("flaky.example") is None
+    with pytest.raises(socket.gaierror) as e:
+        cache.getaddrinfo("flaky.example", 443)
+    assert e.value.errno == socket.EAI_AGAIN
+    assert len(calls) == 2
+
+
+def test_resolved_records_round_trip(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(dns_cache, "_record_ttl", lambda host: 300)
+    monkeypatch.setattr(dns_cache.socket, "getaddrinfo", lambda host, *args: [
+        (socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("192.0.2.1", 0))])
+    assert cache.getaddrinfo("ok.example", 443)[0][4] == ("192.0.2.1", 443)
+    cache.save()
+    assert DnsCache(cache.path).lookup("ok.example").addresses == [[socket.AF_INET, "192.0.2.1"]]
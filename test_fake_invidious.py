@@ -0,0 +1,24 @@
+"""
+Unit tests for fake_invidious.py: recorded fixtures stay inside their directory
+
+Usage:
+    python -m pytest -q test_fake_invidious.py
+"""
+
+import json
+
+from fake_invidious import FakeData
+
+
+def test_fixture_lookup(tmp_path):
+    fixtures = tmp_path / "fixtures"
+    (fixtures / "api" / "v1").mkdir(parents=True)
+    (fixtures / "api" / "v1" / "stats.json").write_text(json.dumps({"version": "2.0"}))
+    (tmp_path / "secret.json").write_text(json.dumps({"token": "x"}))
+
+    data = FakeData(fixtures=str(fixtures))
+    assert data.fixture("/api/v1/stats") == {"version": "2.0"}
+    assert data.fixture("/api/v1/missing") is None
+    assert data.fixture("/../secret") is None
+    assert data.fixture("/api/v1/../../../secret") is None
+    assert FakeData().fixture("/api/v1/stats") is None
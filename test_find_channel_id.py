@@ -0,0 +1,53 @@
+"""
+Unit tests for find_channel_id.py: handle parsing and one health outcome per search
+
+Usage:
+    python -m pytest -q test_find_channel_id.py
+"""
+
+import json
+
+import pytest
+
+import dns_cache
+import instance_health
+import invidious_http
+import resolution_cache
+from conftest import FakeResponse
+from find_channel_id import INVIDIOUS_INSTANCES, extract_handle, find_channel_id
+from instance_health import HealthStore
+from resolution_cache import ResolutionCache
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = HealthStore(str(tmp_path / "health.json"))
+    cache = ResolutionCache(":memory:")
+    monkeypatch.setattr(instance_health, "get_store", lambda: store)
+    monkeypatch.setattr(resolution_cache, "get_cache", lambda: cache)
+    monkeypatch.setattr(dns_cache, "prune_instances", lambda instances, store, log: instances[:1])
+    return store
+
+
+def test_extract_handle():
+    assert extract_handle("@JingleBells_Gaming") == "JingleBells_Gaming"
+    assert extract_handle("https://www.youtube.com/@JingleBells_Gaming/streams") == "JingleBells_Gaming"
+    assert extract_handle("UCJ0Y3WUgX0eqgQ76mz1PaFA") is None
+
+
+def test_unparseable_answer_is_one_failure(store, monkeypatch):
+    monkeypatch.setattr(invidious_http, "get", lambda url, **kwargs: FakeResponse(body=b"<html>busy</html>"))
+    assert find_channel_id("jinglebells_gaming") is None
+    record = store.get_record(INVIDIOUS_INSTANCES[0])
+    assert (record.successes, record.failures, record.last_error) == (0, 1, "bad_json")
+
+
+def test_exact_handle_is_picked_and_recorded_once(store, monkeypatch):
+    results = [
+        {"type": "channel", "author": "Fan", "authorId": "UCfan", "channelHandle": "@jinglefan"},
+        {"type": "channel", "author": "JingleBells", "authorId": "UCreal", "channelHandle": "@JingleBells_Gaming"},
+    ]
+    monkeypatch.setattr(invidious_http, "get", lambda url, **kwargs: FakeResponse(body=json.dumps(results).encode()))
+    assert find_channel_id("jinglebells_gaming") == "UCreal"
+    record = store.get_record(INVIDIOUS_INSTANCES[0])
+    assert (record.successes, record.failures) == (1, 0)
@@ -0,0 +1,78 @@
+"""
+Unit tests for hedged_fetch.py: backup requests, failover and one outcome per request
+
+Usage:
+    python -m pytest -q test_hedged_fetch.py
+"""
+
+import json
+import time
+
+import pytest
+
+import hedged_fetch
+import invidious_http
+from conftest import FakeResponse
+from hedged_fetch import fetch_channel_streams, hedged_get
+from instance_health import HealthStore
+
+LISTING = json.dumps([{"videoId": "v1", "title": "Ranked", "liveNow": True}]).encode()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HealthStore(str(tmp_path / "health.json"))
+
+
+def serve(monkeypatch, answers, delays=None):
+    """Answer each instance with a fixed (status, body), optionally after a delay"""
+    requested = []
+
+    def get(url, **kwargs):
+        instance = url.split("/api/")[0]
+        requested.append(instance)
+        time.sleep((delays or {}).get(instance, 0))
+        status, body = answers[instance]
+        return FakeResponse(status, body)
+
+    monkeypatch.setattr(invidious_http, "get", get)
+    return requested
+
+
+def test_fast_primary_wins_alone(store, monkeypatch):
+    requested = serve(monkeypatch, {"https://a": (200, LISTING), "https://b": (200, LISTING)})
+    result = fetch_channel_streams("UCa", ["https://a", "https://b"], store=store)
+    assert (result.instance, result.attempts) == ("https://a", 1)
+    assert [entry.video_id for entry in result.data] == ["v1"]
+    assert requested == ["https://a"]
+
+
+def test_slow_primary_is_raced_by_a_backup(store, monkeypatch):
+    monkeypatch.setattr(hedged_fetch, "DEFAULT_HEDGE_DELAY", 0.05)
+    serve(monkeypatch, {"https://a": (200, LISTING), "https://b": (200, LISTING)}, delays={"https://a": 0.5})
+    result = fetch_channel_streams("UCa", ["https://a", "https://b"], store=store)
+    assert (result.instance, result.attempts) == ("https://b", 2)
+    assert result.elapsed < 0.4
+
+
+def test_bad_payload_is_replaced_at_once(store, monkeypatch):
+    serve(monkeypatch, {"https://a": (200, b"<html>"), "https://b": (200, LISTING)})
+    result = fetch_channel_streams("UCa", ["https://a", "https://b"], store=store)
+    assert result.instance == "https://b"
+    record = store.get_record("https://a")
+    assert (record.successes, record.failures, record.last_error) == (0, 1, "bad_json")
+
+
+def test_every_instance_failing(store, monkeypatch):
+    serve(monkeypatch, {"https://a": (500, b""), "https://b": (200, b'{"error": "x"}')})
+    assert fetch_channel_streams("UCa", ["https://a", "https://b"], store=store) is None
+    assert store.get_record("https://a").last_error == "http_500"
+    assert store.get_record("https://b").failures == 1
+
+
+def test_throttled_instances_are_skipped(store, monkeypatch):
+    requested = serve(monkeypatch, {"https://a": (200, LISTING), "https://b": (200, LISTING)})
+    store.record_throttle("https://a", retry_after=60)
+    result = hedged_get(["https://a", "https://b"], "/api/v1/stats", lambda response: "ok", store=store)
+    assert result.instance == "https://b"
+    assert requested == ["https://b"]
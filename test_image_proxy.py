@@ -0,0 +1,184 @@
+"""
+Unit tests for image_proxy.py: LRU eviction, host checks and download limits
+
+Usage:
+    python -m pytest -q test_image_proxy.py
+"""
+
+import os
+
+import pytest
+
+import image_proxy
+import invidious_http
+from conftest import FakeResponse
+from image_proxy import ORIGINAL, ImageCache, ImageProxy, is_allowed
+
+THUMB = "https://static-cdn.jtvnw.net/previews-ttv/live_user_a-320x180.jpg"
+
+
+class Clock:
+    """Stands in for the time module so every call is one second later"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(image_proxy, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ImageCache(str(tmp_path / "images"), max_bytes=250)
+    yield cache
+    cache.close()
+
+
+def body(n, size=100):
+    return bytes([n]) * size
+
+
+def test_evicts_least_recently_used(cache):
+    cache.store("https://x/1", ORIGINAL, body(1), "image/jpeg", 60)
+    cache.store("https://x/2", ORIGINAL, body(2), "image/jpeg", 60)
+    # Touch the first so the second is now the oldest
+    assert cache.lookup("https://x/1", ORIGINAL) is not None
+    stored = cache.store("https://x/3", ORIGINAL, body(3), "image/jpeg", 60)
+    assert cache.lookup("https://x/2", ORIGINAL) is None
+    assert cache.lookup("https://x/1", ORIGINAL) is not None
+    assert os.path.exists(stored.path)
+    assert cache.stats()["bytes"] == 200
+
+
+def test_eviction_frees_only_as_much_as_needed(cache):
+    for n in range(5):
+        cache.store(f"https://x/{n}", ORIGINAL, body(n, 50), "image/jpeg", 60)
+    cache.store("https://x/big", ORIGINAL, body(9, 120), "image/jpeg", 60)
+    assert cache.stats() == {"entries": 3, "bytes": 220, "max_bytes": 250}
+    assert [cache.lookup(f"https://x/{n}", ORIGINAL) is not None for n in range(5)] == [
+        False, False, False, True, True]
+
+
+def test_newest_entry_is_kept_even_when_oversized(cache):
+    cache.store("https://x/1", ORIGINAL, body(1), "image/jpeg", 60)
+    big = cache.store("https://x/huge", ORIGINAL, body(2, 400), "image/jpeg", 60)
+    assert cache.lookup("https://x/1", ORIGINAL) is None
+    assert cache.lookup("https://x/huge", ORIGINAL).digest == big.digest
+
+
+def test_shared_blob_counts_once_and_outlives_one_entry(cache):
+    first = cache.store("https://x/a", ORIGINAL, body(1), "image/jpeg", 60)
+    cache.store("https://x/b", ORIGINAL, body(1), "image/jpeg", 60)
+    assert cache.stats()["bytes"] == 100
+    cache.store("https://x/c", ORIGINAL, body(2), "image/jpeg", 60)
+    cache.store("https://x/d", ORIGINAL, body(3), "image/jpeg", 60)
+    # /a went first, but /b still needed the blob until it went too
+    assert cache.lookup("https://x/a", ORIGINAL) is None
+    assert cache.lookup("https://x/b", ORIGINAL) is None
+    assert not os.path.exists(first.path)
+    assert cache.stats()["bytes"] == 200
+
+
+def test_expiry(cache, clock):
+    cache.store("https://x/1", ORIGINAL, body(1), "image/jpeg", 10)
+    assert cache.lookup("https://x/1", ORIGINAL).fresh
+    clock.now += 20
+    assert not cache.lookup("https://x/1", ORIGINAL).fresh
+
+
+@pytest.mark.parametrize("url, allowed", [
+    (THUMB, True),
+    ("https://i.ytimg.com/vi/x/hqdefault.jpg", True),
+    ("https://ytimg.com.evil.example/x.jpg", False),
+    ("http://static-cdn.jtvnw.net/x.jpg", False),
+    ("https://localhost/x.jpg", False),
+])
+def test_is_allowed(url, allowed):
+    assert is_allowed(url) == allowed
+
+
+@pytest.fixture
+def proxy(tmp_path, monkeypatch):
+    proxy = ImageProxy(ImageCache(str(tmp_path / "proxy")), prefetch_workers=1)
+    monkeypatch.setattr(image_proxy, "variant_width", lambda kind, width: None)
+    yield proxy
+    proxy.close()
+
+
+def serve(monkeypatch, responses):
+    requested = []
+
+    def get(url, **kwargs):
+        requested.append(url)
+        return responses.pop(0)
+
+    monkeypatch.setattr(invidious_http, "get", get)
+    return requested
+
+
+def test_download_is_cached(proxy, monkeypatch):
+    requested = serve(monkeypatch, [FakeResponse(body=b"img", headers={"Content-Type": "image/jpeg"})])
+    assert proxy.get(THUMB).read() == b"img"
+    assert proxy.get(THUMB).read() == b"img"
+    assert requested == [THUMB]
+    assert proxy._inflight == {}
+
+
+def test_oversized_downloads_are_refused(proxy, monkeypatch):
+    monkeypatch.setattr(image_proxy, "MAX_IMAGE_BYTES", 10)
+    serve(monkeypatch, [
+        FakeResponse(body=b"x" * 5, headers={"Content-Type": "image/jpeg", "Content-Length": "50"}),
+        FakeResponse(body=b"x" * 50, headers={"Content-Type": "image/jpeg"}),
+    ])
+    assert proxy.get(THUMB) is None
+    assert proxy.get(THUMB) is None
+
+
+def test_redirects_are_checked(proxy, monkeypatch):
+    requested = serve(monkeypatch, [
+        FakeResponse(302, headers={"Location": "https://yt3.ggpht.com/a.jpg"}),
+        FakeResponse(body=b"img", headers={"Content-Type": "image/jpeg"}),
+        FakeResponse(302, headers={"Location": "https://internal.example/secret"}),
+    ])
+    assert proxy.get(THUMB).read() == b"img"
+    assert requested == [THUMB, "https://yt3.ggpht.com/a.jpg"]
+    assert proxy.get(THUMB.replace("user_a", "user_b")) is None
+    assert requested[-1] == THUMB.replace("user_a", "user_b")
+
+
+def test_decompression_bomb_is_not_served(proxy, monkeypatch):
+    class Bomb(Exception):
+        pass
+
+    def resize(body, width):
+        raise Bomb("too many pixels")
+
+    monkeypatch.setattr(image_proxy, "UNUSABLE_IMAGE_ERRORS", (Bomb,))
+    monkeypatch.setattr(image_proxy, "variant_width", lambda kind, width: 160)
+    monkeypatch.setattr(image_proxy, "resize", resize)
+    serve(monkeypatch, [FakeResponse(body=b"bomb", headers={"Content-Type": "image/png"})])
+    assert proxy.get(THUMB, width=160) is None
+
+
+def test_pillow_bombs_are_unusable_images():
+    Image = pytest.importorskip("PIL.Image")
+    assert Image.DecompressionBombError in image_proxy.UNUSABLE_IMAGE_ERRORS
+
+
+def test_prefetch_remembers_a_bounded_number_of_urls(proxy, monkeypatch):
+    monkeypatch.setattr(image_proxy, "SEEN_URLS", 3)
+    submitted = []
+    monkeypatch.setattr(proxy._executor, "submit", lambda *args: submitted.append(args[1]))
+    urls = [THUMB.replace("user_a", f"user_{n}") for n in range(5)]
+    for url in urls + urls[-1:]:
+        proxy.prefetch(url)
+    assert submitted == urls
+    assert list(proxy._seen) == urls[-3:]
@@ -0,0 +1,157 @@
+"""
+Unit tests for instance_health.py: the circuit breaker, throttling and outcome recording
+
+Usage:
+    python -m pytest -q test_instance_health.py
+"""
+
+import pytest
+import requests
+
+import instance_health
+import invidious_http
+from conftest import FakeResponse
+from instance_health import CLOSED, FAILURE_THRESHOLD, HALF_OPEN, OPEN, HealthStore
+from streaming_json import iter_items
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HealthStore(str(tmp_path / "health.json"))
+
+
+def open_breaker(store, instance="https://a"):
+    for _ in range(FAILURE_THRESHOLD):
+        store.record_failure(instance, "connection")
+
+
+def cool_down(store, instance="https://a"):
+    store.get_record(instance).opened_at -= instance_health.OPEN_COOLDOWN + 1
+
+
+def test_breaker_opens_after_threshold(store):
+    for _ in range(FAILURE_THRESHOLD - 1):
+        store.record_failure("https://a", "connection")
+    assert store.get_record("https://a").breaker == CLOSED
+    store.record_failure("https://a", "connection")
+    assert store.get_record("https://a").breaker == OPEN
+    assert not store.is_available("https://a")
+    assert store.ranked(["https://a", "https://b"]) == ["https://b"]
+
+
+def test_dns_failure_opens_at_once(store):
+    store.record_failure("https://a", "dns")
+    assert store.get_record("https://a").breaker == OPEN
+
+
+def test_half_open_admits_one_trial(store):
+    open_breaker(store)
+    cool_down(store)
+    # Ranking lists the instance but leaves the trial to the request
+    assert store.ranked(["https://a"]) == ["https://a"]
+    assert store.ranked(["https://a"]) == ["https://a"]
+    assert store.get_record("https://a").breaker == HALF_OPEN
+    assert store.is_available("https://a")
+    assert not store.is_available("https://a")
+    assert store.ranked(["https://a"]) == []
+
+
+def test_half_open_trial_success_closes(store):
+    open_breaker(store)
+    cool_down(store)
+    assert store.is_available("https://a")
+    store.record_success("https://a", 0.1)
+    assert store.get_record("https://a").breaker == CLOSED
+    assert store.is_available("https://a")
+    assert store.is_available("https://a")
+
+
+def test_half_open_trial_failure_reopens(store):
+    open_breaker(store)
+    cool_down(store)
+    assert store.is_available("https://a")
+    store.record_failure("https://a", "timeout")
+    assert store.get_record("https://a").breaker == OPEN
+    assert not store.is_available("https://a")
+
+
+def test_abandoned_trial_expires(store):
+    open_breaker(store)
+    cool_down(store)
+    assert store.is_available("https://a")
+    store._trials["https://a"] -= instance_health.TRIAL_TIMEOUT + 1
+    assert store.is_available("https://a")
+
+
+def test_throttle_pauses_without_breaker(store):
+    paused = store.record_throttle("https://a", retry_after=30)
+    assert 30 <= paused <= 30 * (1 + instance_health.RETRY_AFTER_JITTER) + 0.01
+    assert store.get_record("https://a").breaker == CLOSED
+    assert store.ranked(["https://a", "https://b"]) == ["https://b"]
+    assert store.ranked(["https://a", "https://b"], include_throttled=True) == ["https://b", "https://a"]
+
+
+def test_ranked_orders_by_score(store):
+    store.record_success("https://slow", 2.0)
+    store.record_success("https://fast", 0.1)
+    assert store.ranked(["https://new", "https://slow", "https://fast"]) == [
+        "https://fast", "https://slow", "https://new"]
+
+
+def test_save_and_load_round_trip(store):
+    store.record_success("https://a", 0.5)
+    open_breaker(store, "https://b")
+    store.save()
+    loaded = HealthStore(store.path)
+    assert loaded.get_record("https://a").successes == 1
+    assert loaded.get_record("https://b").breaker == OPEN
+
+
+def test_get_json_records_one_failure_for_bad_body(store, monkeypatch):
+    monkeypatch.setattr(invidious_http, "get", lambda url, **kwargs: FakeResponse(body=b'{"videos": [{"a"'))
+    with pytest.raises(ValueError):
+        store.get_json("https://a", "/api/v1/x", lambda response: list(iter_items(response)))
+    record = store.get_record("https://a")
+    assert (record.successes, record.failures, record.last_error) == (0, 1, "bad_json")
+
+
+def test_get_json_records_one_success(store, monkeypatch):
+    response = FakeResponse(body=b'{"ok": true}')
+    monkeypatch.setattr(invidious_http, "get", lambda url, **kwargs: response)
+    status, value = store.get_json("https://a", "/api/v1/x", lambda r: "parsed")
+    assert (status, value) == (200, "parsed")
+    record = store.get_record("https://a")
+    assert (record.successes, record.failures) == (1, 0)
+    assert response.closed
+
+
+def test_get_json_non_200(store, monkeypatch):
+    monkeypatch.setattr(invidious_http, "get", lambda url, **kwargs: FakeResponse(status_code=500))
+    assert store.get_json("https://a", "/api/v1/x", lambda r: "parsed") == (500, None)
+    assert store.get_record("https://a").last_error == "http_500"
+
+
+def test_half_open_request_refused_while_trial_in_flight(store, monkeypatch):
+    monkeypatch.setattr(invidious_http, "get", lambda url, **kwargs: FakeResponse())
+    open_breaker(store)
+    cool_down(store)
+    assert store.is_available("https://a")
+    with pytest.raises(requests.exceptions.ConnectionError):
+        store.get("https://a", "/api/v1/x")
+    assert store.get_record("https://a").failures == FAILURE_THRESHOLD
+
+
+def test_classify_error():
+    classify = instance_health.classify_error
+    assert classify(requests.exceptions.ConnectTimeout()) == "timeout"
+    assert classify(requests.exceptions.ConnectionError("NameResolutionError: Name or service not known")) == "dns"
+    assert classify(requests.exceptions.ConnectionError(
+        "NameResolutionError: [Errno -3] Temporary failure in name resolution")) == "connection"
+    assert classify(ValueError("bad")) == "bad_json"
+    assert classify(status_code=503) == "http_503"
+
+
+def test_parse_retry_after():
+    assert instance_health.parse_retry_after("120") == 120
+    assert instance_health.parse_retry_after(None) is None
+    assert instance_health.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412480 - 60) == 60
@@ -2,13 +2,23 @@
 """
 Test script for Invidious API channel streams endpoint
 Tests fetching live streams from SoulCalibur VI game channel
+With --snapshots, each probe is also appended to the observation history
+(snapshot_store.py), which tracks instance uptime across runs
 """
 
-import requests
 import json
-from typing import List, Dict, Any
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from dns_cache import preflight
+from instance_health import get_store
+from request_metrics import PHASES, format_ms, get_recorder, print_table, split_url
+from snapshot_store import SNAPSHOT_DIR, SnapshotStore
+from video_entry import VideoEntry, entries_from_payload
+
 # SoulCalibur VI game channel ID on YouTube
 SC6_GAME_CHANNEL_ID = "UCJ0Y3WUgX0eqgQ76mz1PaFA"
 
@@ -24,102 +34,246 @@ INVIDIOUS_INSTANCES = [
     "https://invidious.kavin.rocks",
 ]
 
+# Concurrent probe settings
+MAX_CONCURRENT_PROBES = 8
+PROBE_DEADLINE = 15  # seconds for the whole run, not per instance
+
 
-def test_channel_streams(instance: str, channel_id: str) -> Dict[str, Any]:
+def new_result(
+    instance: str,
+    channel_id: str = SC6_GAME_CHANNEL_ID,
+    error: Optional[str] = None,
+    elapsed: Optional[float] = None,
+) -> Dict[str, Any]:
     """
-    Test fetching streams from a channel via Invidious instance
+    Result entry for one instance, as yet unsuccessful
     
-    Args:
-        instance: Invidious instance URL
-        channel_id: YouTube channel ID
-        
-    Returns:
-        Dictionary with test results
+    Probes fill it in; instances that were skipped or missed the deadline
+    are reported with just an error, so every entry has the same keys.
     """
-    url = f"{instance}/api/v1/channels/{channel_id}/streams"
-    
-    result = {
+    return {
         "instance": instance,
-        "url": url,
+        "url": f"{instance}/api/v1/channels/{channel_id}/streams",
         "success": False,
         "status_code": None,
-        "error": None,
+        "error": error,
         "total_videos": 0,
         "live_streams": 0,
         "stream_titles": [],
+        "elapsed": elapsed,
+        "phases": {},
     }
+
+
+def test_channel_streams(instance: str, channel_id: str, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Test fetching streams from a channel via Invidious instance
     
-    try:
-        print(f"\n{'='*80}")
-        print(f"Testing: {instance}")
-        print(f"URL: {url}")
+    Args:
+        instance: Invidious instance URL
+        channel_id: YouTube channel ID
+        verbose: Print the result as soon as the request finishes
         
-        response = requests.get(
-            url,
-            headers={"Accept": "application/json"},
-            timeout=10
-        )
+    Returns:
+        Dictionary with test results
+    """
+    import requests
+
+    result = new_result(instance, channel_id)
+    url = result["url"]
+    
+    started = time.monotonic()
+    try:
+        response = get_store().get(instance, f"/api/v1/channels/{channel_id}/streams")
         
         result["status_code"] = response.status_code
         
         if response.status_code == 200:
             data = response.json()
+            videos = entries_from_payload(data)
             
-            if isinstance(data, list):
+            if videos is not None:
                 result["success"] = True
-                result["total_videos"] = len(data)
+                result["total_videos"] = len(videos)
                 
                 # Filter for live streams
-                live_streams = [v for v in data if v.get("liveNow") == True]
+                live_streams = [v for v in videos if v.live_now]
                 result["live_streams"] = len(live_streams)
                 result["stream_titles"] = [
                     {
-                        "title": stream.get("title", "N/A"),
-                        "author": stream.get("author", "N/A"),
-                        "viewCount": stream.get("viewCount", 0),
-                        "videoId": stream.get("videoId", "N/A"),
+                        "title": stream.title or "N/A",
+                        "author": stream.author or "N/A",
+                        "viewCount": stream.view_count,
+                        "videoId": stream.video_id,
                     }
                     for stream in live_streams[:5]  # Show first 5
                 ]
-                
-                print(f"✅ SUCCESS")
-                print(f"   Total videos: {result['total_videos']}")
-                print(f"   Live streams: {result['live_streams']}")
-                
-                if live_streams:
-                    print(f"\n   Live Streams Found:")
-                    for i, stream in enumerate(live_streams[:5], 1):
-                        print(f"   {i}. {stream.get('author', 'N/A')} - {stream.get('title', 'N/A')}")
-                        print(f"      Viewers: {stream.get('viewCount', 0)}")
-                        print(f"      URL: https://youtube.com/watch?v={stream.get('videoId', '')}")
-                else:
-                    print(f"   No live streams currently")
             else:
                 result["error"] = f"Unexpected response format: {type(data)}"
-                print(f"❌ FAILED: {result['error']}")
+        elif get_store().throttle_remaining(instance) > 0:
+            result["error"] = f"HTTP {response.status_code} (backing off {get_store().throttle_remaining(instance):.0f}s)"
         else:
             result["error"] = f"HTTP {response.status_code}"
-            print(f"❌ FAILED: HTTP {response.status_code}")
-            print(f"   Response: {response.text[:200]}")
             
     except requests.exceptions.Timeout:
         result["error"] = "Request timeout"
-        print(f"❌ FAILED: Timeout")
     except requests.exceptions.ConnectionError as e:
         result["error"] = f"Connection error: {str(e)}"
-        print(f"❌ FAILED: Connection error")
     except requests.exceptions.RequestException as e:
         result["error"] = f"Request error: {str(e)}"
-        print(f"❌ FAILED: {str(e)}")
     except Exception as e:
         result["error"] = f"Unexpected error: {str(e)}"
-        print(f"❌ FAILED: {str(e)}")
+    result["elapsed"] = time.monotonic() - started
+    
+    # Phase timings of the request just made on this thread
+    timing = get_recorder().current()
+    if timing is not None and timing.instance == split_url(url)[0]:
+        result["phases"] = {phase: round(seconds, 4) for phase, seconds in timing.phases().items()}
+    
+    if verbose:
+        print_result(result)
     
     return result
 
 
+def print_result(result: Dict[str, Any]):
+    """Print a single instance result block"""
+    print(f"\n{'='*80}")
+    print(f"Testing: {result['instance']}")
+    print(f"URL: {result['url']}")
+    
+    if result["success"]:
+        print(f"✅ SUCCESS")
+        print(f"   Total videos: {result['total_videos']}")
+        print(f"   Live streams: {result['live_streams']}")
+        
+        if result["stream_titles"]:
+            print(f"\n   Live Streams Found:")
+            for i, stream in enumerate(result["stream_titles"], 1):
+                print(f"   {i}. {stream['author']} - {stream['title']}")
+                print(f"      Viewers: {stream['viewCount']}")
+                print(f"      URL: https://youtube.com/watch?v={stream['videoId']}")
+        else:
+            print(f"   No live streams currently")
+    else:
+        print(f"❌ FAILED: {result['error']}")
+
+
+def print_summary(results: List[Dict[str, Any]]):
+    """
+    Print one row per instance with its outcome and per-phase timings (ms)
+    
+    Working instances come first, fastest first.
+    """
+    def outcome(r: Dict[str, Any]) -> str:
+        if r["success"]:
+            return "OK"
+        if r["error"]:
+            return r["error"].split(":")[0]
+        return f"HTTP {r['status_code']}"
+    
+    ordered = sorted(results, key=lambda r: (not r["success"], r.get("elapsed") or float("inf")))
+    rows = [
+        [r["instance"], outcome(r), str(r["total_videos"]), str(r["live_streams"])]
+        + [format_ms(r["phases"].get(phase)) for phase in PHASES]
+        + [format_ms(r.get("elapsed"))]
+        for r in ordered
+    ]
+    headers = ["Instance", "Result", "Videos", "Live", "DNS", "Connect", "TLS", "TTFB", "Body", "Decode", "Total"]
+    print_table(headers, rows)
+    print("(times in ms; '-' = phase not reached or connection reused)")
+
+
+def probe_instances(
+    instances: List[str],
+    channel_id: str,
+    max_workers: int = MAX_CONCURRENT_PROBES,
+    deadline: float = PROBE_DEADLINE,
+) -> List[Dict[str, Any]]:
+    """
+    Probe all instances concurrently under one overall deadline
+    
+    Results are printed as each instance finishes. Instances that have not
+    answered when the deadline passes are reported as failed so the run never
+    takes longer than the deadline.
+    
+    Args:
+        instances: Invidious instance URLs
+        channel_id: YouTube channel ID
+        max_workers: Maximum number of requests in flight at once
+        deadline: Seconds allowed for the whole probe run
+        
+    Returns:
+        List of result dictionaries, in the same order as instances
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(instances))))
+    futures = {
+        executor.submit(test_channel_streams, instance, channel_id): instance
+        for instance in instances
+    }
+    
+    wait(futures, timeout=deadline)
+    
+    # Don't block on stragglers - their sockets time out on their own
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    by_instance = {}
+    for future, instance in futures.items():
+        if future.done() and not future.cancelled():
+            by_instance[instance] = future.result()
+        else:
+            by_instance[instance] = new_result(
+                instance, channel_id, f"Probe deadline exceeded ({deadline:g}s)", deadline)
+            print_result(by_instance[instance])
+    
+    return [by_instance[instance] for instance in instances]
+
+
+def record_probes(snapshots: SnapshotStore, results: List[Dict[str, Any]]):
+    """
+    Append probe results to the observation history
+    
+    Instances skipped for throttling were not probed and are left out;
+    unreachable ones count as failed probes. Results list at most five
+    live streams per instance, so only those are recorded.
+    """
+    now = time.time()
+    try:
+        for r in results:
+            if r["error"] and r["error"].startswith("Throttled"):
+                continue
+            live = None
+            if r["success"]:
+                live = [VideoEntry(s["videoId"], s["title"], s["author"], live_now=True, view_count=s["viewCount"])
+                        for s in r["stream_titles"]]
+            snapshots.record_poll(SC6_GAME_CHANNEL_ID, r["instance"], live, now, probe=True)
+    finally:
+        snapshots.close()
+
+
 def main():
     """Main test function"""
+    parser = argparse.ArgumentParser(description="Test Invidious channel streams endpoint")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Probe instances one after another instead of concurrently")
+    parser.add_argument("--workers", type=int, default=MAX_CONCURRENT_PROBES,
+                        help=f"Maximum concurrent probes (default: {MAX_CONCURRENT_PROBES})")
+    parser.add_argument("--deadline", type=float, default=PROBE_DEADLINE,
+                        help=f"Overall deadline in seconds for concurrent mode (default: {PROBE_DEADLINE})")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Append per-request phase timings to FILE as JSON lines")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="Write request metrics to FILE in Prometheus text format")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="Probe every instance, even ones that do not resolve or refuse connections")
+    parser.add_argument("--snapshots", nargs="?", const=SNAPSHOT_DIR, metavar="DIR",
+                        help=f"Append each probe to the observation history in DIR (default: {SNAPSHOT_DIR})")
+    args = parser.parse_args()
+    
+    recorder = get_recorder()
+    if args.metrics:
+        recorder.jsonl_path = args.metrics
+    
     print("="*80)
     print("INVIDIOUS CHANNEL STREAMS API TESTER")
     print("="*80)
@@ -128,35 +282,46 @@ def main():
     print(f"Testing {len(INVIDIOUS_INSTANCES)} instances...")
     print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    results = []
+    started = time.monotonic()
     
-    # Test each instance
-    for instance in INVIDIOUS_INSTANCES:
-        result = test_channel_streams(instance, SC6_GAME_CHANNEL_ID)
-        results.append(result)
+    # Instances that cannot be reached, or asked us to back off, are
+    # reported without spending a probe on them
+    instances = INVIDIOUS_INSTANCES
+    pruned: List[Dict[str, Any]] = []
+    if not args.no_preflight:
+        check = preflight(INVIDIOUS_INSTANCES, get_store())
+        instances = check.alive
+        for instance, reason in check.dead.items():
+            print(f"⏭️  Skipping {instance}: {reason}")
+            pruned.append(new_result(instance, error=f"Preflight {reason}"))
+        print(f"🔎 Preflight: {len(instances)}/{len(INVIDIOUS_INSTANCES)} instances reachable ({check.elapsed:.2f}s)")
+    throttled = {i: get_store().throttle_remaining(i) for i in instances}
+    for instance, pause in throttled.items():
+        if pause > 0:
+            print(f"⏭️  Skipping {instance}: throttled for another {pause:.0f}s")
+            pruned.append(new_result(instance, error=f"Throttled {pause:.0f}s"))
+    instances = [i for i in instances if throttled[i] <= 0]
     
-    # Summary
-    print("\n" + "="*80)
-    print("SUMMARY")
-    print("="*80)
-    
-    successful = [r for r in results if r["success"]]
-    failed = [r for r in results if not r["success"]]
-    
-    print(f"\n✅ Successful: {len(successful)}/{len(results)}")
-    print(f"❌ Failed: {len(failed)}/{len(results)}")
+    if args.sequential:
+        results = []
+        for instance in instances:
+            result = test_channel_streams(instance, SC6_GAME_CHANNEL_ID)
+            results.append(result)
+    else:
+        results = probe_instances(
+            instances,
+            SC6_GAME_CHANNEL_ID,
+            max_workers=args.workers,
+            deadline=args.deadline,
+        )
     
-    if successful:
-        print("\n✅ Working Instances:")
-        for r in successful:
-            print(f"   - {r['instance']}")
-            print(f"     Total videos: {r['total_videos']}, Live: {r['live_streams']}")
+    elapsed = time.monotonic() - started
+    results += pruned
     
-    if failed:
-        print("\n❌ Failed Instances:")
-        for r in failed:
-            error_msg = r['error'] or f"HTTP {r['status_code']}"
-            print(f"   - {r['instance']}: {error_msg}")
+    print("\n" + "="*80)
+    print_summary(results)
+    successful = [r for r in results if r["success"]]
+    print(f"\n⏱️  Probe time: {elapsed:.1f}s, ✅ {len(successful)}/{len(results)} instances answered")
     
     # Find best instance with live streams
     live_instances = [r for r in successful if r["live_streams"] > 0]
@@ -180,6 +345,17 @@ def main():
         }, f, indent=2)
     
     print(f"\n📄 Full results saved to: {output_file}")
+    
+    if args.snapshots:
+        record_probes(SnapshotStore(args.snapshots), results)
+        print(f"🗂️  Probes added to history: {args.snapshots}")
+    
+    health = get_store()
+    health.save()
+    print(f"🩺 Instance health updated: {health.path}")
+    if args.prometheus:
+        recorder.write_prometheus(args.prometheus)
+        print(f"📈 Request metrics written: {args.prometheus}")
     print("="*80)
 
 
@@ -0,0 +1,90 @@
+"""
+Unit tests for invidious_cli.py: warm mode serves runs like a cold start would
+
+Usage:
+    python -m pytest -q test_invidious_cli.py
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import invidious_cli
+from snapshot_store import Observation, SnapshotStore
+
+pytestmark = pytest.mark.skipif(not invidious_cli.warm_supported(), reason="warm mode needs fork() and fd passing")
+
+CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "invidious_cli.py")
+CHANNEL_ID = "UC2eOo8z3dhPbBkyqHbnxm6A"
+
+
+def cli(*args, env=None, cwd=None):
+    return subprocess.run([sys.executable, CLI, *args], capture_output=True, text=True, timeout=30,
+                          env=env, cwd=cwd)
+
+
+@pytest.fixture
+def warm(tmp_path):
+    """Start a warm server on a private socket; yields the client environment"""
+    socket_path = str(tmp_path / "cli.sock")
+    env = {key: value for key, value in os.environ.items() if not key.startswith("INVIDIOUS_CLI_")}
+    env["INVIDIOUS_CLI_SOCKET"] = socket_path
+    server = subprocess.Popen([sys.executable, CLI, "warm"], env=env, cwd=str(tmp_path),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        assert server.stdout.readline().startswith("[OK] Warm server on")
+        yield env
+    finally:
+        if server.poll() is None:
+            cli("warm", "--stop", env=env)
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        server.stdout.close()
+
+
+def served(env):
+    status = cli("warm", "--status", env=env)
+    assert status.returncode == 0
+    return int(status.stdout.split(": ")[1].split()[0])
+
+
+def test_warm_run_matches_a_cold_run(warm, tmp_path):
+    cold = cli("find", CHANNEL_ID, env=dict(warm, INVIDIOUS_CLI_COLD="1"))
+    hot = cli("find", CHANNEL_ID, env=warm)
+    assert (hot.returncode, hot.stdout, hot.stderr) == (cold.returncode, cold.stdout, cold.stderr)
+    assert CHANNEL_ID in hot.stdout
+    assert served(warm) == 1
+
+
+def test_exit_status_and_stderr_come_back(warm):
+    result = cli("history", "--no-such-flag", env=warm)
+    assert result.returncode == 2
+    assert "error: the following arguments are required" in result.stderr
+    assert served(warm) == 1
+
+
+def test_client_directory_is_used(warm, tmp_path):
+    store = SnapshotStore(str(tmp_path / "work" / "snaps"))
+    store.append([Observation(time.time(), "UCa", "va", True, 10, "https://a")])
+    store.close()
+    result = cli("history", "--dir", "snaps", "stats", env=warm, cwd=str(tmp_path / "work"))
+    assert result.returncode == 0
+    assert result.stdout.startswith("1 partition(s) (0 sealed), 1 row(s)")
+    assert served(warm) == 1
+
+
+def test_different_settings_run_cold(warm):
+    result = cli("find", CHANNEL_ID, env=dict(warm, INVIDIOUS_TIMEOUT="3"))
+    assert result.returncode == 0
+    assert served(warm) == 0
+
+
+def test_stop(warm):
+    assert cli("warm", "--stop", env=warm).stdout.startswith("[OK] Warm server stopped")
+    assert not os.path.exists(warm["INVIDIOUS_CLI_SOCKET"])
+    assert invidious_cli.run_warm(["find", CHANNEL_ID], warm["INVIDIOUS_CLI_SOCKET"]) is None
@@ -0,0 +1,100 @@
+"""
+Unit tests for keyword_search.py: the title matcher and search-based discovery
+
+Usage:
+    python -m pytest -q test_keyword_search.py
+"""
+
+import json
+
+import pytest
+
+import invidious_http
+import keyword_search
+from conftest import FakeResponse
+from instance_health import HealthStore
+from keyword_search import KeywordMatcher, discover_streams, search_page
+from rate_limit import InstanceRateLimiter
+from video_entry import VideoEntry
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HealthStore(str(tmp_path / "health.json"))
+
+
+@pytest.fixture
+def limiter(store):
+    return InstanceRateLimiter(rate=1000, burst=1000, store=store)
+
+
+@pytest.mark.parametrize("title, keyword", [
+    ("SoulCalibur 6 ranked", "soul calibur 6"),
+    ("SOULCALIBUR Ⅵ online", "soulcalibur vi"),
+    ("Soul-Calibur 6 casuals", "soul calibur 6"),
+    ("ＳＣ６ lobbies", "sc6"),
+    ("【ソウルキャリバー６】対戦", "ソウルキャリバー6"),
+    ("[SC6] Kilik grind", "sc6"),
+])
+def test_matcher_finds_keyword_variants(title, keyword):
+    assert KeywordMatcher().search(title) == keyword
+
+
+@pytest.mark.parametrize("title", ["disc6 unboxing", "Tekken 8 ranked", "", None, "soulcalibur 64"])
+def test_matcher_rejects_other_titles(title):
+    assert not KeywordMatcher().matches(title)
+
+
+def test_matcher_reports_the_most_specific_keyword():
+    matcher = KeywordMatcher(["calibur 6", "soulcalibur 6", " "])
+    assert matcher.keywords == ["calibur 6", "soulcalibur 6"]
+    assert matcher.search("soulcalibur 6 tonight") == "soulcalibur 6"
+    assert KeywordMatcher([]).search("anything") is None
+
+
+def live(video_id, title, viewers):
+    return VideoEntry(video_id, title, "A", live_now=True, view_count=viewers)
+
+
+def test_discover_merges_filters_and_sorts(store, limiter, monkeypatch):
+    pages = {
+        ("sc6", 1): [live("a", "SC6 ranked", 50), live("b", "Minecraft", 900), live("c", "sc6 casuals", 5)],
+        ("sc6", 2): [],
+        ("soulcalibur 6", 1): [live("a", "SC6 ranked", 50), live("d", "SoulCalibur 6 finals", 300),
+                               VideoEntry("e", "SoulCalibur 6 VOD", view_count=1000)],
+        ("soulcalibur 6", 2): [],
+    }
+    monkeypatch.setattr(keyword_search, "search_page", lambda keyword, page, *args: pages[(keyword, page)])
+    streams = discover_streams(["sc6", "soulcalibur 6"], ["https://a"], store, limiter)
+    assert [v.video_id for v in streams] == ["d", "a", "c"]
+    streams = discover_streams(["sc6", "soulcalibur 6"], ["https://a"], store, limiter, min_viewers=10)
+    assert [v.video_id for v in streams] == ["d", "a"]
+
+
+def test_paging_stops_below_min_viewers(store, limiter, monkeypatch):
+    requested = []
+
+    def page(keyword, number, *args):
+        requested.append(number)
+        return [live(f"v{number}", "sc6", 100 // number)]
+
+    monkeypatch.setattr(keyword_search, "search_page", page)
+    discover_streams(["sc6"], ["https://a"], store, limiter, max_pages=5, min_viewers=40)
+    assert requested == [1, 2, 3]
+
+
+def test_search_page_reads_video_results(store, limiter, monkeypatch):
+    results = [
+        {"type": "channel", "authorId": "UCa"},
+        {"type": "video", "videoId": "v1", "title": "SC6", "liveNow": True, "viewCount": 12},
+    ]
+    urls = []
+
+    def get(url, **kwargs):
+        urls.append(url)
+        return FakeResponse(body=json.dumps(results).encode())
+
+    monkeypatch.setattr(invidious_http, "get", get)
+    videos = search_page("soul calibur 6", 2, ["https://a"], store, limiter)
+    assert [(v.video_id, v.view_count) for v in videos] == [("v1", 12)]
+    assert urls == ["https://a/api/v1/search?q=soul%20calibur%206&type=video&features=live&sort=views&page=2"]
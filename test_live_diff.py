@@ -0,0 +1,61 @@
+"""
+Unit tests for live_diff.py: change events between polls and state persistence
+
+Usage:
+    python -m pytest -q test_live_diff.py
+"""
+
+from live_diff import DiffTracker, viewer_level
+from video_entry import VideoEntry
+
+
+def stream(video_id, title="Ranked", viewers=10):
+    return VideoEntry(video_id, title, "A", live_now=True, view_count=viewers)
+
+
+def types(events):
+    return [(event.type, event.video_id) for event in events]
+
+
+def test_first_poll_only_reports_live_streams():
+    tracker = DiffTracker()
+    assert types(tracker.update("UCa", [stream("v1")], "v1")) == [("went_live", "v1")]
+    assert types(tracker.update("UCb", [], "old")) == []
+
+
+def test_changes_between_polls():
+    tracker = DiffTracker()
+    tracker.update("UCa", [stream("v1"), stream("v2", viewers=20)], "v2")
+    events = tracker.update("UCa", [stream("v2", "Finals", viewers=30), stream("v3")], "v3")
+    assert types(events) == [
+        ("ended", "v1"),
+        ("went_live", "v3"),
+        ("title_changed", "v2"),
+        ("viewers_changed", "v2"),
+        ("new_video", "v3"),
+    ]
+    assert events[2].previous == "Ranked"
+    assert events[3].previous == 20
+
+
+def test_viewer_changes_within_a_level_are_quiet():
+    tracker = DiffTracker()
+    tracker.update("UCa", [stream("v1", viewers=11)])
+    assert tracker.update("UCa", [stream("v1", viewers=24)]) == []
+    assert viewer_level(24) == viewer_level(11) == 1
+
+
+def test_state_round_trip(tmp_path):
+    path = str(tmp_path / "state.json")
+    tracker = DiffTracker(path)
+    tracker.update("UCa", [stream("v1")], "v1")
+    tracker.save()
+    reloaded = DiffTracker(path)
+    assert reloaded.update("UCa", [stream("v1")], "v1") == []
+    assert types(reloaded.update("UCa", [], "v1")) == [("ended", "v1")]
+
+
+def test_corrupt_state_is_ignored(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{not json")
+    assert DiffTracker(str(path)).channels == {}
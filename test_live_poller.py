@@ -0,0 +1,95 @@
+"""
+Unit tests for live_poller.py: adaptive intervals, the budget and diff-state saves
+
+Usage:
+    python -m pytest -q test_live_poller.py
+"""
+
+import os
+
+import pytest
+
+import live_poller
+from instance_health import HealthStore
+from live_diff import DiffTracker
+from live_poller import (
+    DORMANT_INTERVAL,
+    FAILURE_INTERVAL,
+    LIVE_INTERVAL,
+    MAX_INTERVAL,
+    ChannelSchedule,
+    LivePoller,
+    next_interval,
+)
+from live_verifier import LiveVerifier
+from video_entry import VideoEntry
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    """Keep the poller off the process-wide health file"""
+    store = HealthStore(str(tmp_path / "health.json"))
+    monkeypatch.setattr(live_poller, "get_store", lambda: store)
+    return store
+
+
+def quiet(video_id="old"):
+    return [VideoEntry(video_id, "Old upload", "A", published_text="3 days ago")]
+
+
+def test_live_channel_polls_fast():
+    schedule = ChannelSchedule("UCa")
+    assert next_interval(schedule, [VideoEntry("v", "Live", "A", live_now=True)]) == LIVE_INTERVAL
+    assert schedule.live
+
+
+def test_quiet_channel_backs_off_until_something_changes():
+    schedule = ChannelSchedule("UCa")
+    delays = [next_interval(schedule, quiet()) for _ in range(12)]
+    assert delays[:4] == [DORMANT_INTERVAL, DORMANT_INTERVAL, DORMANT_INTERVAL * 2, DORMANT_INTERVAL * 4]
+    assert delays[-1] == MAX_INTERVAL
+    assert next_interval(schedule, quiet("new")) == DORMANT_INTERVAL
+
+
+def test_failures_back_off():
+    schedule = ChannelSchedule("UCa")
+    assert [next_interval(schedule, None) for _ in range(3)] == [
+        FAILURE_INTERVAL, FAILURE_INTERVAL * 2, FAILURE_INTERVAL * 4]
+
+
+@pytest.mark.parametrize("budget", [0, -1])
+def test_budget_must_be_positive(budget):
+    with pytest.raises(ValueError):
+        LivePoller(["UCa"], ["https://a"], budget=budget)
+
+
+def test_diff_state_is_saved_on_an_interval_and_at_exit(tmp_path, monkeypatch):
+    state = str(tmp_path / "state.json")
+    poller = LivePoller(["UCa", "UCb"], ["https://a"], budget=100, tracker=DiffTracker(state))
+    poller.poll = lambda channel_id: (quiet(), None, "https://a")
+
+    poller.on_result("UCa", quiet(), None, "https://a")
+    assert not os.path.exists(state)
+
+    monkeypatch.setattr(live_poller, "TRACKER_SAVE_INTERVAL", 0)
+    poller.on_result("UCb", quiet(), None, "https://a")
+    assert os.path.exists(state)
+    os.remove(state)
+
+    monkeypatch.setattr(live_poller, "TRACKER_SAVE_INTERVAL", 3600)
+    poller.run(duration=0.2)
+    assert os.path.exists(state)
+
+
+def test_verification_draws_from_the_poll_budget(store, monkeypatch):
+    charged = []
+    monkeypatch.setattr(LiveVerifier, "fetch_status", lambda self, video_id, budget=None: charged.append(budget))
+    verifier = LiveVerifier(["https://a"], store)
+    poller = LivePoller(["UCa"], ["https://a"], budget=100, verifier=verifier)
+    monkeypatch.setattr(live_poller, "fetch_channel_videos",
+                        lambda *args, **kwargs: ("https://a", [VideoEntry("v", live_now=True)]))
+    try:
+        poller.poll("UCa")
+    finally:
+        verifier.close()
+    assert charged == [poller.budget]
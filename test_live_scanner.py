@@ -0,0 +1,90 @@
+"""
+Unit tests for live_scanner.py: listing pagination and roster parsing
+
+Usage:
+    python -m pytest -q test_live_scanner.py
+"""
+
+import threading
+
+import live_scanner
+from channel_resolver import parse_channel_ref
+from pagination import Page
+from rate_limit import TokenBucket
+from video_entry import VideoEntry
+
+
+def listing(pages):
+    """fetch_listing_page stand-in serving the given pages of entries in order"""
+    requested = []
+
+    def fetch(channel_id, instances, store, limiter, continuation=None):
+        index = int(continuation) if continuation else 0
+        requested.append(continuation)
+        threads.add(threading.current_thread().name)
+        cursor = str(index + 1) if index + 1 < len(pages) else None
+        return "https://a", Page(pages[index], cursor)
+
+    threads = set()
+    fetch.threads = threads
+    return fetch, requested
+
+
+def live(video_id):
+    return VideoEntry(video_id, live_now=True)
+
+
+def test_listing_follows_pages_while_everything_is_live(monkeypatch):
+    fetch, requested = listing([[live("a"), live("b")], [live("c"), VideoEntry("d")], [VideoEntry("e")]])
+    monkeypatch.setattr(live_scanner, "fetch_listing_page", fetch)
+    instance, videos = live_scanner.fetch_channel_videos("UCa", [], None, None)
+    assert instance == "https://a"
+    assert [v.video_id for v in videos] == ["a", "b", "c", "d"]
+    assert requested == [None, "1"]
+
+
+def test_listing_stops_at_the_first_finished_entry(monkeypatch):
+    fetch, requested = listing([[live("a"), VideoEntry("b")], [live("c")]])
+    monkeypatch.setattr(live_scanner, "fetch_listing_page", fetch)
+    _, videos = live_scanner.fetch_channel_videos("UCa", [], None, None)
+    assert [v.video_id for v in videos] == ["a", "b"]
+    assert requested == [None]
+
+
+def test_every_further_page_is_charged_to_the_budget(monkeypatch):
+    fetch, requested = listing([[live("a")], [live("b")], [live("c")]])
+    monkeypatch.setattr(live_scanner, "fetch_listing_page", fetch)
+    budget = TokenBucket(rate=0.001, burst=5)
+    live_scanner.fetch_channel_videos("UCa", [], None, None, budget=budget)
+    assert requested == [None, "1", "2"]
+    assert int(budget._tokens) == 3
+
+
+def test_listing_pages_in_turn_unless_prefetch_is_asked_for(monkeypatch):
+    pages = [[live("a")], [live("b")], [live("c")]]
+    for prefetch in (False, True):
+        fetch, requested = listing(pages)
+        monkeypatch.setattr(live_scanner, "fetch_listing_page", fetch)
+        _, videos = live_scanner.fetch_channel_videos("UCa", [], None, None, prefetch=prefetch)
+        assert [v.video_id for v in videos] == ["a", "b", "c"]
+        assert requested == [None, "1", "2"]
+        assert any(name.startswith("prefetch") for name in fetch.threads) == prefetch
+
+
+def test_failed_first_page(monkeypatch):
+    monkeypatch.setattr(live_scanner, "fetch_listing_page", lambda *args: (None, None))
+    assert live_scanner.fetch_channel_videos("UCa", [], None, None) == (None, None)
+
+
+def test_parse_channel_ref():
+    assert parse_channel_ref("UCJ0Y3WUgX0eqgQ76mz1PaFA") == ("id", "UCJ0Y3WUgX0eqgQ76mz1PaFA")
+    assert parse_channel_ref("https://www.youtube.com/channel/UCJ0Y3WUgX0eqgQ76mz1PaFA") == (
+        "id", "UCJ0Y3WUgX0eqgQ76mz1PaFA")
+    assert parse_channel_ref("@JingleBells_Gaming") == ("handle", "JingleBells_Gaming")
+    assert parse_channel_ref("https://youtube.com/@JingleBells_Gaming/streams") == ("handle", "JingleBells_Gaming")
+
+
+def test_read_roster(tmp_path):
+    roster = tmp_path / "channels.txt"
+    roster.write_text("# streamers\n@one\n\nUCJ0Y3WUgX0eqgQ76mz1PaFA  # game channel\n", encoding="utf-8")
+    assert live_scanner.read_roster(str(roster)) == ["@one", "UCJ0Y3WUgX0eqgQ76mz1PaFA"]
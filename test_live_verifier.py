@@ -0,0 +1,101 @@
+"""
+Unit tests for live_verifier.py: candidate selection, de-duplication and the status cache
+
+Usage:
+    python -m pytest -q test_live_verifier.py
+"""
+
+import json
+
+import pytest
+
+import invidious_http
+from conftest import FakeResponse
+from instance_health import HealthStore
+from live_verifier import LiveVerifier, VideoStatus, apply_status, select_candidates
+from rate_limit import InstanceRateLimiter, TokenBucket
+from video_entry import VideoEntry
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HealthStore(str(tmp_path / "health.json"))
+
+
+@pytest.fixture
+def details(monkeypatch):
+    """Serve /api/v1/videos/{id} from a dict of video ID -> liveNow; other IDs get a 500"""
+    live = {}
+    requested = []
+
+    def get(url, **kwargs):
+        video_id = url.split("/api/v1/videos/")[1].split("?")[0]
+        requested.append(video_id)
+        if video_id not in live:
+            return FakeResponse(500, b"")
+        body = {"videoId": video_id, "liveNow": live[video_id], "viewCount": 42, "published": 1700000000}
+        return FakeResponse(body=json.dumps(body).encode())
+
+    monkeypatch.setattr(invidious_http, "get", get)
+    return live, requested
+
+
+@pytest.fixture
+def verifier(store):
+    verifier = LiveVerifier(["https://a"], store, InstanceRateLimiter(rate=1000, burst=1000, store=store), top_k=2)
+    yield verifier
+    verifier.close()
+
+
+def test_select_candidates_keeps_the_most_recent_live_entries():
+    videos = [
+        VideoEntry("old", live_now=True, published=100),
+        VideoEntry("vod", published=500),
+        VideoEntry("new", live_now=True, published=300),
+        VideoEntry("recent", published_text="5 minutes ago", published=200),
+    ]
+    assert [v.video_id for v in select_candidates(videos, top_k=2)] == ["new", "recent"]
+    assert [v.video_id for v in select_candidates(videos, live_now_only=True)] == ["new", "old"]
+
+
+def test_apply_status():
+    entry = VideoEntry("v", live_now=True, view_count=5, published=100)
+    assert apply_status(entry, None) is entry
+    updated = apply_status(entry, VideoStatus(False, True, None, 0))
+    assert (updated.live_now, updated.is_upcoming, updated.published, updated.view_count) == (False, True, 100, 5)
+
+
+def test_verify_drops_finished_streams_and_shares_lookups(verifier, details):
+    live, requested = details
+    live.update({"collab": True, "ended": False})
+    listings = {
+        "UCa": [VideoEntry("collab", live_now=True), VideoEntry("ended", live_now=True)],
+        "UCb": [VideoEntry("collab", live_now=True), VideoEntry("vod")],
+    }
+    result = verifier.verify(listings)
+    assert [v.video_id for v in result["UCa"]] == ["collab"]
+    assert [(v.video_id, v.view_count) for v in result["UCb"]] == [("collab", 42)]
+    assert sorted(requested) == ["collab", "ended"]
+
+    verifier.verify(listings)
+    assert len(requested) == 2
+    assert (verifier.lookups, verifier.cache_hits) == (2, 2)
+
+
+def test_failed_lookup_keeps_the_listing_heuristic(verifier, details):
+    result = verifier.verify({"UCa": [VideoEntry("unknown", live_now=True, view_count=7)]})
+    assert [(v.video_id, v.view_count) for v in result["UCa"]] == [("unknown", 7)]
+    # Failures are not cached
+    verifier.verify({"UCa": [VideoEntry("unknown", live_now=True)]})
+    assert details[1] == ["unknown", "unknown"]
+
+
+def test_lookups_are_charged_to_the_budget(verifier, details):
+    details[0].update({"a": True, "b": True})
+    budget = TokenBucket(rate=0.001, burst=5)
+    listings = {"UCa": [VideoEntry("a", live_now=True), VideoEntry("b", live_now=True)]}
+    verifier.verify(listings, budget)
+    assert int(budget._tokens) == 3
+    # Cached answers cost nothing
+    verifier.verify(listings, budget)
+    assert int(budget._tokens) == 3
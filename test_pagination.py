@@ -0,0 +1,87 @@
+"""
+Unit tests for pagination.py: cursor following, cutoffs and prefetch
+
+Usage:
+    python -m pytest -q test_pagination.py
+"""
+
+import threading
+
+import pytest
+
+from pagination import Page, Paginator, paginate
+
+
+class Source:
+    """Pages of consecutive numbers, recording which cursors were fetched"""
+
+    def __init__(self, pages=5, per_page=3):
+        self.pages = pages
+        self.per_page = per_page
+        self.fetched = []
+        self.threads = set()
+
+    def __call__(self, cursor):
+        index = int(cursor) if cursor else 0
+        self.fetched.append(cursor)
+        self.threads.add(threading.current_thread().name)
+        start = index * self.per_page
+        next_cursor = str(index + 1) if index + 1 < self.pages else None
+        return Page(list(range(start, start + self.per_page)), next_cursor)
+
+
+def test_follows_cursors_to_the_last_page():
+    source = Source(pages=3)
+    assert paginate(source) == list(range(9))
+    assert source.fetched == [None, "1", "2"]
+
+
+def test_max_pages():
+    source = Source(pages=10)
+    paginator = Paginator(source, max_pages=2)
+    assert paginator.collect() == list(range(6))
+    assert paginator.pages_fetched == 2
+    assert source.fetched == [None, "1"]
+
+
+def test_cutoff_keeps_the_page_and_stops():
+    source = Source(pages=10)
+    paginator = Paginator(source, until=lambda n: n >= 4, prefetch=False)
+    assert paginator.collect() == list(range(6))
+    assert paginator.stopped_early
+    assert source.fetched == [None, "1"]
+
+
+def test_cutoff_never_prefetches_past_the_cutoff():
+    source = Source(pages=10)
+    paginator = Paginator(source, until=lambda n: n >= 1)
+    assert [page.items for page in paginator.pages()] == [[0, 1, 2]]
+    assert source.fetched == [None]
+
+
+def test_pages_prefetch_on_a_worker_thread():
+    source = Source(pages=3)
+    pages = Paginator(source).pages()
+    first = next(pages)
+    assert first.items == [0, 1, 2]
+    assert list(page.items for page in pages) == [[3, 4, 5], [6, 7, 8]]
+    assert any(name.startswith("prefetch") for name in source.threads)
+
+
+def test_paginate_does_not_prefetch():
+    source = Source(pages=3)
+    paginate(source)
+    assert source.threads == {threading.current_thread().name}
+
+
+def test_error_ends_the_walk_after_earlier_pages():
+    def fetch(cursor):
+        if cursor == "1":
+            raise ValueError("boom")
+        return Page([0], "1")
+
+    seen = []
+    with pytest.raises(ValueError):
+        for page in Paginator(fetch).pages():
+            seen.append(page.items)
+    assert seen == [[0]]
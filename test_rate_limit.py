@@ -0,0 +1,65 @@
+"""
+Unit tests for rate_limit.py: token buckets and throttle-aware instance picking
+
+Usage:
+    python -m pytest -q test_rate_limit.py
+"""
+
+import time
+
+import pytest
+
+from instance_health import HealthStore
+from rate_limit import InstanceRateLimiter, TokenBucket, pick_instance
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HealthStore(str(tmp_path / "health.json"))
+
+
+def test_bucket_allows_burst_then_refills():
+    bucket = TokenBucket(rate=20, burst=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert 0 < bucket.wait_time() <= 0.05
+    assert bucket.acquire(timeout=1.0)
+    assert not bucket.acquire(timeout=0.0)
+
+
+def test_limiter_buckets_are_per_instance(store):
+    limiter = InstanceRateLimiter(rate=0.001, burst=1, store=store)
+    assert limiter.try_acquire("https://a")
+    assert not limiter.try_acquire("https://a")
+    assert limiter.try_acquire("https://b")
+
+
+def test_throttled_instance_gets_no_tokens(store):
+    limiter = InstanceRateLimiter(rate=10, burst=5, store=store)
+    store.record_throttle("https://a", retry_after=60)
+    assert not limiter.try_acquire("https://a")
+    assert limiter.wait_time("https://a") >= 59
+    assert not limiter.acquire("https://a", timeout=0.05)
+
+
+def test_pick_instance_prefers_ranking_and_skips_tried(store):
+    limiter = InstanceRateLimiter(rate=10, burst=5, store=store)
+    ranked = ["https://a", "https://b"]
+    assert pick_instance(ranked, set(), limiter) == "https://a"
+    assert pick_instance(ranked, {"https://a"}, limiter) == "https://b"
+    assert pick_instance(ranked, {"https://a", "https://b"}, limiter) is None
+
+
+def test_pick_instance_waits_out_a_short_pause(store):
+    limiter = InstanceRateLimiter(rate=10, burst=5, store=store)
+    store.get_record("https://a").throttled_until = time.time() + 0.1
+    started = time.monotonic()
+    assert pick_instance(["https://a"], set(), limiter, max_wait=1.0) == "https://a"
+    assert time.monotonic() - started >= 0.05
+
+
+def test_pick_instance_gives_up_on_a_long_pause(store):
+    limiter = InstanceRateLimiter(rate=10, burst=5, store=store)
+    store.record_throttle("https://a", retry_after=60)
+    assert pick_instance(["https://a"], set(), limiter, max_wait=1.0) is None
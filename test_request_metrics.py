@@ -0,0 +1,95 @@
+"""
+Unit tests for request_metrics.py and timed_adapter.py: phase timings and exports
+
+Usage:
+    python -m pytest -q test_request_metrics.py
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import request_metrics
+from request_metrics import MetricsRecorder, split_url
+from timed_adapter import TimedHTTPAdapter
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_split_url_groups_endpoints():
+    assert split_url("https://yewtu.be/api/v1/channels/UCa/streams?x=1") == (
+        "https://yewtu.be", "/api/v1/channels/:id/streams")
+    assert split_url("https://yewtu.be/api/v1/videos/abc") == ("https://yewtu.be", "/api/v1/videos/:id")
+
+
+def test_request_is_recorded_once_with_its_phases(tmp_path):
+    events = tmp_path / "metrics.jsonl"
+    recorder = MetricsRecorder(str(events))
+    timing = recorder.start("https://a/api/v1/videos/abc")
+    assert recorder.current() is timing
+    timing.ttfb, timing.body, timing.bytes = 0.2, 0.05, 1000
+    recorder.finish(timing, status=200)
+    recorder.finish(timing, status=500)
+    recorder.observe_decode(timing, 0.01)
+
+    lines = [json.loads(line) for line in events.read_text().splitlines()]
+    assert [line["event"] for line in lines] == ["request", "decode"]
+    assert lines[0]["status"] == 200 and "dns" not in lines[0]
+    assert recorder.phase_median("https://a", "ttfb") == 0.2
+    assert recorder.phase_median("https://a", "dns") is None
+
+    text = recorder.prometheus_text()
+    assert 'invidious_requests_total{instance="https://a",endpoint="/api/v1/videos/:id",status="200"} 1' in text
+    assert 'invidious_response_bytes_total{instance="https://a",endpoint="/api/v1/videos/:id"} 1000' in text
+    assert ('invidious_request_phase_seconds_bucket{instance="https://a",endpoint="/api/v1/videos/:id",'
+            'phase="ttfb",le="0.25"} 1') in text
+    assert ('invidious_request_phase_seconds_bucket{instance="https://a",endpoint="/api/v1/videos/:id",'
+            'phase="ttfb",le="0.1"} 0') in text
+
+
+def test_failed_request_is_labelled_error():
+    recorder = MetricsRecorder(None)
+    recorder.finish(recorder.start("https://a/api/v1/stats"), error="timeout")
+    assert 'status="error"} 1' in recorder.prometheus_text()
+
+
+def test_adapter_times_new_connections_only(server, monkeypatch):
+    recorder = MetricsRecorder(None)
+    monkeypatch.setattr(request_metrics, "get_recorder", lambda: recorder)
+    session = requests.Session()
+    session.mount("http://", TimedHTTPAdapter())
+    try:
+        first = recorder.start(f"{server}/api/v1/stats")
+        assert session.get(f"{server}/api/v1/stats").json() == {"ok": True}
+        reused = recorder.start(f"{server}/api/v1/stats")
+        session.get(f"{server}/api/v1/stats")
+    finally:
+        session.close()
+    assert first.dns is not None and first.connect is not None
+    assert first.tls is None
+    assert (reused.dns, reused.connect) == (None, None)
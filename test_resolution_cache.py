@@ -0,0 +1,57 @@
+"""
+Unit tests for resolution_cache.py: TTLs, normalised keys and the shared handle pick
+
+Usage:
+    python -m pytest -q test_resolution_cache.py
+"""
+
+import pytest
+
+from resolution_cache import ResolutionCache, normalise_handle, pick_channel
+
+
+@pytest.fixture
+def cache():
+    cache = ResolutionCache(":memory:", ttl=100, negative_ttl=10)
+    yield cache
+    cache.close()
+
+
+def test_handles_are_normalised(cache):
+    cache.put("@JingleBells_Gaming", "UC2eOo8z3dhPbBkyqHbnxm6A", "JingleBells")
+    assert cache.get("jinglebells_gaming").channel_id == "UC2eOo8z3dhPbBkyqHbnxm6A"
+    assert set(cache.get_many(["@JINGLEBELLS_GAMING", "missing"])) == {"jinglebells_gaming"}
+    assert normalise_handle("  @Name ") == "name"
+
+
+def test_entries_expire(cache):
+    cache.put("found", "UCx")
+    cache.put("missing", None)
+    assert cache.get("missing").channel_id is None
+    cache._db.execute("UPDATE handles SET resolved_at = resolved_at - 50")
+    assert cache.get("found") is not None
+    assert cache.get("missing") is None
+    assert cache.purge_expired() == 1
+
+
+def test_pick_channel_prefers_exact_handle():
+    results = [
+        {"type": "video", "videoId": "v"},
+        {"type": "channel", "authorId": "UCfan", "channelHandle": "@JingleBellsFan"},
+        {"type": "channel", "authorId": "UCreal", "channelHandle": "@JingleBells_Gaming"},
+    ]
+    assert pick_channel(results, "@jinglebells_gaming")["authorId"] == "UCreal"
+    assert pick_channel(results, "someone_else")["authorId"] == "UCfan"
+    assert pick_channel([{"type": "channel"}], "x") is None
+
+
+def test_pick_channel_stops_at_the_match():
+    consumed = []
+
+    def results():
+        for n in range(5):
+            consumed.append(n)
+            yield {"type": "channel", "authorId": f"UC{n}", "channelHandle": f"@h{n}"}
+
+    assert pick_channel(results(), "h1")["authorId"] == "UC1"
+    assert consumed == [0, 1]
@@ -0,0 +1,97 @@
+"""
+Unit tests for response_cache.py: freshness, conditional revalidation and LRU bounds
+
+Usage:
+    python -m pytest -q test_response_cache.py
+"""
+
+import pytest
+
+from conftest import FakeResponse
+from response_cache import ResponseCache, freshness
+
+STREAMS = "https://a/api/v1/channels/UCa/streams"
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(":memory:", max_bytes=100)
+
+
+def sender(*responses):
+    """send() stand-in answering with the given responses in order"""
+    sent = []
+
+    def send(headers):
+        sent.append(headers)
+        return responses[len(sent) - 1]
+
+    return send, sent
+
+
+def expire(cache, url=STREAMS):
+    cache._db.execute("UPDATE responses SET expires_at = 0 WHERE url = ?", (url,))
+
+
+@pytest.mark.parametrize("url, headers, ttl", [
+    (STREAMS, {}, 60),
+    ("https://a/api/v1/channels/UCa", {}, 600),
+    ("https://a/api/v1/search?q=x", {}, 300),
+    ("https://a/api/v1/stats", {}, None),
+    (STREAMS, {"Cache-Control": "public, max-age=15"}, 15),
+    (STREAMS, {"Cache-Control": "no-cache"}, 0.0),
+    (STREAMS, {"Cache-Control": "private, max-age=15"}, None),
+])
+def test_freshness(url, headers, ttl):
+    assert freshness(url, headers) == ttl
+
+
+def test_fresh_entry_is_served_without_a_request(cache):
+    send, sent = sender(FakeResponse(body=b"[1]", headers={"ETag": '"v1"'}))
+    assert cache.fetch(STREAMS, send).cache_status == "miss"
+    hit = cache.fetch(STREAMS, send)
+    assert (hit.cache_status, hit.json(), hit.headers["etag"]) == ("hit", [1], '"v1"')
+    assert len(sent) == 1
+
+
+def test_stale_entry_is_revalidated(cache):
+    send, sent = sender(
+        FakeResponse(body=b"[1]", headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        FakeResponse(304, b"", headers={"Cache-Control": "max-age=30"}),
+    )
+    cache.fetch(STREAMS, send)
+    expire(cache)
+    response = cache.fetch(STREAMS, send)
+    assert (response.cache_status, response.status_code, response.content) == ("revalidated", 200, b"[1]")
+    assert sent[1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert cache.fetch(STREAMS, send).cache_status == "hit"
+
+
+def test_changed_resource_replaces_the_entry(cache):
+    send, _ = sender(FakeResponse(body=b"[1]", headers={"ETag": '"v1"'}),
+                     FakeResponse(body=b"[2]", headers={"ETag": '"v2"'}))
+    cache.fetch(STREAMS, send)
+    expire(cache)
+    assert cache.fetch(STREAMS, send).cache_status == "miss"
+    assert cache.fetch(STREAMS, send).content == b"[2]"
+
+
+def test_errors_and_uncacheable_paths_are_not_stored(cache):
+    send, sent = sender(FakeResponse(500, b"oops"), FakeResponse(500, b"oops"),
+                        FakeResponse(body=b"{}"), FakeResponse(body=b"{}"))
+    cache.fetch(STREAMS, send)
+    cache.fetch(STREAMS, send)
+    cache.fetch("https://a/api/v1/stats", send)
+    cache.fetch("https://a/api/v1/stats", send)
+    assert len(sent) == 4
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    urls = [f"https://a/api/v1/videos/v{n}" for n in range(3)]
+    for url in urls[:2]:
+        cache.fetch(url, lambda headers: FakeResponse(body=b"x" * 40))
+        cache._db.execute("UPDATE responses SET last_access = last_access - 10")
+    assert cache.fetch(urls[0], lambda headers: pytest.fail("v0 is cached")).cache_status == "hit"
+    cache.fetch(urls[2], lambda headers: FakeResponse(body=b"x" * 40))
+    cached = {row[0] for row in cache._db.execute("SELECT url FROM responses")}
+    assert cached == {urls[0], urls[2]}
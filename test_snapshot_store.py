@@ -0,0 +1,130 @@
+"""
+Unit tests for snapshot_store.py: append/query round trips, sealing and crash recovery
+
+Usage:
+    python -m pytest -q test_snapshot_store.py
+"""
+
+import os
+import time
+
+import pytest
+
+from snapshot_store import (
+    PARTITION_SECONDS,
+    SEALED_FILE,
+    Observation,
+    SeriesPoint,
+    SnapshotStore,
+    partition_name,
+    partition_start,
+)
+from video_entry import VideoEntry
+
+TODAY = partition_start(partition_name(time.time()))
+TWO_DAYS_AGO = TODAY - 2 * PARTITION_SECONDS
+YESTERDAY = TODAY - PARTITION_SECONDS
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    yield store
+    store.close()
+
+
+def history(day):
+    """Interleaved polls of two channels, plus a failed probe"""
+    return [
+        Observation(day + 60, "UCb", "vb", True, 5, "https://a", probe=True),
+        Observation(day + 10, "UCa", "va", True, 100, "https://a"),
+        Observation(day + 70, "UCa", "va", True, 150, "https://b"),
+        Observation(day + 80, "UCc", instance="https://b", answered=False, probe=True),
+        Observation(day + 90, "UCa", "", False, 0, "https://a"),
+    ]
+
+
+def test_unsealed_round_trip(store):
+    rows = history(TODAY)
+    store.append(rows)
+    assert list(store.observations()) == rows
+    assert store.viewer_series("UCa") == [
+        SeriesPoint(TODAY + 10, "va", 100, True),
+        SeriesPoint(TODAY + 70, "va", 150, True),
+    ]
+    assert store.viewer_series("UCa", start=TODAY + 20) == [SeriesPoint(TODAY + 70, "va", 150, True)]
+    assert store.viewer_series("UCunknown") == []
+
+
+def test_sealed_partition_answers_the_same(store):
+    store.append(history(TWO_DAYS_AGO))
+    before = (store.viewer_series("UCa"), store.viewer_series("UCb"), store.instance_uptime())
+    assert store.seal() == 1
+    assert os.path.exists(os.path.join(store.directory, partition_name(TWO_DAYS_AGO), SEALED_FILE))
+    assert (store.viewer_series("UCa"), store.viewer_series("UCb"), store.instance_uptime()) == before
+    assert store.viewer_series("UCa", start=TWO_DAYS_AGO + 20, end=TWO_DAYS_AGO + 80) == [
+        SeriesPoint(TWO_DAYS_AGO + 70, "va", 150, True)]
+    uptime = store.instance_uptime()
+    assert (uptime["https://a"].answered, uptime["https://a"].probes) == (1, 1)
+    assert (uptime["https://b"].answered, uptime["https://b"].probes) == (0, 1)
+
+
+def test_new_day_seals_earlier_days(store):
+    store.append(history(TWO_DAYS_AGO))
+    store.append(history(YESTERDAY))
+    assert store.stats()["sealed"] == 1
+    assert len(store.viewer_series("UCa")) == 4
+
+
+def test_reopened_store_reads_the_same(store):
+    store.append(history(TODAY))
+    store.close()
+    reopened = SnapshotStore(store.directory)
+    try:
+        assert list(reopened.observations()) == history(TODAY)
+        reopened.append([Observation(TODAY + 100, "UCa", "va", True, 200, "https://a")])
+        assert reopened.viewer_series("UCa")[-1] == SeriesPoint(TODAY + 100, "va", 200, True)
+    finally:
+        reopened.close()
+
+
+def test_partial_row_is_cut_off(store):
+    store.append(history(TODAY)[:2])
+    store.close()
+    # A crash between column writes leaves one column a row ahead
+    column = os.path.join(store.directory, partition_name(TODAY), "time.col")
+    with open(column, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    store.append([Observation(TODAY + 200, "UCa", "va", True, 7, "https://a")])
+    rows = list(store.observations())
+    assert len(rows) == 3
+    assert rows[-1] == Observation(TODAY + 200, "UCa", "va", True, 7, "https://a")
+
+
+def test_record_poll(store):
+    live = [VideoEntry("v1", "One", "A", live_now=True, view_count=9), VideoEntry("v2", "Two", "A", view_count=3)]
+    store.record_poll("UCa", "https://a", live, at=TODAY + 5, probe=True)
+    store.record_poll("UCa", None, None, at=TODAY + 6)
+    rows = list(store.observations())
+    assert [(r.video_id, r.view_count, r.probe, r.answered) for r in rows] == [
+        ("v1", 9, True, True), ("v2", 3, False, True), ("", 0, False, False)]
+
+
+def test_drop_before(store):
+    store.append(history(TWO_DAYS_AGO))
+    store.append(history(TODAY))
+    assert store.drop_before(YESTERDAY) == 1
+    assert store.partition_names() == [partition_name(TODAY)]
+
+
+def test_two_writers_share_the_string_table(store):
+    other = SnapshotStore(store.directory)
+    try:
+        for n in range(20):
+            writer = store if n % 2 else other
+            writer.append([Observation(TODAY + n, f"UC{n}", f"v{n}", True, n, f"https://{n % 3}")])
+        rows = list(store.observations())
+        assert [(r.channel_id, r.video_id, r.instance) for r in rows] == [
+            (f"UC{n}", f"v{n}", f"https://{n % 3}") for n in range(20)]
+    finally:
+        other.close()
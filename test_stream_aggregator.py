@@ -0,0 +1,133 @@
+"""
+Unit tests for stream_aggregator.py: the shared deadline, merging and the platform fetchers
+
+Usage:
+    python -m pytest -q test_stream_aggregator.py
+"""
+
+import json
+import threading
+
+import invidious_http
+import stream_aggregator
+from conftest import FakeResponse
+from stream_aggregator import SourceResult, aggregate, fetch_twitch, kick_stream_record, merge_streams, youtube_fetcher
+from video_entry import VideoEntry
+
+
+def record(stream_id, viewers):
+    return {"id": stream_id, "viewerCount": viewers}
+
+
+def test_merge_streams_keeps_the_first_source_and_sorts():
+    merged = merge_streams([
+        SourceResult("youtube", [record("youtube-a", 5), record("shared", 1)]),
+        SourceResult("search", [record("shared", 99), record("youtube-b", 50)]),
+    ])
+    assert merged == [record("youtube-b", 50), record("youtube-a", 5), record("shared", 1)]
+
+
+def test_sources_share_one_deadline():
+    release = threading.Event()
+
+    def slow(emit):
+        emit([record("slow-1", 3)])
+        release.wait(5)
+        emit([record("slow-2", 4)])
+
+    def broken(emit):
+        emit([record("broken-1", 1)])
+        raise ValueError("HTTP 403")
+
+    sources = {"fast": lambda emit: emit([record("fast-1", 10)]), "slow": slow, "broken": broken}
+    try:
+        streams, results = aggregate(sources, deadline=0.3)
+    finally:
+        release.set()
+    assert [s["id"] for s in streams] == ["fast-1", "slow-1", "broken-1"]
+    fast, late, failed = results
+    assert (fast.complete, fast.error) == (True, None)
+    assert (late.complete, late.error, len(late.streams)) == (False, None, 1)
+    assert 0.25 < late.elapsed < 1
+    assert (failed.complete, failed.error) == (False, "HTTP 403")
+
+
+def gql_page(nodes, cursor=None):
+    edges = [{"node": {"type": "live", "broadcaster": {"login": n, "displayName": n.title()}, **fields},
+              "cursor": f"after-{n}"} for n, fields in nodes]
+    page_info = {"hasNextPage": cursor is not None}
+    return {"data": {"game": {"streams": {"edges": edges, "pageInfo": page_info}}}}
+
+
+def test_twitch_follows_cursors_until_viewers_run_low(monkeypatch):
+    pages = [
+        gql_page([("a", {"id": "1", "viewersCount": 90}), ("b", {"id": "2", "viewersCount": 40})], cursor="x"),
+        gql_page([("c", {"id": "3", "viewersCount": 20}), ("d", {"id": "4", "viewersCount": 2})], cursor="y"),
+        gql_page([("e", {"id": "5", "viewersCount": 1})]),
+    ]
+    cursors = []
+
+    def post(url, body, headers=None):
+        cursors.append(body["variables"]["cursor"])
+        return FakeResponse(body=json.dumps(pages[len(cursors) - 1]).encode())
+
+    monkeypatch.setattr(invidious_http, "post", post)
+    emitted = []
+    fetch_twitch(emitted.extend, min_viewers=10)
+    assert [(r["id"], r["streamUrl"]) for r in emitted] == [
+        ("twitch-1", "https://twitch.tv/a"), ("twitch-2", "https://twitch.tv/b"), ("twitch-3", "https://twitch.tv/c")]
+    assert cursors == [None, "after-b"]
+
+
+def test_twitch_error_is_raised(monkeypatch):
+    monkeypatch.setattr(invidious_http, "post", lambda url, body, headers=None: FakeResponse(
+        body=json.dumps({"errors": [{"message": "PersistedQueryNotFound"}]}).encode()))
+    emitted = []
+    try:
+        fetch_twitch(emitted.extend)
+    except ValueError as e:
+        assert str(e) == "PersistedQueryNotFound"
+    else:
+        raise AssertionError("expected a ValueError")
+    assert emitted == []
+
+
+def test_kick_stream_record():
+    item = {
+        "id": 7, "session_title": "SC6 lobbies", "viewer_count": 12, "start_time": "2024-01-01 10:00:00",
+        "thumbnail": {"src": "https://images.kick.com/t.jpg"},
+        "channel": {"slug": "player", "user": {"username": "Player", "profile_pic": "https://p.jpg"}},
+    }
+    assert kick_stream_record(item) == {
+        "id": "kick-7", "platform": "kick", "streamerName": "Player", "title": "SC6 lobbies",
+        "thumbnailUrl": "https://images.kick.com/t.jpg", "viewerCount": 12, "streamUrl": "https://kick.com/player",
+        "isLive": True, "profilePictureUrl": "https://p.jpg", "startedAt": "2024-01-01 10:00:00",
+    }
+
+
+def test_youtube_setup_and_search_errors_count(monkeypatch):
+    calls = []
+
+    def prune(instances, store, log):
+        calls.append("prune")
+        return instances[:1]
+
+    def resolve(entries, instances, workers, limiter, store):
+        calls.append(("resolve", tuple(instances)))
+        return ["UCa"]
+
+    def search(*args, **kwargs):
+        raise ValueError("every instance failed")
+
+    monkeypatch.setattr(stream_aggregator, "prune_instances", prune)
+    monkeypatch.setattr(stream_aggregator, "resolve_roster", resolve)
+    monkeypatch.setattr(stream_aggregator, "discover_streams", search)
+    monkeypatch.setattr(stream_aggregator, "scan_channels", lambda ids, instances, *args: iter(
+        [("UCa", instances[0], [VideoEntry("v1", "Ranked", "A", live_now=True, view_count=5)])]))
+    fetch = youtube_fetcher(["@a"], ["https://a", "https://b"], store=None, limiter=None)
+    assert calls == []
+
+    streams, [result] = aggregate({"youtube": fetch}, deadline=5)
+    assert calls == ["prune", ("resolve", ("https://a",))]
+    assert [s["id"] for s in streams] == ["youtube-v1"]
+    assert result.error == "keyword search: every instance failed"
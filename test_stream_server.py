@@ -0,0 +1,131 @@
+"""
+Unit tests for stream_server.py: the hub's merge and change feed, and the HTTP/SSE endpoints
+
+Usage:
+    python -m pytest -q test_stream_server.py
+"""
+
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import stream_server
+from stream_server import StreamHub, make_handler
+
+
+def stream(video_id, viewers=10, title="Ranked"):
+    return {"id": f"youtube-{video_id}", "platform": "youtube", "title": title, "viewerCount": viewers}
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.empty():
+        sequence, event, data = subscriber.get_nowait()
+        messages.append((event, json.loads(data)["id"]))
+    return messages
+
+
+def test_sources_merge_and_changes_are_published():
+    hub = StreamHub()
+    subscriber, _, _ = hub.subscribe()
+    hub.update("youtube:UCa", [stream("a"), stream("collab")])
+    hub.update("youtube:UCb", [stream("collab", viewers=99)])
+    assert drain(subscriber) == [("went_live", "youtube-a"), ("went_live", "youtube-collab")]
+
+    hub.update("youtube:UCa", [stream("a", viewers=11, title="Finals")])
+    # The collab stream is still listed by UCb, so it changes source instead of ending
+    assert drain(subscriber) == [
+        ("title_changed", "youtube-a"),
+        ("viewers_changed", "youtube-a"),
+        ("viewers_changed", "youtube-collab"),
+    ]
+    hub.update("youtube:UCb", [])
+    assert drain(subscriber) == [("ended", "youtube-collab")]
+
+
+def test_unchanged_poll_keeps_the_snapshot():
+    hub = StreamHub(platforms=["youtube", "twitch"])
+    hub.update("youtube:UCa", [stream("a", 5), stream("b", 50)])
+    body, _, etag = hub.snapshot()
+    hub.update("youtube:UCa", [stream("a", 5), stream("b", 50)])
+    assert hub.snapshot()[2] == etag
+    data = json.loads(body)
+    assert [s["id"] for s in data["streams"]] == ["youtube-b", "youtube-a"]
+    assert data["platforms"] == ["twitch", "youtube"]
+
+
+def test_reconnecting_client_gets_missed_events_or_a_snapshot():
+    hub = StreamHub(history=2)
+    for n in range(3):
+        hub.update("youtube:UCa", [stream("a", viewers=n)])
+    _, backlog, sequence = hub.subscribe(last_event_id=2)
+    assert [message[0] for message in backlog] == [3] and sequence == 3
+    assert hub.subscribe(last_event_id=0)[1] is None
+    assert hub.subscribe()[1] is None
+
+
+def test_slow_client_is_dropped(monkeypatch):
+    monkeypatch.setattr(stream_server, "CLIENT_QUEUE", 2)
+    hub = StreamHub()
+    subscriber, _, _ = hub.subscribe()
+    for n in range(3):
+        hub.update("youtube:UCa", [stream("a", viewers=n)])
+    assert subscriber.get_nowait() is None
+    assert hub.status()["subscribers"] == 0
+
+
+@pytest.fixture
+def server():
+    hub = StreamHub()
+    hub.update("youtube:UCa", [stream("a")])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(hub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield hub, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_streams_endpoint_honours_the_etag(server):
+    hub, port = server
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request("GET", "/api/streams")
+    response = connection.getresponse()
+    etag = response.getheader("ETag")
+    assert json.loads(response.read())["streams"][0]["id"] == "youtube-a"
+    connection.request("GET", "/api/streams", headers={"If-None-Match": etag})
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 304
+    connection.close()
+
+
+def test_event_stream_sends_a_snapshot_then_changes(server):
+    hub, port = server
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request("GET", "/api/events")
+    response = connection.getresponse()
+    assert response.getheader("Content-Type") == "text/event-stream"
+
+    def next_event():
+        fields = {}
+        while True:
+            line = response.fp.readline().decode("utf-8").rstrip("\n")
+            if not line:
+                if "event" in fields:
+                    return fields
+                continue
+            name, _, value = line.partition(": ")
+            fields[name] = value
+
+    snapshot = next_event()
+    assert snapshot["event"] == "snapshot"
+    assert json.loads(snapshot["data"])["streams"][0]["id"] == "youtube-a"
+    hub.update("youtube:UCa", [])
+    ended = next_event()
+    assert (ended["event"], json.loads(ended["data"])["id"]) == ("ended", "youtube-a")
+    assert int(ended["id"]) == int(snapshot["id"]) + 1
+    connection.close()
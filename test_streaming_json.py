@@ -0,0 +1,92 @@
+"""
+Unit tests for streaming_json.py: item boundaries, payload shapes and early stop
+
+Usage:
+    python -m pytest -q test_streaming_json.py
+"""
+
+import json
+
+import pytest
+
+from conftest import FakeResponse
+from streaming_json import iter_array_items, iter_items, iter_search_channels, project
+
+LISTING = {
+    "videos": [
+        {"videoId": "a", "title": "Brace ] and \"quote\" {", "liveNow": True, "extra": [1, {"x": "]"}]},
+        {"videoId": "b", "title": "ソウルキャリバー6", "liveNow": False},
+        {"videoId": "c", "title": "escaped \\\" backslash", "viewCount": 12},
+    ],
+    "continuation": "token-2",
+}
+
+
+def chunked(body: bytes, size: int):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 4096])
+def test_items_survive_any_chunking(size):
+    body = json.dumps(LISTING, ensure_ascii=False).encode("utf-8")
+    siblings = {}
+    items = list(iter_array_items(chunked(body, size), siblings=siblings))
+    assert items == LISTING["videos"]
+    assert siblings == {"continuation": "token-2"}
+
+
+def test_bare_array():
+    body = json.dumps(LISTING["videos"]).encode()
+    assert list(iter_array_items(chunked(body, 5))) == LISTING["videos"]
+
+
+def test_scalars_before_the_array_are_kept():
+    body = b'{"continuation": "early", "skip": {"videos": [1]}, "videos": [{"videoId": "a"}]}'
+    siblings = {}
+    assert list(iter_array_items([body], siblings=siblings)) == [{"videoId": "a"}]
+    assert siblings == {"continuation": "early"}
+
+
+def test_array_under_other_key():
+    body = b'{"latestVideos": [{"videoId": "a"}]}'
+    assert list(iter_array_items([body], keys=("videos", "latestVideos"))) == [{"videoId": "a"}]
+
+
+@pytest.mark.parametrize("body", [
+    b'{"videos": [{"videoId": "a"}',
+    b'{"videos": [{"videoId": "a"}, {"videoId": "b',
+    b'{"error": "nope"}',
+    b'"just a string"',
+    b'',
+])
+def test_malformed_payloads_raise(body):
+    with pytest.raises(ValueError):
+        list(iter_array_items(chunked(body, 4)))
+
+
+def test_truncated_after_array_raises_only_with_siblings():
+    body = b'{"videos": [{"videoId": "a"}], "continuation": "x'
+    assert list(iter_array_items([body])) == [{"videoId": "a"}]
+    with pytest.raises(ValueError):
+        list(iter_array_items([body], siblings={}))
+
+
+def test_iter_items_projects_filters_and_stops():
+    body = json.dumps(LISTING).encode()
+    response = FakeResponse(body=body)
+    items = list(iter_items(response, fields=("videoId",), where=lambda item: item.get("videoId") != "a", limit=1))
+    assert items == [{"videoId": "b"}]
+    assert response.closed
+
+
+def test_search_channels_only_yields_channels():
+    body = json.dumps([
+        {"type": "video", "videoId": "v"},
+        {"type": "channel", "author": "A", "authorId": "UCa", "channelHandle": "@a", "description": "long"},
+    ]).encode()
+    assert list(iter_search_channels(FakeResponse(body=body))) == [
+        {"type": "channel", "author": "A", "authorId": "UCa", "channelHandle": "@a"}]
+
+
+def test_project_skips_missing_fields():
+    assert project({"a": 1, "b": 2}, ("a", "c")) == {"a": 1}
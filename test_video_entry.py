@@ -0,0 +1,73 @@
+"""
+Unit tests for video_entry.py: field parsing, payload shapes and the live heuristic
+
+Usage:
+    python -m pytest -q test_video_entry.py
+"""
+
+import json
+
+import pytest
+
+from conftest import FakeResponse
+from video_entry import VideoEntry, entries_from_payload, iter_entries
+
+RAW = {
+    "videoId": "abc",
+    "title": "SC6 ranked",
+    "author": "Player",
+    "authorId": "UCa",
+    "liveNow": True,
+    "viewCount": "1,234",
+    "published": 1700000000,
+    "publishedText": "3 minutes ago",
+    "lengthSeconds": 0,
+    "videoThumbnails": [{"url": "https://i.ytimg.com/vi/abc/maxres.jpg"}],
+    "authorThumbnails": [{"url": "https://yt3.ggpht.com/a.jpg"}],
+}
+
+
+def test_from_dict_parses_fields():
+    entry = VideoEntry.from_dict(RAW)
+    assert (entry.video_id, entry.view_count, entry.live_now) == ("abc", 1234, True)
+    assert entry.published_at.year == 2023
+    assert entry.thumbnail_url == "https://i.ytimg.com/vi/abc/maxres.jpg"
+    assert entry.url == "https://www.youtube.com/watch?v=abc"
+
+
+def test_from_dict_tolerates_missing_and_odd_values():
+    entry = VideoEntry.from_dict({"videoId": "x", "viewCount": True, "liveNow": "yes", "videoThumbnails": {}})
+    assert (entry.view_count, entry.live_now, entry.published, entry.thumbnail_url) == (0, False, None, None)
+
+
+def test_recent_upload_counts_as_live_unless_live_now_only():
+    entry = VideoEntry("v", published_text="12 seconds ago")
+    assert entry.recent and entry.is_live()
+    assert not entry.is_live(live_now_only=True)
+    assert not VideoEntry("v", published_text="2 hours ago").is_live()
+
+
+def test_stream_record():
+    record = VideoEntry.from_dict(RAW).to_stream_record()
+    assert record["id"] == "youtube-abc"
+    assert record["viewerCount"] == 1234
+    assert record["profilePictureUrl"] == "https://yt3.ggpht.com/a.jpg"
+    assert VideoEntry("v").to_stream_record()["thumbnailUrl"] == "https://i.ytimg.com/vi/v/mqdefault.jpg"
+
+
+@pytest.mark.parametrize("payload", [[RAW, {"title": "no id"}], {"videos": [RAW]}, {"latestVideos": [RAW]}])
+def test_entries_from_payload_shapes(payload):
+    assert [entry.video_id for entry in entries_from_payload(payload)] == ["abc"]
+
+
+@pytest.mark.parametrize("payload", [{"error": "x"}, [RAW, "junk"], None])
+def test_entries_from_payload_rejects_other_shapes(payload):
+    assert entries_from_payload(payload) is None
+
+
+def test_iter_entries_streams_both_shapes():
+    for payload in ([RAW, {"title": "no id"}], {"videos": [RAW, RAW]}):
+        response = FakeResponse(body=json.dumps(payload).encode())
+        assert {entry.video_id for entry in iter_entries(response)} == {"abc"}
+    with pytest.raises(ValueError):
+        list(iter_entries(FakeResponse(body=b'{"error": "x"}')))
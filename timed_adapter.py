@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+requests transport adapter that times connection setup
+
+Used by invidious_http for the requests backend. New connections take
+their addresses from the DNS cache (dns_cache) and record the DNS lookup,
+TCP connect and TLS handshake on the calling thread's current request in
+request_metrics. Kept apart from invidious_http so that urllib3 is only
+imported once the first request is sent.
+"""
+
+import socket
+import time
+from typing import Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util import connection as urllib3_connection
+
+try:
+    from urllib3.exceptions import NameResolutionError
+except ImportError:  # urllib3 < 2
+    NameResolutionError = None
+
+import request_metrics
+from dns_cache import get_dns_cache
+
+
+class _TimedConnectionMixin:
+    """
+    Splits urllib3's connection setup into a timed DNS lookup and a timed
+    TCP connect, recorded on the calling thread's current request
+    """
+
+    def _new_conn(self) -> socket.socket:
+        timing = request_metrics.get_recorder().current()
+        started = time.perf_counter()
+        try:
+            # Pre-resolved addresses; known-dead names fail without a lookup
+            addresses = get_dns_cache().getaddrinfo(self._dns_host, self.port)
+        except socket.gaierror as e:
+            if timing is not None:
+                timing.dns = time.perf_counter() - started
+            if NameResolutionError is not None:
+                raise NameResolutionError(self.host, self, e) from e
+            raise NewConnectionError(self, f"Failed to resolve '{self.host}' (getaddrinfo failed: {e})") from e
+        resolved = time.perf_counter()
+        if timing is not None:
+            timing.dns = resolved - started
+
+        error: Optional[Exception] = None
+        for *_, sockaddr in addresses:
+            try:
+                # Numeric address, so create_connection does no second lookup
+                sock = urllib3_connection.create_connection(
+                    sockaddr[:2],
+                    self.timeout,
+                    source_address=self.source_address,
+                    socket_options=self.socket_options,
+                )
+            except socket.timeout as e:
+                error = ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+                )
+                error.__cause__ = e
+            except OSError as e:
+                error = NewConnectionError(self, f"Failed to establish a new connection: {e}")
+                error.__cause__ = e
+            else:
+                if timing is not None:
+                    timing.connect = time.perf_counter() - resolved
+                return sock
+        raise error or NewConnectionError(self, f"No addresses found for '{self.host}'")
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        timing = request_metrics.get_recorder().current()
+        if timing is not None:
+            timing.tls = max(0.0, time.perf_counter() - started - (timing.dns or 0.0) - (timing.connect or 0.0))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record DNS, connect and TLS timings"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
@@ -16,4 +16,6 @@ export interface Stream {
 export interface StreamApiResponse {
   streams: Stream[];
   lastUpdated: string;
+  // Platforms the stream feed covers; the app queries the others itself
+  platforms?: Platform[];
 }
@@ -1,6 +1,8 @@
-import requests
 import json
 
+import invidious_http
+from video_entry import entries_from_payload
+
 INSTANCES = [
     "https://y.com.sb",
     "https://invidious.slipfox.xyz",
@@ -8,6 +10,10 @@ INSTANCES = [
     "https://invidious.privacyredirect.com",
 ]
 
+# Ask the instance for only the fields printed below instead of the whole
+# channel document (description, banners, related channels, ...)
+CHANNEL_FIELDS = "author,subCount,description,latestVideos(videoId,title,liveNow,publishedText)"
+
 channel_id = "UCJ0Y3WUgX0eqgQ76mz1PaFA"  # SoulCalibur VI Game Channel
 
 print(f"Testing if channel exists: {channel_id}\n")
@@ -18,7 +24,7 @@ for instance in INSTANCES:
     print(f"Trying {instance}...")
     
     try:
-        response = requests.get(url, headers={"Accept": "application/json"}, timeout=15)
+        response = invidious_http.get(url, params={"fields": CHANNEL_FIELDS}, cache=True)
         print(f"  Status: {response.status_code}")
         
         if response.status_code == 200:
@@ -29,14 +35,14 @@ for instance in INSTANCES:
             print(f"     Description: {data.get('description', 'N/A')[:100]}")
             
             # Check latest videos
-            latest = data.get('latestVideos', [])
+            latest = entries_from_payload(data) or []
             print(f"     Latest videos: {len(latest)}")
             
             if latest:
                 print(f"\n     First 3 latest videos:")
                 for i, v in enumerate(latest[:3]):
-                    print(f"       {i+1}. {v.get('title', 'N/A')[:60]}")
-                    print(f"          liveNow: {v.get('liveNow')}, published: {v.get('publishedText')}")
+                    print(f"       {i+1}. {(v.title or 'N/A')[:60]}")
+                    print(f"          liveNow: {v.live_now}, published: {v.published_text}")
             
             break  # Success
         elif response.status_code == 404:
@@ -59,7 +65,7 @@ for instance in INSTANCES:
     print(f"Trying {instance}...")
     
     try:
-        response = requests.get(url, headers={"Accept": "application/json"}, timeout=15)
+        response = invidious_http.get(url, params={"fields": "author,subCount"}, cache=True)
         print(f"  Status: {response.status_code}")
         
         if response.status_code == 200:
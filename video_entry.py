@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Typed record for Invidious video and stream entries
+
+Invidious returns channel listings either as a bare array or as an object
+holding the array ("videos" for /streams and /videos, "latestVideos" for a
+channel document). This module is the one place that normalises both shapes
+and turns each entry into a compact VideoEntry with the numeric and
+timestamp fields already parsed, so the scripts filter on attributes
+instead of re-querying raw dicts with .get().
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from streaming_json import iter_videos
+
+# Object keys that may hold the video array
+VIDEO_LIST_KEYS = ("videos", "latestVideos")
+
+# Same heuristic as lib/stream-api.ts: the /streams listing often has a stale
+# liveNow flag, so something published seconds or minutes ago counts as live
+RECENT_PATTERN = re.compile(r"\d+\s+(second|minute)s?\s+ago", re.IGNORECASE)
+
+
+def _int(value: Any) -> int:
+    """Parse a count that may arrive as int, float or text like "1,234" """
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        digits = value.replace(",", "").strip()
+        if digits.isdigit():
+            return int(digits)
+    return 0
+
+
+def _first_url(thumbnails: Any) -> Optional[str]:
+    if isinstance(thumbnails, list) and thumbnails and isinstance(thumbnails[0], dict):
+        return thumbnails[0].get("url")
+    return None
+
+
+@dataclass(slots=True)
+class VideoEntry:
+    """One entry of a channel streams/videos listing"""
+    video_id: str
+    title: str = ""
+    author: str = ""
+    author_id: str = ""
+    live_now: bool = False
+    is_upcoming: bool = False
+    view_count: int = 0
+    published: Optional[int] = None  # Unix timestamp
+    published_text: str = ""
+    length_seconds: int = 0
+    thumbnail_url: Optional[str] = None
+    author_thumbnail_url: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "VideoEntry":
+        """Build an entry from a raw Invidious dict"""
+        return cls(
+            video_id=item.get("videoId") or "",
+            title=item.get("title") or "",
+            author=item.get("author") or "",
+            author_id=item.get("authorId") or "",
+            live_now=item.get("liveNow") is True,
+            is_upcoming=item.get("isUpcoming") is True,
+            view_count=_int(item.get("viewCount")),
+            published=_int(item.get("published")) or None,
+            published_text=item.get("publishedText") or "",
+            length_seconds=_int(item.get("lengthSeconds")),
+            thumbnail_url=_first_url(item.get("videoThumbnails")),
+            author_thumbnail_url=_first_url(item.get("authorThumbnails")),
+        )
+
+    @property
+    def published_at(self) -> Optional[datetime]:
+        """Publish time as an aware UTC datetime"""
+        if self.published is None:
+            return None
+        return datetime.fromtimestamp(self.published, tz=timezone.utc)
+
+    @property
+    def recent(self) -> bool:
+        """True if the entry was published seconds or minutes ago"""
+        return bool(RECENT_PATTERN.search(self.published_text))
+
+    @property
+    def url(self) -> str:
+        return f"https://www.youtube.com/watch?v={self.video_id}"
+
+    def is_live(self, live_now_only: bool = False) -> bool:
+        """Check whether the entry should be reported as live"""
+        if self.live_now:
+            return True
+        return not live_now_only and self.recent
+
+    def to_stream_record(self) -> Dict[str, Any]:
+        """Convert to the web app's Stream shape (types/stream.ts)"""
+        record = {
+            "id": f"youtube-{self.video_id}",
+            "platform": "youtube",
+            "streamerName": self.author or "Unknown",
+            "title": self.title or "Untitled Stream",
+            "thumbnailUrl": self.thumbnail_url or f"https://i.ytimg.com/vi/{self.video_id}/mqdefault.jpg",
+            "viewerCount": self.view_count,
+            "streamUrl": self.url,
+            "isLive": True,
+        }
+        if self.author_thumbnail_url:
+            record["profilePictureUrl"] = self.author_thumbnail_url
+        return record
+
+
+def entries_from_payload(data: Any) -> Optional[List[VideoEntry]]:
+    """
+    Normalise a decoded listing payload into entries
+
+    Accepts a bare list or an object with the list under one of
+    VIDEO_LIST_KEYS. Entries without a videoId are dropped.
+
+    Returns:
+        The entries, or None if the payload has neither shape
+    """
+    if isinstance(data, dict):
+        data = next((data[k] for k in VIDEO_LIST_KEYS if isinstance(data.get(k), list)), None)
+    if not isinstance(data, list) or any(not isinstance(v, dict) for v in data):
+        return None
+    return [entry for entry in map(VideoEntry.from_dict, data) if entry.video_id]
+
+
+def iter_entries(response, **kwargs) -> Iterator[VideoEntry]:
+    """
+    Stream entries out of a listing response (see streaming_json.iter_videos)
+
+    Raises:
+        ValueError if the payload has neither shape or is malformed
+    """
+    kwargs.setdefault("keys", VIDEO_LIST_KEYS)
+    # Entries pick their own fields, so skip the dict projection
+    kwargs.setdefault("fields", None)
+    kwargs.setdefault("where", lambda item: bool(item.get("videoId")))
+    for item in iter_videos(response, **kwargs):
+        yield VideoEntry.from_dict(item)